@@ -0,0 +1,170 @@
+import asyncio
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import util
+
+import swisseph as swe
+
+from chart import EPHE_PATH, configure_ephemeris, warm_up
+
+#################### ASGI Server Mode ###################
+# An ASGI front end for the Flask app, e.g.
+#
+#   cd eph && uvicorn asgi:app --port 5001
+#
+# The event loop only moves bytes. Every request runs the unchanged Flask routes
+# in a pool of worker processes; each worker sets the ephemeris path and sidereal
+# mode once and handles one request at a time, so no two requests ever share
+# Swiss Ephemeris state. Requests beyond the workers plus a bounded queue get 503.
+#
+#   ASGI_WORKERS     worker processes (default: cpu count)
+#   ASGI_MAX_QUEUE   requests allowed to wait for a worker (default: 2 per worker)
+#   EPHE_PATH        ephemeris files (default: the bundled ephe_data)
+#
+# Responses are buffered in the worker, so streamed routes (NDJSON batch, large
+# ephemeris ranges) arrive in one piece, and /api/metrics shows the numbers of
+# whichever worker served it.
+
+WORKERS = int(os.environ.get('ASGI_WORKERS', 0)) or os.cpu_count()
+MAX_QUEUE = int(os.environ.get('ASGI_MAX_QUEUE', WORKERS * 2))
+
+#################### Worker Side ###################
+
+flask_app = None
+
+def init_worker(ephe_path):
+    # Runs once in every worker process
+    global flask_app
+    from main import app
+    flask_app = app
+
+    configure_ephemeris(ephe_path)
+    warm_up()
+
+    # multiprocessing finalizers (unlike atexit) run when a pool worker exits
+    util.Finalize(None, swe.close, exitpriority=10)
+
+def handle_request(method, path, query_string, headers, body, scheme, server, client):
+    # One HTTP request through the Flask app; returns (status, headers, body)
+    from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+    host = f'{server[0]}:{server[1]}' if server else 'localhost'
+    builder = EnvironBuilder(
+        path=path, method=method, query_string=query_string.decode('latin-1'), headers=headers, data=body,
+        base_url=f'{scheme}://{host}',
+        environ_overrides={'REMOTE_ADDR': client[0]} if client else None
+    )
+    try:
+        app_iter, status, response_headers = run_wsgi_app(flask_app, builder.get_environ(), buffered=True)
+        content = b''.join(app_iter)
+    finally:
+        builder.close()
+
+    return int(status.split(' ', 1)[0]), list(response_headers.items()), content
+
+#################### Event Loop Side ###################
+
+def encode_headers(headers):
+    return [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+async def send_response(send, status, headers, body):
+    await send({'type': 'http.response.start', 'status': status, 'headers': encode_headers(headers)})
+    await send({'type': 'http.response.body', 'body': body})
+
+class EphemerisASGI:
+
+    def __init__(self, workers=WORKERS, max_queue=MAX_QUEUE, ephe_path=EPHE_PATH):
+        self.workers = workers
+        self.limit = workers + max_queue
+        self.ephe_path = ephe_path
+        self.executor = None
+        self.in_flight = 0
+        self.closing = False
+        self.idle = None
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=init_worker,
+                initargs=(self.ephe_path,)
+            )
+
+    async def shutdown(self):
+        # Stop taking requests, let the ones in flight finish, then close the workers
+        # (which call swe.close() on the way out) and our own ephemeris files
+        self.closing = True
+        if self.in_flight:
+            self.idle = asyncio.Event()
+            await self.idle.wait()
+
+        if self.executor is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+            self.executor = None
+
+        swe.close()
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    self.start()
+                    await send({'type': 'lifespan.startup.complete'})
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+            elif message['type'] == 'lifespan.shutdown':
+                await self.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def reject(self, send, error):
+        body = json.dumps({'success': False, 'error': error}).encode('utf-8')
+        await send_response(send, 503, [('Content-Type', 'application/json'), ('Retry-After', '1')], body)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self.lifespan(receive, send)
+        if scope['type'] != 'http':
+            return
+
+        if self.closing:
+            return await self.reject(send, 'Server is shutting down')
+        if self.in_flight >= self.limit:
+            return await self.reject(send, 'Server is busy, try again shortly')
+
+        self.in_flight += 1
+        try:
+            body = await read_body(receive)
+            self.start() # servers without lifespan support
+
+            headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']]
+            status, response_headers, content = await asyncio.get_running_loop().run_in_executor(
+                self.executor, handle_request,
+                scope['method'], scope.get('root_path', '') + scope['path'], scope.get('query_string', b''),
+                headers, body, scope.get('scheme', 'http'), scope.get('server'), scope.get('client')
+            )
+        except Exception as e:
+            status, response_headers = 500, [('Content-Type', 'application/json')]
+            content = json.dumps({'success': False, 'error': str(e), 'error_type': type(e).__name__}).encode('utf-8')
+        finally:
+            self.in_flight -= 1
+            if self.idle is not None and not self.in_flight:
+                self.idle.set()
+
+        await send_response(send, status, response_headers, content)
+
+app = EphemerisASGI()
@@ -0,0 +1,255 @@
+import json
+from itertools import islice
+
+import numpy as np
+import swisseph as swe
+from flask import Response, jsonify, request
+
+from chart import (
+    PLANETS, PLANET_INDEX, SIGNS, NAKSHATRAS, DIGNITY_LABELS, STRENGTH_RANGES, FLAGS,
+    set_sidereal_mode, parse_birth_data, get_houses, classify_dignities
+)
+from chebyshev import current_store
+from classify import SIGN_SIZE, classify_longitudes
+from metrics import timed
+from serialize import respond
+
+# DIGNITY_TABLE row for each planet, in PLANETS order
+PLANET_ROWS = np.array([PLANET_INDEX[name] for name in PLANETS])
+
+NDJSON_TYPES = ('application/x-ndjson', 'application/ndjson')
+
+# Records per /api/charts/batch request, and per chunk when streaming the results
+MAX_RECORDS = 10_000
+STREAM_CHUNK = 256
+
+# get_houses for an ascendant in each sign (the houses only depend on the sign)
+HOUSES_BY_SIGN = [get_houses(sign * SIGN_SIZE) for sign in range(12)]
+
+#################### Batch Chart Calculation ###################
+
+def chart_result(chart):
+    return {
+        'success': True,
+        'ascendant': chart['ascendant'],
+        'planets': chart['planets'],
+        'houses': chart['houses']
+    }
+
+def error_result(index, e):
+    # A bad record only fails itself, not the whole batch
+    return {
+        'success': False,
+        'index': index,
+        'error': str(e),
+        'error_type': type(e).__name__
+    }
+
+def iter_charts(records):
+    # Yields one result per record, in the same order as the input (used for streaming).
+    # Works through compute_charts a chunk at a time so the first lines go out early.
+    offset = 0
+    for chunk in chunked(records, STREAM_CHUNK):
+        for result in compute_charts(chunk):
+            if not result['success']:
+                result['index'] += offset
+            yield result
+        offset += len(chunk)
+
+def prepare_records(records):
+    # Convert every record to a julian day first. Returns the good ones sorted by date
+    # (so neighbouring calculations hit the same pages of the ephemeris files) and
+    # the failures keyed by their input index.
+    parsed = []
+    failed = {}
+
+    for index, record in enumerate(records):
+        try:
+            if isinstance(record, Exception): # a line that could not be parsed
+                raise record
+            jdet, lat, lon, hsys = parse_birth_data(record)
+            parsed.append((jdet, index, lat, lon, hsys))
+        except Exception as e:
+            failed[index] = e
+
+    parsed.sort()
+    return parsed, failed
+
+@timed('batch.positions')
+def calc_batch_positions(records):
+    # The ephemeris part for a list of records: (jd, ascendant, longitude, success, errors)
+    # with one row per record and longitude (records, planets) in PLANETS order. errors
+    # maps the index of every failed record to its exception.
+    set_sidereal_mode()
+
+    count = len(records)
+    jd = np.zeros(count)
+    ascendant = np.zeros(count)
+    longitude = np.zeros((count, len(PLANETS)))
+    success = np.zeros(count, dtype=bool)
+
+    parsed, errors = prepare_records(records)
+    store = current_store()
+    calc, houses_ex2 = swe.calc, swe.houses_ex2
+    planet_ids = list(PLANETS.values())
+
+    # calc_positions without its per-call stage timings. Swiss Ephemeris has no call
+    # for many instants, so without a position store this loop (8 swe.calc and a
+    # houses_ex2 per record, ~150-200us) is most of a batch's time.
+    for jdet, index, lat, lon, hsys in parsed:
+        try:
+            ascendant[index] = houses_ex2(jdet, lat, lon, hsys, FLAGS)[1][0]
+            if store is None:
+                # With a store the planets come from it below, all records at once
+                longitude[index] = [calc(jdet, planet_id, FLAGS)[0][0] for planet_id in planet_ids]
+            jd[index] = jdet
+            success[index] = True
+        except Exception as e:
+            errors[index] = e
+
+    if store is not None and success.any():
+        for column, name in enumerate(PLANETS):
+            longitude[success, column] = store.positions(jd[success], name)[0]
+
+    return jd, ascendant, longitude, success, errors
+
+@timed('batch.build')
+def build_charts(ascendants, longitudes):
+    # build_chart for a whole array of charts: the sign / nakshatra / house / dignity
+    # work is one vectorized pass (same formulas, so the same values), leaving only
+    # the dictionaries to fill in per chart
+    classified = classify_longitudes(longitudes, ascendants)
+    dignity = classify_dignities(PLANET_ROWS, classified['sign_index'])
+    asc_signs = (np.asarray(ascendants) / SIGN_SIZE).astype(np.int64) % 12
+
+    columns = zip(
+        ascendants.tolist(), asc_signs.tolist(), longitudes.tolist(),
+        classified['sign_index'].tolist(), classified['degree_in_sign'].tolist(),
+        classified['nakshatra_index'].tolist(), classified['pada'].tolist(),
+        classified['degree_in_nak'].tolist(), dignity.tolist(), classified['house'].tolist()
+    )
+
+    charts = []
+    for ascendant, asc_sign, degrees, signs, in_sign, naks, padas, in_nak, codes, houses in columns:
+        planet_data = {}
+        for i, name in enumerate(PLANETS):
+            planet_data[name] = {
+                'degree': degrees[i],
+                'sign': SIGNS[signs[i]],
+                'degree_in_sign': in_sign[i],
+                'nakshatra': NAKSHATRAS[naks[i]],
+                'pada': padas[i],
+                'degree_in_nak': in_nak[i],
+                'dignity': DIGNITY_LABELS[codes[i]],
+                'strength_range': STRENGTH_RANGES[codes[i]],
+                'house': houses[i]
+            }
+
+        charts.append({
+            'ascendant': ascendant,
+            'planets': planet_data,
+            'houses': {house: dict(info) for house, info in HOUSES_BY_SIGN[asc_sign].items()}
+        })
+
+    return charts
+
+def compute_charts(records):
+    # Python-level batch API: a list of birth records in, a list of results out (same order)
+    _, ascendant, longitude, success, errors = calc_batch_positions(records)
+
+    results = [None] * len(records)
+    for index, e in errors.items():
+        results[index] = error_result(index, e)
+
+    charts = build_charts(ascendant[success], longitude[success])
+    for index, chart in zip(np.flatnonzero(success).tolist(), charts):
+        results[index] = chart_result(chart)
+
+    return results
+
+def compute_charts_compact(records):
+    # Same calculation as compute_charts, returned as NumPy arrays (one row per record,
+    # one column per planet in PLANETS order) with sign/nakshatra/dignity as small-int codes.
+    # Much cheaper to hold, pickle and ship between processes than the chart dictionaries.
+    jd, ascendant, longitude, success, errors = calc_batch_positions(records)
+    classified = classify_longitudes(longitude, ascendant)
+
+    return {
+        'jd': jd,
+        'ascendant': ascendant,
+        'longitude': longitude,
+        'sign': classified['sign_index'],
+        'nakshatra': classified['nakshatra_index'],
+        'pada': classified['pada'],
+        'house': classified['house'],
+        'dignity': classify_dignities(PLANET_ROWS, classified['sign_index']),
+        'success': success,
+        'errors': {index: {'error': str(e), 'error_type': type(e).__name__} for index, e in errors.items()}
+    }
+
+def chunked(records, size):
+    # Lists of up to `size` records from any iterable
+    records = iter(records)
+    while True:
+        chunk = list(islice(records, size))
+        if not chunk:
+            return
+        yield chunk
+
+def parse_ndjson(text):
+    # One JSON birth record per line, blank lines are skipped
+    records = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line))
+        except ValueError as e:
+            records.append(ValueError(f'Invalid JSON line: {e}'))
+    return records
+
+def register_batch_routes(app):
+
+    @app.route('/api/charts/batch', methods=['POST'])
+    def calculate_charts_batch():
+        # Expects a JSON array of birth records, {"records": [...]} or NDJSON (one record per line)
+        try:
+            if request.mimetype in NDJSON_TYPES:
+                records = parse_ndjson(request.get_data(as_text=True))
+            else:
+                data = request.get_json(silent=True)
+                records = data.get('records') if isinstance(data, dict) else data
+
+            if not isinstance(records, list):
+                return jsonify({
+                    'success': False,
+                    'error': 'Expected a JSON array of birth records'
+                }), 400
+
+            if len(records) > MAX_RECORDS:
+                return jsonify({
+                    'success': False,
+                    'error': f'At most {MAX_RECORDS} records per request'
+                }), 400
+
+            # Stream the results back one per line if the client asked for NDJSON
+            if request.accept_mimetypes.best in NDJSON_TYPES:
+                lines = (json.dumps(result) + '\n' for result in iter_charts(records))
+                return Response(lines, mimetype='application/x-ndjson')
+
+            results = compute_charts(records)
+
+            return respond({
+                'success': True,
+                'count': len(results),
+                'failed': sum(1 for result in results if not result['success']),
+                'results': results
+            })
+
+        except Exception as e:
+            return jsonify({
+                'success': False,
+                'error': str(e),
+                'error_type': type(e).__name__
+            }), 400
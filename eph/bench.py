@@ -0,0 +1,434 @@
+import argparse
+import gzip
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+# The Flask benchmark measures the calculation, not the chart cache
+os.environ.setdefault('CHART_CACHE', 'off')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import numpy as np
+import swisseph as swe
+
+from chart import (
+    PLANETS, NAKSHATRAS, DEFAULT_EPHE_PATH, FLAGS, get_sign, get_nakshatra, get_houses,
+    get_planet_house, build_chart, classify_dignities, set_sidereal_mode, parse_birth_data,
+    calc_positions
+)
+from classify import classify_longitudes
+from batch import PLANET_ROWS
+from model import ChartArray
+from dasha import DashaCalculator
+from transits import transit_positions, overlay
+import serialize
+
+########################## Benchmarks ##########################
+# Run from the eph directory, entirely offline against the bundled ephe_data files:
+#
+#   python bench.py                              # corpora of 1 and 1,000 records
+#   python bench.py --sizes 1,1000,100000 -o results.json
+#   python bench.py --baseline results.json      # compare, exit 1 on a regression
+#
+# Every corpus is generated from a fixed seed, so two runs time the same inputs.
+
+SEED = 2026
+DEFAULT_SIZES = (1, 1000)
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+#################### Corpora ###################
+
+def birth_corpus(n, seed=SEED):
+    # Birth records in the /api/chart request shape, 1900-2099 (inside the bundled files)
+    rng = np.random.default_rng(seed)
+    years = rng.integers(1900, 2100, n)
+    months = rng.integers(1, 13, n)
+    days = rng.integers(1, 29, n)
+    hours = rng.integers(0, 24, n)
+    minutes = rng.integers(0, 60, n)
+    seconds = rng.integers(0, 60, n)
+    tzoffsets = rng.integers(-24, 25, n) / 2
+    lats = rng.uniform(-60, 60, n)
+    lons = rng.uniform(-180, 180, n)
+
+    return [{
+        'year': int(years[i]), 'month': int(months[i]), 'day': int(days[i]),
+        'hour': int(hours[i]), 'mins': int(minutes[i]), 'secs': int(seconds[i]),
+        'tzoffset': float(tzoffsets[i]), 'lat': float(lats[i]), 'lon': float(lons[i]), 'hsys': 'W'
+    } for i in range(n)]
+
+def dasha_corpus(n, seed=SEED):
+    # DashaCalculators for random natives, Moon nakshatras named as /api/chart names them
+    rng = np.random.default_rng(seed)
+
+    births = rng.integers(datetime(1900, 1, 1).toordinal(), datetime(2100, 1, 1).toordinal(), n)
+    naks = rng.integers(0, len(NAKSHATRAS), n)
+    degrees = rng.uniform(0, 13.33, n)
+
+    return [DashaCalculator(datetime.fromordinal(int(births[i])), float(degrees[i]), NAKSHATRAS[naks[i]])
+            for i in range(n)]
+
+#################### Runner ###################
+
+# A regression check only counts benchmarks with at least MIN_SAMPLES samples on both
+# sides, and needs both the median and the fastest sample to be slower than the
+# baseline's median by the threshold. A sample repeats func() until it has run for
+# MIN_SAMPLE_SECONDS (like timeit's autorange), so n=1 benchmarks aren't one-shot timings
+MIN_SAMPLES = 5
+MIN_SAMPLE_SECONDS = 0.02
+
+def measure(name, size, func, repeat):
+    # Median of `repeat` samples of func() (which does `size` operations). The extra
+    # warm-up run (imports, caches, ephemeris file pages) is skipped for single runs.
+    calls = 1
+    if repeat > 1:
+        elapsed = timed(func)[1]
+        while elapsed * calls < MIN_SAMPLE_SECONDS:
+            calls *= 2
+
+    def sample():
+        start = time.perf_counter()
+        for _ in range(calls):
+            func()
+        return (time.perf_counter() - start) / calls
+
+    samples = [sample() for _ in range(repeat)]
+    median = statistics.median(samples)
+    return {
+        'name': name,
+        'size': size,
+        'seconds': median,
+        'best_seconds': min(samples),
+        'samples': repeat,
+        'calls_per_sample': calls,
+        'seconds_per_op': median / size,
+        'ops_per_second': size / median if median else None
+    }
+
+def bench_flask_chart(records):
+    # POST /api/chart through the Flask test client, one request per record
+    from main import app
+    swe.set_ephe_path(DEFAULT_EPHE_PATH)
+    client = app.test_client()
+
+    def run():
+        for record in records:
+            response = client.post('/api/chart', json=record)
+            if response.status_code != 200:
+                raise RuntimeError(response.get_data(as_text=True))
+    return run
+
+def bench_ephemeris(records):
+    # Raw positions (houses_ex2 + 8 calc calls) for already converted julian days
+    parsed = [parse_birth_data(record) for record in records]
+
+    def run():
+        set_sidereal_mode()
+        for jdet, lat, lon, hsys in parsed:
+            calc_positions(jdet, lat, lon, hsys)
+    return run
+
+def bench_lookups(records, seed=SEED):
+    # get_sign / get_nakshatra / get_houses + get_planet_house for every planet of every chart
+    rng = np.random.default_rng(seed)
+    longitudes = rng.uniform(0, 360, (len(records), len(PLANETS))).tolist()
+    ascendants = rng.uniform(0, 360, len(records)).tolist()
+
+    def run():
+        for ascendant, degrees in zip(ascendants, longitudes):
+            houses = get_houses(ascendant)
+            for degree in degrees:
+                get_sign(degree)
+                get_nakshatra(degree)
+                get_planet_house(degree, houses)
+    return run
+
+def bench_dashas(calculators):
+    # The three levels the dasha routes serve, for the first mahadasha of each native
+    firsts = [calculator.calculate_mahadashas()[0] for calculator in calculators]
+    antars = [calculator.calculate_antardashas(maha['planet'], maha['start_date'], maha['years'])[0]
+              for calculator, maha in zip(calculators, firsts)]
+
+    def mahadashas():
+        for calculator in calculators:
+            calculator.calculate_mahadashas()
+
+    def antardashas():
+        for calculator, maha in zip(calculators, firsts):
+            calculator.calculate_antardashas(maha['planet'], maha['start_date'], maha['years'])
+
+    def pratyantardashas():
+        for calculator, maha, antar in zip(calculators, firsts, antars):
+            calculator.calculate_pratyantardashas(maha['planet'], antar['planet'], antar['start_date'], antar['years'])
+
+    return {'mahadashas': mahadashas, 'antardashas': antardashas, 'pratyantardashas': pratyantardashas}
+
+def bench_json(records):
+    # encode_json of the /api/chart payload for each chart
+    set_sidereal_mode()
+    payloads = [{'success': True, **build_chart(*calc_positions(*parse_birth_data(record)))}
+                for record in records]
+
+    def run():
+        for payload in payloads:
+            serialize.encode_json(payload)
+    return run
+
+def bench_transit_overlay(records, seed=SEED):
+    # One transit moment against `size` natives (random natal ascendants and Moons)
+    rng = np.random.default_rng(seed)
+    ascendants = rng.uniform(0, 360, len(records))
+    moons = rng.uniform(0, 360, len(records))
+    jdet = parse_birth_data(records[0])[0]
+
+    def run():
+        overlay(transit_positions(jdet), ascendants, moons)
+    return run
+
+def run_suite(sizes, repeat=MIN_SAMPLES, skip=()):
+    results = []
+    for size in sizes:
+        records = birth_corpus(size)
+        # The Flask and JSON paths are the slow ones; one run is plenty for big corpora
+        # (reported, but too few samples for the --baseline check)
+        runs = repeat if size <= 1000 else 1
+
+        suite = {
+            'flask_chart': lambda: bench_flask_chart(records),
+            'ephemeris': lambda: bench_ephemeris(records),
+            'lookups': lambda: bench_lookups(records),
+            'json_chart': lambda: bench_json(records),
+            'transit_overlay': lambda: bench_transit_overlay(records)
+        }
+        for name, make in suite.items():
+            if name not in skip:
+                results.append(measure(name, size, make(), runs))
+
+        if 'dasha' not in skip:
+            for name, func in bench_dashas(dasha_corpus(size)).items():
+                results.append(measure(f'dasha_{name}', size, func, runs))
+
+    return results
+
+#################### Vectorized / Memory / Encodings ###################
+
+def scalar_classify(longitudes, ascendants):
+    rows = []
+    for degree, ascendant in zip(longitudes, ascendants):
+        houses = get_houses(ascendant)
+        sign, degree_in_sign = get_sign(degree)
+        nakshatra, pada, degree_in_nak = get_nakshatra(degree)
+        rows.append((sign, degree_in_sign, nakshatra, pada, degree_in_nak, get_planet_house(degree, houses)))
+    return rows
+
+def bench_classification(n, seed=0):
+    # Same random longitudes through the scalar helpers and the vectorized engine
+    rng = np.random.default_rng(seed)
+    longitudes = rng.uniform(0, 360, n)
+    ascendants = rng.uniform(0, 360, n)
+
+    _, scalar_time = timed(scalar_classify, longitudes.tolist(), ascendants.tolist())
+    _, vector_time = timed(classify_longitudes, longitudes, ascendants)
+
+    return {
+        'name': 'classification',
+        'n': n,
+        'scalar_seconds': scalar_time,
+        'vector_seconds': vector_time,
+        'speedup': scalar_time / vector_time
+    }
+
+def allocated(func, *args):
+    # Bytes still allocated by what func returns
+    tracemalloc.start()
+    result = func(*args)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+def bench_chart_memory(n, seed=0):
+    # Per-chart footprint: the chart dictionaries vs the compact ChartArray
+    rng = np.random.default_rng(seed)
+    ascendants = rng.uniform(0, 360, n)
+    longitudes = rng.uniform(0, 360, (n, len(PLANETS)))
+
+    def as_dicts():
+        return [build_chart(asc, lons) for asc, lons in zip(ascendants.tolist(), longitudes.tolist())]
+
+    def as_array():
+        classified = classify_longitudes(longitudes, ascendants)
+        return ChartArray.from_compact({
+            'jd': np.zeros(n),
+            'ascendant': ascendants,
+            'longitude': longitudes,
+            'sign': classified['sign_index'],
+            'nakshatra': classified['nakshatra_index'],
+            'pada': classified['pada'],
+            'house': classified['house'],
+            'dignity': classify_dignities(PLANET_ROWS, classified['sign_index']),
+            'success': np.ones(n, dtype=bool),
+            'errors': {}
+        })
+
+    _, dict_bytes = allocated(as_dicts)
+    _, array_bytes = allocated(as_array)
+
+    return {
+        'name': 'chart_memory',
+        'n': n,
+        'dict_bytes_per_chart': dict_bytes / n,
+        'array_bytes_per_chart': array_bytes / n,
+        'reduction': dict_bytes / array_bytes
+    }
+
+def dasha_payload():
+    # Every pratyantardasha of one native, the biggest list the dasha routes send
+    calculator = DashaCalculator(datetime(2000, 6, 16), 6.95, 'Jyeshtha')
+    rows = []
+    for maha in calculator.calculate_mahadashas():
+        for antar in calculator.calculate_antardashas(maha['planet'], maha['start_date'], maha['years']):
+            rows.extend(calculator.calculate_pratyantardashas(
+                maha['planet'], antar['planet'], antar['start_date'], antar['years']))
+    return {'pratyantardashas': rows}
+
+def bench_serialization(repeat=20, seed=0):
+    # CPU and bytes for each response encoding, on a dasha list and a batch of charts
+    rng = np.random.default_rng(seed)
+    charts = [{'success': True, **build_chart(asc, lons)} for asc, lons in
+              zip(rng.uniform(0, 360, 500).tolist(), rng.uniform(0, 360, (500, len(PLANETS))).tolist())]
+    payloads = {'dashas': dasha_payload(), 'batch': {'success': True, 'results': charts}}
+
+    encoders = {'json': lambda p: (json.dumps(p, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')}
+    if serialize.orjson is not None:
+        encoders['orjson'] = lambda p: serialize.orjson.dumps(serialize.orjson_ready(p))
+        encoders['orjson_columnar'] = lambda p: serialize.orjson.dumps(serialize.orjson_ready(serialize.columnar(p)))
+    if serialize.msgpack is not None:
+        encoders['msgpack'] = serialize.encode_msgpack
+        encoders['msgpack_columnar'] = lambda p: serialize.encode_msgpack(serialize.columnar(p))
+
+    results = []
+    for payload_name, payload in payloads.items():
+        for encoder_name, encode in encoders.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                body = encode(payload)
+            seconds = (time.perf_counter() - start) / repeat
+
+            results.append({
+                'name': f'serialize_{payload_name}_{encoder_name}',
+                'seconds': seconds,
+                'bytes': len(body),
+                'gzip_bytes': len(gzip.compress(body, compresslevel=5))
+            })
+    return results
+
+#################### Output / Baselines ###################
+
+def check_offline():
+    # Swiss Ephemeris silently falls back to the (less precise) Moshier ephemeris when
+    # a file is missing; the numbers would not be comparable, so refuse to run.
+    swe.set_ephe_path(DEFAULT_EPHE_PATH)
+    for jd in (swe.julday(1900, 1, 1), swe.julday(2099, 12, 31)):
+        for planet_id in PLANETS.values():
+            if not swe.calc(jd, planet_id, FLAGS)[1] & swe.FLG_SWIEPH:
+                raise SystemExit(f'Bundled ephemeris files missing from {DEFAULT_EPHE_PATH}')
+
+def environment():
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'pyswisseph': swe.version,
+        'numpy': np.__version__,
+        'orjson': serialize.FAST_JSON,
+        'seed': SEED
+    }
+
+def compare(results, baseline, threshold):
+    # (name, size, baseline s/op, current s/op, change, regressed, gated) for every
+    # benchmark in both runs. Only gated rows (enough samples on both sides) can regress.
+    before = {(row['name'], row['size']): row for row in baseline['results']}
+    rows = []
+    for row in results:
+        key = (row['name'], row['size'])
+        if key in before:
+            old = before[key]
+            change = row['seconds_per_op'] / old['seconds_per_op'] - 1
+            gated = min(row.get('samples', 1), old.get('samples', 1)) >= MIN_SAMPLES
+            best_change = row['best_seconds'] / row['size'] / old['seconds_per_op'] - 1
+            regressed = gated and change > threshold and best_change > threshold
+            rows.append((*key, old['seconds_per_op'], row['seconds_per_op'], change, regressed, gated))
+    return rows
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the chart, dasha and classification hot paths')
+    parser.add_argument('--sizes', default=','.join(map(str, DEFAULT_SIZES)),
+                        help='corpus sizes, e.g. 1,1000,100000')
+    parser.add_argument('--repeat', type=int, default=MIN_SAMPLES,
+                        help=f'samples per benchmark, the median is kept (--baseline checks need {MIN_SAMPLES}+)')
+    parser.add_argument('--skip', default='', help='comma separated: flask_chart,ephemeris,lookups,json_chart,transit_overlay,dasha')
+    parser.add_argument('-o', '--output', help='write the results as JSON')
+    parser.add_argument('--baseline', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='slowdown counted as a regression')
+    parser.add_argument('--extras', action='store_true',
+                        help='also run the vectorized classification, memory and encoding comparisons')
+    parser.add_argument('-n', type=int, default=1_000_000, help='number of longitudes for --extras')
+    args = parser.parse_args()
+
+    check_offline()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    skip = set(filter(None, args.skip.split(',')))
+    report = {'environment': environment(), 'results': run_suite(sizes, args.repeat, skip)}
+
+    for row in report['results']:
+        print(f"{row['name']:25} n={row['size']:<8} {row['seconds_per_op'] * 1e6:10.2f} µs/op"
+              f"  {row['ops_per_second']:12,.0f} ops/s", file=sys.stderr)
+
+    if args.extras:
+        classification = bench_classification(args.n)
+        print(f"{classification['name']:15} n={classification['n']:<10} scalar {classification['scalar_seconds']:.3f}s"
+              f"  vector {classification['vector_seconds']:.3f}s  speedup {classification['speedup']:.1f}x", file=sys.stderr)
+
+        encodings = bench_serialization()
+        for result in encodings:
+            print(f"{result['name']:32} {result['seconds'] * 1000:8.2f} ms  {result['bytes']:>10,} B"
+                  f"  gzip {result['gzip_bytes']:>9,} B", file=sys.stderr)
+
+        memory = bench_chart_memory(min(args.n, 100_000))
+        print(f"{memory['name']:15} n={memory['n']:<10} dicts {memory['dict_bytes_per_chart']:,.0f} B/chart"
+              f"  array {memory['array_bytes_per_chart']:,.0f} B/chart  {memory['reduction']:.0f}x smaller",
+              file=sys.stderr)
+
+        report['extras'] = {'classification': classification, 'serialization': encodings, 'chart_memory': memory}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        print(f"\nvs {args.baseline} ({baseline['environment']['timestamp']})", file=sys.stderr)
+        for name, size, before, after, change, regressed, gated in compare(report['results'], baseline, args.threshold):
+            print(f"{name:25} n={size:<8} {before * 1e6:10.2f} -> {after * 1e6:10.2f} µs/op  {change:+7.1%}"
+                  + ('  REGRESSION' if regressed else '' if gated else f'  (under {MIN_SAMPLES} samples, not checked)'),
+                  file=sys.stderr)
+            if regressed:
+                regressions.append(name)
+
+    if not args.output:
+        print(json.dumps(report, indent=2))
+
+    sys.exit(1 if regressions else 0)
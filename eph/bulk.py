@@ -0,0 +1,220 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+from chart import PLANETS, EPHE_PATH, configure_ephemeris
+from batch import compute_charts, chunked
+from workers import ChartPool
+
+# Run from the eph directory:
+#   python bulk.py births.csv -o charts.ndjson
+#   python bulk.py births.ndjson --format csv -o charts.csv
+#   cat births.ndjson | python bulk.py - --input-format ndjson > charts.ndjson
+#   python bulk.py births.csv -o charts.ndjson --workers 16
+
+INT_FIELDS = ('year', 'month', 'day', 'hour', 'mins', 'secs')
+FLOAT_FIELDS = ('lat', 'lon', 'tzoffset')
+
+PLANET_FIELDS = ('degree', 'sign', 'degree_in_sign', 'nakshatra', 'pada', 'degree_in_nak',
+                 'dignity', 'strength_range', 'house')
+
+# Flat column layout shared by the CSV and Parquet writers
+COLUMNS = ['index', 'id', 'success', 'error', 'ascendant'] + [
+    f'{planet}_{field}' for planet in PLANETS for field in PLANET_FIELDS
+]
+
+#################### Input ###################
+
+def open_input(path):
+    return sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+
+def read_csv(stream):
+    # CSV values are strings, so convert the numeric columns. A bad row becomes
+    # an exception in the stream and fails on its own later.
+    for row in csv.DictReader(stream):
+        try:
+            for field in INT_FIELDS:
+                row[field] = int(row[field])
+            for field in FLOAT_FIELDS:
+                row[field] = float(row[field])
+            yield row
+        except (KeyError, ValueError, TypeError) as e:
+            yield ValueError(f'Invalid CSV row: {e}')
+
+def read_ndjson(stream):
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f'Invalid JSON line: {e}')
+
+def read_records(stream, input_format):
+    return read_csv(stream) if input_format == 'csv' else read_ndjson(stream)
+
+#################### Pipeline ###################
+
+def chart_stream(records, chunk_size, pool=None):
+    # Only a bounded number of chunks of records/results are held at a time, whatever the file size
+    chunks = chunked(records, chunk_size)
+    if pool is None:
+        chunk_results = ((chunk, compute_charts(chunk)) for chunk in chunks)
+    else:
+        chunk_results = pool.map_chunks(chunks)
+
+    offset = 0
+    for chunk, results in chunk_results:
+        for i, (record, result) in enumerate(zip(chunk, results)):
+            result['index'] = offset + i
+            if isinstance(record, dict) and 'id' in record:
+                result['id'] = record['id']
+
+        yield results
+        offset += len(chunk)
+
+def flatten(result):
+    row = {
+        'index': result['index'],
+        'id': result.get('id'),
+        'success': result['success'],
+        'error': result.get('error'),
+        'ascendant': result.get('ascendant')
+    }
+    for planet, info in result.get('planets', {}).items():
+        for field in PLANET_FIELDS:
+            row[f'{planet}_{field}'] = info[field]
+    return row
+
+#################### Output ###################
+
+class NdjsonWriter:
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, results):
+        self.stream.write(''.join(json.dumps(result) + '\n' for result in results))
+
+    def close(self):
+        self.stream.flush()
+
+class CsvWriter:
+    def __init__(self, stream):
+        self.stream = stream
+        self.writer = csv.DictWriter(stream, fieldnames=COLUMNS)
+        self.writer.writeheader()
+
+    def write(self, results):
+        self.writer.writerows(flatten(result) for result in results)
+
+    def close(self):
+        self.stream.flush()
+
+class ParquetWriter:
+    # Columnar output, one row group per chunk. Needs pyarrow.
+    def __init__(self, path):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise SystemExit('Parquet output needs pyarrow (pip install pyarrow)')
+
+        if path == '-':
+            raise SystemExit('Parquet output needs a file (-o)')
+
+        self.pa = pyarrow
+        self.path = path
+        self.writer = None
+
+    def write(self, results):
+        rows = [flatten(result) for result in results]
+        table = self.pa.table({column: [row.get(column) for row in rows] for column in COLUMNS})
+
+        if self.writer is None:
+            self.writer = self.pa.parquet.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table.cast(self.writer.schema))
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+def open_writer(output, output_format):
+    if output_format == 'parquet':
+        return ParquetWriter(output), None
+
+    stream = sys.stdout if output == '-' else open(output, 'w', newline='', encoding='utf-8')
+    writer = CsvWriter(stream) if output_format == 'csv' else NdjsonWriter(stream)
+    return writer, stream
+
+#################### Command Line ###################
+
+def guess_format(path, default):
+    for extension, name in (('.csv', 'csv'), ('.ndjson', 'ndjson'), ('.jsonl', 'ndjson'), ('.parquet', 'parquet')):
+        if path.endswith(extension):
+            return name
+    return default
+
+def run(input_path, output, input_format, output_format, chunk_size, progress=sys.stderr,
+        workers=1, ephe_path=EPHE_PATH):
+    total = failed = 0
+    started = time.perf_counter()
+
+    writer, stream = open_writer(output, output_format)
+    source = open_input(input_path)
+    pool = ChartPool(workers, ephe_path=ephe_path) if workers > 1 else None
+    try:
+        for results in chart_stream(read_records(source, input_format), chunk_size, pool):
+            writer.write(results)
+
+            total += len(results)
+            failed += sum(1 for result in results if not result['success'])
+
+            if progress:
+                elapsed = time.perf_counter() - started
+                progress.write(f"{total:>12,} charts  {failed:>8,} failed  {total / elapsed:>10,.0f} charts/s\n")
+    finally:
+        if pool is not None:
+            pool.close()
+        writer.close()
+        if source is not sys.stdin:
+            source.close()
+        if stream is not None and stream is not sys.stdout:
+            stream.close()
+
+    elapsed = time.perf_counter() - started
+    return {
+        'charts': total,
+        'failed': failed,
+        'seconds': round(elapsed, 3),
+        'charts_per_second': round(total / elapsed, 1) if elapsed else None
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Calculate charts for a CSV/NDJSON file of birth records')
+    parser.add_argument('input', help="CSV or NDJSON birth records ('-' for stdin)")
+    parser.add_argument('-o', '--output', default='-', help="output file ('-' for stdout)")
+    parser.add_argument('--input-format', choices=['csv', 'ndjson'])
+    parser.add_argument('--format', dest='output_format', choices=['ndjson', 'csv', 'parquet'])
+    parser.add_argument('--chunk-size', type=int, default=2_000, help='records held in memory at once')
+    parser.add_argument('--quiet', action='store_true', help='no progress report')
+    parser.add_argument('--ephe-path', default=EPHE_PATH, help='directory with the .se1 files')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes (0 = one per CPU)')
+    args = parser.parse_args(argv)
+
+    configure_ephemeris(args.ephe_path)
+
+    input_format = args.input_format or guess_format(args.input, 'ndjson')
+    output_format = args.output_format or guess_format(args.output, 'ndjson')
+
+    summary = run(args.input, args.output, input_format, output_format, args.chunk_size,
+                  progress=None if args.quiet else sys.stderr,
+                  workers=args.workers or os.cpu_count(), ephe_path=args.ephe_path)
+
+    print(json.dumps(summary), file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+#################### Chart Result Cache ###################
+# Finished /api/chart responses (the serialized JSON bytes) keyed on the normalized
+# birth inputs, so a repeat request skips the whole calculation.
+
+DEFAULT_MAX_ENTRIES = 10_000
+
+def make_chart_key(jdet, lat, lon, hsys, ayanamsa, flags, vargas=None):
+    # Julian day to ~1 ms and coordinates to ~10 cm, so float noise doesn't split entries
+    if isinstance(hsys, bytes):
+        hsys = hsys.decode('ascii')
+    key = f"{jdet:.8f}|{lat:.6f}|{lon:.6f}|{hsys}|{ayanamsa}|{flags}"
+    return key + '|' + ','.join(vargas) if vargas else key
+
+class MemoryBackend:
+    # In-process LRU: an OrderedDict with the most recently used entry at the end
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        # Returns (value, stored_at) or None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, value):
+        # Returns how many entries were evicted to make room
+        with self.lock:
+            self.entries[key] = (value, time.time())
+            self.entries.move_to_end(key)
+
+            evicted = 0
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                evicted += 1
+            return evicted
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+class SqliteBackend:
+    # File-backed LRU that survives restarts. last_used orders the evictions.
+
+    def __init__(self, path, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS charts ('
+            'key TEXT PRIMARY KEY, value BLOB, stored_at REAL, last_used REAL)'
+        )
+        self.db.execute('CREATE INDEX IF NOT EXISTS charts_last_used ON charts (last_used)')
+        self.db.commit()
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute('SELECT value, stored_at FROM charts WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute('UPDATE charts SET last_used = ? WHERE key = ?', (time.time(), key))
+            self.db.commit()
+            return bytes(row[0]), row[1]
+
+    def set(self, key, value):
+        with self.lock:
+            now = time.time()
+            self.db.execute(
+                'INSERT OR REPLACE INTO charts (key, value, stored_at, last_used) VALUES (?, ?, ?, ?)',
+                (key, value, now, now)
+            )
+
+            evicted = 0
+            extra = self.db.execute('SELECT COUNT(*) FROM charts').fetchone()[0] - self.max_entries
+            if extra > 0:
+                evicted = self.db.execute(
+                    'DELETE FROM charts WHERE key IN '
+                    '(SELECT key FROM charts ORDER BY last_used LIMIT ?)', (extra,)
+                ).rowcount
+            self.db.commit()
+            return evicted
+
+    def delete(self, key):
+        with self.lock:
+            self.db.execute('DELETE FROM charts WHERE key = ?', (key,))
+            self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.db.execute('DELETE FROM charts')
+            self.db.commit()
+
+    def __len__(self):
+        with self.lock:
+            return self.db.execute('SELECT COUNT(*) FROM charts').fetchone()[0]
+
+class ChartCache:
+
+    def __init__(self, backend=None, ttl=None, enabled=True):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttl = ttl # seconds, None keeps entries until they are evicted
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expired = 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+
+        entry = self.backend.get(key)
+
+        if entry is not None and self.ttl is not None and time.time() - entry[1] > self.ttl:
+            self.backend.delete(key)
+            self.expired += 1
+            entry = None
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key, value):
+        if self.enabled:
+            self.evictions += self.backend.set(key, value)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'backend': type(self.backend).__name__,
+            'entries': len(self.backend),
+            'max_entries': self.backend.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expired': self.expired,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else None
+        }
+
+def cache_from_env():
+    # CHART_CACHE=off disables it, CHART_CACHE_BACKEND=memory|sqlite,
+    # CHART_CACHE_PATH (sqlite file), CHART_CACHE_SIZE (entries), CHART_CACHE_TTL (seconds)
+    enabled = os.environ.get('CHART_CACHE', 'on').lower() not in ('off', '0', 'false')
+    max_entries = int(os.environ.get('CHART_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+    ttl = os.environ.get('CHART_CACHE_TTL')
+    ttl = float(ttl) if ttl else None
+
+    if os.environ.get('CHART_CACHE_BACKEND', 'memory').lower() == 'sqlite':
+        path = os.environ.get('CHART_CACHE_PATH', 'chart_cache.sqlite3')
+        backend = SqliteBackend(path, max_entries)
+    else:
+        backend = MemoryBackend(max_entries)
+
+    return ChartCache(backend, ttl, enabled)
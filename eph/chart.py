@@ -0,0 +1,586 @@
+import bisect
+import os
+import threading
+
+import swisseph as swe
+
+from classify import SIGN_SIZE, sign_position, nakshatra_position, ascendant_sign, house_number
+from metrics import stage, timed
+import ephe_files
+
+######################## Arrays and Dictionaries ###################
+# A dictionary mapping string names to integar constants 
+PLANETS = {
+    'Sun': swe.SUN,
+    'Moon': swe.MOON,
+    'Mars': swe.MARS,
+    'Mercury': swe.MERCURY,
+    'Jupiter': swe.JUPITER,
+    'Venus': swe.VENUS,
+    'Saturn': swe.SATURN,
+    'Rahu': swe.MEAN_NODE  # or TRUE_NODE
+}
+
+SIGNS = [
+    'Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo', 'Libra', 
+    'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces'
+]
+
+NAKSHATRAS = [
+    'Ashwini', 'Bharani', 'Krittika', 'Rohini', 'Mrigashira', 'Ardra',
+    'Punarvasu', 'Pushya', 'Ashlesha', 'Magha', 'Purva Phalguni', 'Uttara Phalguni',
+    'Hasta', 'Chitra', 'Swati', 'Vishakha', 'Anuradha', 'Jyeshtha',
+    'Mula', 'Purva Ashadha', 'Uttara Ashadha', 'Shravana', 'Dhanishta', 'Shatabhisha',
+    'Purva Bhadrapada', 'Uttara Bhadrapada', 'Revati'
+]
+
+#################### Sign, Nakshatra And House Functions ###################
+# Thin wrappers over the classification engine in classify.py
+
+def get_sign(degree):
+    sign_num, degree_in_sign = sign_position(degree)
+    return SIGNS[sign_num], degree_in_sign
+
+def get_nakshatra(degree):
+    nak_num, pada, degree_in_nak = nakshatra_position(degree)
+    return NAKSHATRAS[nak_num], pada, degree_in_nak
+
+# Calculate houses
+def get_houses(ascendant_degree):
+    asc_sign_num = ascendant_sign(ascendant_degree)
+
+    houses = {}
+
+    for house_num in range(1, 13):
+        sign_num = (asc_sign_num + house_num - 1) % 12
+
+        houses[house_num] = {
+            'sign': SIGNS[sign_num],
+            'sign_number': sign_num,
+            'start_degree': sign_num * 30,
+            'end_degree': (sign_num * 30 + 30) % 360
+        }
+
+    return houses
+
+def get_planet_house(planet_degree, houses):
+    planet_sign_num, _ = sign_position(planet_degree)
+
+    # House 1 holds the ascendant's sign, every other house follows in order
+    return house_number(planet_sign_num, houses[1]['sign_number'])
+
+#################### Planet Strengths ###################
+
+class PlanetaryStrength:
+
+    exaltations = {
+        'Sun': 'Aries',
+        'Moon': 'Taurus',
+        'Mars': 'Capricorn',
+        'Mercury': 'Virgo',
+        'Jupiter': 'Cancer',
+        'Venus': 'Pisces',
+        'Saturn': 'Libra',
+        'Rahu': 'Scorpio',
+        'Ketu': 'Scorpio'
+    }
+
+    debilitations = {
+        'Sun': 'Libra',
+        'Moon': 'Scorpio',
+        'Mars': 'Cancer',
+        'Mercury': 'Pisces',
+        'Jupiter': 'Capricorn',
+        'Venus': 'Virgo',
+        'Saturn': 'Aries',
+        'Rahu': 'Taurus',
+        'Ketu': 'Taurus'
+    }
+
+    exalt_debil_degree = {
+        'Sun': 10,
+        'Moon': 3,
+        'Mars': 28,
+        'Mercury': 15,
+        'Jupiter': 5,
+        'Venus': 27,
+        'Saturn': 20,
+        'Rahu': None, 
+        'Ketu': None
+    }
+
+    positive_constellation = {
+        'Sun': 'Leo',
+        'Moon': 'Cancer',
+        'Mars': 'Aries',
+        'Mercury': 'Gemini',
+        'Jupiter': 'Sagittarius',
+        'Venus': 'Libra',
+        'Saturn': 'Aquarius',
+        'Rahu': None, 
+        'Ketu': None
+    }
+
+    negative_constellation = {
+        'Sun': None,
+        'Moon': None,
+        'Mars': 'Scorpio',
+        'Mercury': 'Virgo',
+        'Jupiter': 'Pisces',
+        'Venus': 'Taurus',
+        'Saturn': 'Capricorn',
+        'Rahu': None, 
+        'Ketu': None
+    }
+
+    mulatrikona = {
+        'Sun': 'Leo',
+        'Moon': 'Taurus',
+        'Mars': 'Aries',
+        'Mercury': 'Virgo',
+        'Jupiter': 'Sagittarius',
+        'Venus': 'Libra',
+        'Saturn': 'Aquarius',
+        'Rahu': None, 
+        'Ketu': None
+    }
+
+    mulatrikona_degree = {
+        'Sun': (0, 21),
+        'Moon': (4, 31),
+        'Mars': (0, 13),
+        'Mercury': (16, 21),
+        'Jupiter': (0, 11),
+        'Venus': (0, 16),
+        'Saturn': (0, 21),
+        'Rahu': None, 
+        'Ketu': None
+    }
+
+    friends = {
+        'Sun': ['Moon', 'Mars', 'Jupiter'],
+        'Moon': ['Sun', 'Mercury'],
+        'Mars': ['Sun', 'Moon', 'Jupiter'],
+        'Mercury': ['Sun', 'Venus'],
+        'Jupiter': ['Sun', 'Moon', 'Mars'],
+        'Venus': ['Mercury', 'Saturn'],
+        'Saturn': ['Mercury', 'Venus'],
+        'Rahu': [], 
+        'Ketu': []
+    }
+
+    neutrals = {
+        'Sun': ['Mercury'],
+        'Moon': ['Venus', 'Mars', 'Jupiter', 'Saturn'],
+        'Mars': ['Venus', 'Saturn'],
+        'Mercury': ['Mars', 'Saturn', 'Jupiter'],
+        'Jupiter': ['Saturn'],
+        'Venus': ['Mars', 'Jupiter'],
+        'Saturn': ['Jupiter'],
+        'Rahu': [], 
+        'Ketu': []
+    }
+
+    enemies = {
+        'Sun': ['Venus', 'Saturn'],
+        'Moon': ['None'],
+        'Mars': ['Mercury'],
+        'Mercury': ['Moon'],
+        'Jupiter': ['Mercury', 'Venus'],
+        'Venus': ['Sun', 'Moon'],
+        'Saturn': ['Sun', 'Moon', 'Mars'],
+        'Rahu': [], 
+        'Ketu': []
+    }
+
+    rulerships = {
+        'Sun': ['Leo'],
+        'Moon': ['Cancer'],
+        'Mars': ['Aries', 'Scorpio'],
+        'Mercury': ['Gemini', 'Virgo'],
+        'Jupiter': ['Sagittarius', 'Pisces'],
+        'Venus': ['Taurus', 'Libra'],
+        'Saturn': ['Capricorn', 'Aquarius'],
+        'Rahu': [], 
+        'Ketu': []
+    }
+
+    # Order of the rows in DIGNITY_TABLE
+    PLANET_ORDER = ['Sun', 'Moon', 'Mars', 'Mercury', 'Jupiter', 'Venus', 'Saturn', 'Rahu', 'Ketu']
+
+    def get_sign_ruler(self, sign):
+        return SIGN_RULERS.get(sign)
+
+    # Calculate dignity / state
+    def get_dignity(self, planet, sign, degree=None):
+        return DIGNITY_LABELS[get_dignity_code(planet, sign)]
+
+    def calculate_strength(self, planet, sign, degree=None):
+        return STRENGTH_RANGES[get_dignity_code(planet, sign)]
+
+########################## Dignity Tables ##########################
+# Every (planet, sign) dignity is worked out once at import and stored as a small
+# integer code, so the per-chart lookups are just indexing.
+
+DIGNITY_LABELS = (
+    'none', 'Exalted', 'Mulatrikona', 'Own Sign (positive)', 'Own Sign (negative)',
+    'Friend Sign', 'Neutral Sign', 'Enemy Sign', 'Debilitated'
+)
+
+STRENGTH_RANGES = (
+    'N/A', '87.5 - 100', '75 - 87.5', '62.5 - 75', '50 - 62.5',
+    '37.5 - 50', '25 - 37.5', '12.5 - 25', '0 - 12.5'
+)
+
+PLANET_INDEX = {planet: i for i, planet in enumerate(PlanetaryStrength.PLANET_ORDER)}
+SIGN_INDEX = {sign: i for i, sign in enumerate(SIGNS)}
+
+SIGN_RULERS = {}
+for planet, signs in PlanetaryStrength.rulerships.items():
+    for sign in signs:
+        SIGN_RULERS.setdefault(sign, planet)
+
+def _classify_dignity(planet, sign):
+    # The dignity rules, in priority order (only used to build DIGNITY_TABLE)
+    s = PlanetaryStrength
+
+    if s.exaltations.get(planet) == sign: # if exalted planet equals current sign
+        return 'Exalted'
+
+    elif s.mulatrikona.get(planet) == sign:
+        return 'Mulatrikona'
+
+    elif s.positive_constellation.get(planet) == sign:
+        return 'Own Sign (positive)'
+
+    elif s.negative_constellation.get(planet) == sign:
+        return 'Own Sign (negative)'
+
+    sign_ruler = SIGN_RULERS.get(sign)
+
+    if sign_ruler in s.friends.get(planet, []): # gets friends list 
+        return 'Friend Sign'
+
+    elif sign_ruler in s.neutrals.get(planet, []):
+        return 'Neutral Sign'
+
+    elif sign_ruler in s.enemies.get(planet, []):
+        return 'Enemy Sign'
+
+    elif s.debilitations.get(planet) == sign:
+        return 'Debilitated'
+
+    return 'none'
+
+# 9 planets x 12 signs of dignity codes (index into DIGNITY_LABELS / STRENGTH_RANGES).
+# Plain tuples for single lookups, indexing a NumPy array one item at a time is slower
+_DIGNITY_ROWS = tuple(
+    tuple(DIGNITY_LABELS.index(_classify_dignity(planet, sign)) for sign in SIGNS)
+    for planet in PlanetaryStrength.PLANET_ORDER
+)
+
+# NumPy is only needed by the bulk helpers, so it is imported on first use rather
+# than when the chart route starts up (DIGNITY_TABLE is built then too)
+_numpy = {}
+
+def _np():
+    if not _numpy:
+        import numpy
+        _numpy['np'] = numpy
+        _numpy['DIGNITY_TABLE'] = numpy.array(_DIGNITY_ROWS, dtype=numpy.int8)
+    return _numpy['np']
+
+def __getattr__(name):
+    if name == 'DIGNITY_TABLE':
+        _np()
+        return _numpy['DIGNITY_TABLE']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def get_dignity_code(planet, sign):
+    planet_index = PLANET_INDEX.get(planet)
+    sign_index = SIGN_INDEX.get(sign)
+
+    if planet_index is None or sign_index is None:
+        # Off-table input (unknown planet, sign=None...) goes through the rules directly
+        return DIGNITY_LABELS.index(_classify_dignity(planet, sign))
+
+    return _DIGNITY_ROWS[planet_index][sign_index]
+
+def classify_dignities(planet_indices, sign_indices):
+    # Bulk lookup: arrays of planet indices (PLANET_ORDER) and sign indices (0-11)
+    # in, an int8 array of dignity codes out
+    np = _np()
+    return _numpy['DIGNITY_TABLE'][np.asarray(planet_indices), np.asarray(sign_indices)]
+
+def dignity_labels(codes):
+    # Turn an array of dignity codes back into their labels
+    np = _np()
+    return np.array(DIGNITY_LABELS, dtype=object)[np.asarray(codes)]
+
+def strength_ranges(codes):
+    np = _np()
+    return np.array(STRENGTH_RANGES, dtype=object)[np.asarray(codes)]
+
+#################### Chart Calculation ###################
+
+# The .se1 files bundled with the project, unless EPHE_PATH points somewhere else
+DEFAULT_EPHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ephe_data')
+EPHE_PATH = os.environ.get('EPHE_PATH', DEFAULT_EPHE_PATH)
+
+# Sidereal flags used for every calculation (the ayanamsa is set by set_sidereal_mode)
+FLAGS = swe.FLG_SWIEPH | swe.FLG_SIDEREAL
+
+# Lahiri ayanamsa (most common for Vedic astrology)
+AYANAMSA = swe.SIDM_LAHIRI
+
+# Swiss Ephemeris keeps its settings per thread (pyswisseph is built with TLS): a new
+# thread, like every request of the threaded Flask server, starts with no ephemeris
+# path (so Moshier) and the Fagan/Bradley ayanamsa. set_sidereal_mode runs at the start
+# of every calculation, so it also gives each thread the configured path once.
+_ephemeris = {'path': None}
+_thread = threading.local()
+
+def set_sidereal_mode():
+    path = _ephemeris['path']
+    if path is not None and getattr(_thread, 'ephe_path', None) != path:
+        swe.set_ephe_path(path)
+        _thread.ephe_path = path
+    swe.set_sid_mode(AYANAMSA)
+
+def configure_ephemeris(path=None):
+    # Also validates and maps the .se1 files (raises EphemerisFileError for a bad one)
+    path = path or EPHE_PATH
+    ephe_files.load(path)
+    _ephemeris['path'] = path
+    set_sidereal_mode()
+
+def warm_up():
+    # Opens the ephemeris files and runs one chart through every stage, so the first
+    # request doesn't pay for it. Returns the planets Swiss Ephemeris could not find
+    # files for (it silently falls back to the less precise Moshier ephemeris).
+    jdet = get_julian_day(2000, 1, 1, 12, 0, 0, 0.0)
+    compute_chart(jdet, 0.0, 0.0, b'W')
+    return [name for name, planet_id in PLANETS.items() if not swe.calc(jdet, planet_id, FLAGS)[1] & swe.FLG_SWIEPH]
+
+@timed('chart.julian_day')
+def get_julian_day(year, month, day, hour, mins, secs, tzoffset):
+    # Get UTC "Coordinated Universal Time"
+    utc = swe.utc_time_zone(year, month, day, hour, mins, secs, tzoffset)
+
+    # Get julian day number in Universal and Ephemeris Time
+    jd_tuple = swe.utc_to_jd(*utc)
+    return jd_tuple[1]
+
+def parse_birth_data(data):
+    # Pull the birth record fields out of a request dictionary
+    jdet = get_julian_day(
+        data['year'], data['month'], data['day'],
+        data['hour'], data['mins'], data['secs'], data['tzoffset']
+    )
+    # Fail now rather than quietly falling back to Moshier outside the files' dates
+    ephe_files.check_coverage(jdet)
+    lat = data['lat']
+    lon = data['lon']
+    hsys = data['hsys']
+
+    # 'W' becomes b'W'
+    if isinstance(hsys, str):
+        hsys = hsys.encode('ascii')
+
+    return jdet, lat, lon, hsys
+
+def calc_ascendant(jdet, lat, lon, hsys):
+    with stage('chart.houses'):
+        house_data = swe.houses_ex2(jdet, lat, lon, hsys, FLAGS)
+    return house_data[1][0]
+
+def calc_positions(jdet, lat, lon, hsys):
+    # The ephemeris part of a chart: the ascendant and every planet's longitude (PLANETS order).
+    # Expects the sidereal mode to already be set (see set_sidereal_mode)
+    ascendant_degree = calc_ascendant(jdet, lat, lon, hsys)
+
+    # Get the position fron the API (first in the tuple)
+    with stage('chart.planets'):
+        degrees = [swe.calc(jdet, planet_id, FLAGS)[0][0] for planet_id in PLANETS.values()]
+
+    return ascendant_degree, degrees
+
+@timed('chart.build')
+def build_chart(ascendant_degree, degrees, strength_calculator=None):
+    # Turn the positions from calc_positions into the chart dictionary
+    if strength_calculator is None:
+        strength_calculator = PlanetaryStrength()
+
+    planet_data = {}
+
+    # First calculate houses so we can reference them
+    houses = get_houses(ascendant_degree)
+
+    for name, degree in zip(PLANETS, degrees):
+        # Calculate the sign and nakshatra
+        sign, degree_in_sign = get_sign(degree)
+        nakshatra, pada, degree_in_nak = get_nakshatra(degree)
+
+        # Calculate which house the planet is in
+        house_num = get_planet_house(degree, houses)
+
+        # Calculate planet strengths
+        dignity = strength_calculator.get_dignity(name, sign, degree_in_sign)
+        strength = strength_calculator.calculate_strength(name, sign, degree_in_sign)
+
+        # Store in a dictionary
+        planet_data[name] = {
+            'degree': float(degree),
+            'sign': sign,
+            'degree_in_sign': float(degree_in_sign),
+            'nakshatra': nakshatra,
+            'pada': int(pada),
+            'degree_in_nak': degree_in_nak,
+            'dignity': dignity,
+            'strength_range': strength,
+            'house': house_num
+        }
+
+    return {
+        'ascendant': ascendant_degree,
+        'planets': planet_data,
+        'houses': houses
+    }
+
+def compute_chart(jdet, lat, lon, hsys, strength_calculator=None):
+    # Expects the sidereal mode to already be set (see set_sidereal_mode)
+    ascendant_degree, degrees = calc_positions(jdet, lat, lon, hsys)
+    return build_chart(ascendant_degree, degrees, strength_calculator)
+
+#################### Chart Configurations ###################
+# The same native under several ayanamsas and house systems in one go. A sidereal
+# longitude is just the tropical one minus the ayanamsa, so the planets are
+# calculated once (tropical) and each ayanamsa is a subtraction; houses_ex2 runs
+# once per house system.
+
+# Ayanamsas a request can ask for by name
+AYANAMSAS = {
+    'lahiri': swe.SIDM_LAHIRI,
+    'raman': swe.SIDM_RAMAN,
+    'krishnamurti': swe.SIDM_KRISHNAMURTI,
+    'yukteshwar': swe.SIDM_YUKTESHWAR,
+    'true_chitra': swe.SIDM_TRUE_CITRA,
+    'fagan_bradley': swe.SIDM_FAGAN_BRADLEY
+}
+
+# House systems with 12 cusps (Gauquelin's 36 sectors are left out)
+HOUSE_SYSTEMS = {
+    'W': 'Whole Sign', 'E': 'Equal', 'S': 'Sripati', 'P': 'Placidus', 'K': 'Koch',
+    'O': 'Porphyry', 'R': 'Regiomontanus', 'C': 'Campanus', 'B': 'Alcabitus',
+    'M': 'Morinus', 'X': 'Axial Rotation'
+}
+
+MAX_CONFIGURATIONS = 16
+
+TROPICAL_FLAGS = swe.FLG_SWIEPH
+
+def parse_configurations(items, default_hsys):
+    # [{'ayanamsa': 'raman', 'hsys': 'P'}, ...] into [(ayanamsa name, hsys)];
+    # each field defaults to Lahiri / the request's hsys
+    if not isinstance(items, list) or not items:
+        raise ValueError('configurations must be a non-empty list')
+    if len(items) > MAX_CONFIGURATIONS:
+        raise ValueError(f'At most {MAX_CONFIGURATIONS} configurations per request')
+
+    if isinstance(default_hsys, bytes):
+        default_hsys = default_hsys.decode('ascii')
+
+    configurations = []
+    for item in items:
+        ayanamsa = item.get('ayanamsa', 'lahiri')
+        hsys = item.get('hsys', default_hsys)
+        if ayanamsa not in AYANAMSAS:
+            raise ValueError(f"Unknown ayanamsa '{ayanamsa}' (one of {', '.join(AYANAMSAS)})")
+        if hsys not in HOUSE_SYSTEMS:
+            raise ValueError(f"Unknown house system '{hsys}' (one of {', '.join(HOUSE_SYSTEMS)})")
+        configurations.append((ayanamsa, hsys))
+    return configurations
+
+# Other ayanamsas without switching the sidereal mode, which a concurrent calculation
+# would pick up in a build without TLS. The precession based ones differ from Lahiri
+# by an almost constant amount (it drifts by 5e-7 degrees in 400 years), tabulated
+# every 10 years over the ephemeris files' range at import and interpolated; True
+# Chitra keeps Spica at 0 Libra, so it is Spica's tropical longitude - 180.
+_OFFSET_JDS = [swe.julday(year, 1, 1) for year in range(1800, 2401, 10)]
+
+def _ayanamsa_differences():
+    differences = {}
+    for ayanamsa, mode in AYANAMSAS.items():
+        row = []
+        for jd in _OFFSET_JDS:
+            swe.set_sid_mode(mode)
+            value = swe.get_ayanamsa_ex(jd, TROPICAL_FLAGS)[1]
+            set_sidereal_mode()
+            row.append(value - swe.get_ayanamsa_ex(jd, TROPICAL_FLAGS)[1])
+        differences[ayanamsa] = row
+    return differences
+
+AYANAMSA_DIFFERENCES = _ayanamsa_differences()
+
+def ayanamsa_offset(jdet, ayanamsa):
+    # The ayanamsa in degrees, the same one swe.calc subtracts with FLG_SIDEREAL.
+    # Expects the sidereal mode to already be set (see set_sidereal_mode)
+    if ayanamsa == 'true_chitra':
+        return swe.fixstar2('Spica', jdet, TROPICAL_FLAGS)[0][0] - 180.0
+
+    lahiri = swe.get_ayanamsa_ex(jdet, TROPICAL_FLAGS)[1]
+    row = AYANAMSA_DIFFERENCES[ayanamsa]
+    i = min(max(bisect.bisect(_OFFSET_JDS, jdet) - 1, 0), len(_OFFSET_JDS) - 2)
+    fraction = (jdet - _OFFSET_JDS[i]) / (_OFFSET_JDS[i + 1] - _OFFSET_JDS[i])
+    return lahiri + row[i] + (row[i + 1] - row[i]) * fraction
+
+def sidereal_cusps(tropical_cusps, ascendant_degree, hsys, offset):
+    # Whole sign cusps are the sidereal sign boundaries, not shifted tropical ones
+    if hsys == 'W':
+        asc_sign_num = ascendant_sign(ascendant_degree)
+        return [((asc_sign_num + i) % 12) * SIGN_SIZE for i in range(12)]
+    return [(cusp - offset) % 360 for cusp in tropical_cusps[:12]]
+
+def cusp_house(degree, cusps):
+    # House (1-12) whose span, from its cusp to the next one, holds the degree
+    for i in range(12):
+        if (degree - cusps[i]) % 360 < (cusps[(i + 1) % 12] - cusps[i]) % 360:
+            return i + 1
+    return 12
+
+def compute_configurations(jdet, lat, lon, configurations, strength_calculator=None):
+    # One chart per (ayanamsa, hsys) from parse_configurations. Each has the usual
+    # whole sign 'house' per planet plus 'cusp_house' from the house system's cusps.
+    with stage('chart.planets'):
+        tropical = [swe.calc(jdet, planet_id, TROPICAL_FLAGS)[0][0] for planet_id in PLANETS.values()]
+
+    offsets = {}
+    house_data = {}
+    charts = []
+
+    for ayanamsa, hsys in configurations:
+        if ayanamsa not in offsets:
+            offsets[ayanamsa] = ayanamsa_offset(jdet, ayanamsa)
+        if hsys not in house_data:
+            with stage('chart.houses'):
+                house_data[hsys] = swe.houses_ex2(jdet, lat, lon, hsys.encode('ascii'), TROPICAL_FLAGS)
+
+        offset = offsets[ayanamsa]
+        ascendant_degree = (house_data[hsys][1][0] - offset) % 360
+        degrees = [(degree - offset) % 360 for degree in tropical]
+        cusps = sidereal_cusps(house_data[hsys][0], ascendant_degree, hsys, offset)
+
+        chart = build_chart(ascendant_degree, degrees, strength_calculator)
+        for planet, degree in zip(chart['planets'].values(), degrees):
+            planet['cusp_house'] = cusp_house(degree, cusps)
+
+        chart.update({
+            'ayanamsa': ayanamsa,
+            'ayanamsa_degree': offset,
+            'hsys': hsys,
+            'house_system': HOUSE_SYSTEMS[hsys],
+            'cusps': cusps
+        })
+        charts.append(chart)
+
+    return charts
@@ -0,0 +1,261 @@
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+import swisseph as swe
+from numpy.polynomial import chebyshev
+
+from chart import PLANETS, FLAGS, AYANAMSA, configure_ephemeris
+
+#################### Chebyshev Position Store ###################
+# Sidereal longitudes for a date window, precomputed as Chebyshev series per planet
+# and saved to one binary file that is memory-mapped at load. Evaluating the series
+# for many instants at once is a handful of NumPy operations instead of one
+# swe.calc call per instant and planet.
+#
+#   python chebyshev.py build --start 1940-01-01 --end 2031-01-01 -o positions.cheb
+#   python chebyshev.py verify positions.cheb
+#
+# The build checks every interval against Swiss Ephemeris between the fitting
+# points and halves it until the error is under the tolerance (default 0.25").
+# That matters near solar conjunctions, where light deflection bends a planet's
+# path within hours.
+#
+# Set POSITION_STORE=positions.cheb to use it for the bulk paths (ephemeris ranges,
+# compact batches); instants outside the window go to swe.calc as before.
+
+MAGIC = b'EPHCHEB1'
+
+# Starting interval (days) and series degree per planet; intervals are split as needed
+SERIES = {
+    'Sun': (16, 10), 'Moon': (4, 12), 'Mercury': (8, 10), 'Venus': (16, 10),
+    'Mars': (16, 10), 'Jupiter': (16, 10), 'Saturn': (16, 10), 'Rahu': (32, 10)
+}
+
+TOLERANCE_ARCSEC = 0.25
+MIN_INTERVAL = 1 / 64 # days
+
+#################### Building ###################
+
+def chebyshev_nodes(degree):
+    return np.cos(np.pi * (np.arange(degree + 1) + 0.5) / (degree + 1))
+
+def longitudes_at(jds, planet_id):
+    calc = swe.calc
+    return np.array([calc(jd, planet_id, FLAGS)[0][0] for jd in jds.tolist()])
+
+def unwrap_degrees(longitudes):
+    return np.degrees(np.unwrap(np.radians(longitudes)))
+
+def fit_interval(planet_id, start, end, degree, tolerance):
+    # [(start, end, coefficients)] for one interval, split in halves until the fit
+    # is within tolerance (degrees) of Swiss Ephemeris at points between the nodes
+    nodes = chebyshev_nodes(degree)
+    length = end - start
+    values = unwrap_degrees(longitudes_at(start + (nodes + 1) / 2 * length, planet_id))
+    coefficients = chebyshev.chebfit(nodes, values, degree)
+
+    checks = np.linspace(-1, 1, 2 * degree + 3)
+    truth = longitudes_at(start + (checks + 1) / 2 * length, planet_id)
+    error = np.abs((chebyshev.chebval(checks, coefficients) - truth + 180) % 360 - 180).max()
+
+    if error <= tolerance or length / 2 < MIN_INTERVAL:
+        return [(start, end, coefficients)]
+
+    middle = start + length / 2
+    return (fit_interval(planet_id, start, middle, degree, tolerance)
+            + fit_interval(planet_id, middle, end, degree, tolerance))
+
+def build_planet(planet_id, start_jd, end_jd, interval, degree, tolerance):
+    # Contiguous intervals covering [start_jd, end_jd]: bounds (n + 1,) and coefficients (n, degree + 1)
+    pieces = []
+    start = start_jd
+    while start < end_jd:
+        end = min(start + interval, end_jd)
+        pieces.extend(fit_interval(planet_id, start, end, degree, tolerance))
+        start = end
+
+    bounds = np.array([piece[0] for piece in pieces] + [pieces[-1][1]])
+    coefficients = np.array([piece[2] for piece in pieces])
+    return bounds, coefficients
+
+def build_store(path, start_jd, end_jd, planets=None, tolerance=TOLERANCE_ARCSEC, progress=None):
+    # Fits every planet and writes the file: MAGIC, header length (uint32), JSON header,
+    # padding to 8 bytes, then each planet's float64 bounds and coefficients
+    configure_ephemeris()
+    header = {'ayanamsa': AYANAMSA, 'flags': FLAGS, 'start_jd': start_jd, 'end_jd': end_jd,
+              'tolerance_arcsec': tolerance, 'planets': {}}
+    arrays = []
+    offset = 0
+
+    for name in planets or PLANETS:
+        interval, degree = SERIES[name]
+        bounds, coefficients = build_planet(PLANETS[name], start_jd, end_jd, interval, degree, tolerance / 3600)
+        header['planets'][name] = {
+            'id': PLANETS[name], 'degree': degree, 'intervals': len(coefficients),
+            'bounds_offset': offset, 'coefficients_offset': offset + bounds.nbytes
+        }
+        offset += bounds.nbytes + coefficients.nbytes
+        arrays.extend([bounds, coefficients])
+        if progress:
+            progress(name, len(coefficients))
+
+    encoded = json.dumps(header).encode('utf-8')
+    padding = -(len(MAGIC) + 4 + len(encoded)) % 8
+
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<I', len(encoded) + padding) + encoded + b' ' * padding)
+        for array in arrays:
+            f.write(np.ascontiguousarray(array, dtype='<f8').tobytes())
+
+#################### Lookups ###################
+
+class PlanetSeries:
+
+    def __init__(self, bounds, coefficients):
+        self.bounds = bounds
+        self.coefficients = coefficients
+        self.start = float(bounds[0])
+        self.end = float(bounds[-1])
+
+    def evaluate(self, jds):
+        # Sidereal longitude and speed (degrees/day) for julian days inside [start, end]
+        index = np.clip(np.searchsorted(self.bounds, jds, side='right') - 1, 0, len(self.coefficients) - 1)
+        start = self.bounds[index]
+        length = self.bounds[index + 1] - start
+        t = 2 * (jds - start) / length - 1
+
+        rows = self.coefficients[index].T # (degree + 1, n): one column per instant
+        longitude = chebyshev.chebval(t, rows, tensor=False) % 360
+        speed = chebyshev.chebval(t, chebyshev.chebder(rows), tensor=False) * 2 / length
+        return longitude, speed
+
+class PositionStore:
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.mapping[:len(MAGIC)] != MAGIC:
+            raise ValueError(f'{path}: not a position store')
+
+        header_length, = struct.unpack_from('<I', self.mapping, len(MAGIC))
+        data_start = len(MAGIC) + 4 + header_length
+        self.header = json.loads(bytes(self.mapping[len(MAGIC) + 4:data_start]))
+
+        # Positions are only valid for the settings they were built with
+        if self.header['ayanamsa'] != AYANAMSA or self.header['flags'] != FLAGS:
+            raise ValueError(f'{path}: built for another ayanamsa or flags, rebuild it')
+
+        self.series = {}
+        for name, info in self.header['planets'].items():
+            count = info['intervals']
+            bounds = np.frombuffer(self.mapping, '<f8', count + 1, data_start + info['bounds_offset'])
+            coefficients = np.frombuffer(self.mapping, '<f8', count * (info['degree'] + 1),
+                                         data_start + info['coefficients_offset'])
+            self.series[name] = PlanetSeries(bounds, coefficients.reshape(count, info['degree'] + 1))
+
+        self.start_jd = self.header['start_jd']
+        self.end_jd = self.header['end_jd']
+
+    def covers(self, start_jd, end_jd=None):
+        end_jd = start_jd if end_jd is None else end_jd
+        return self.start_jd <= start_jd and end_jd <= self.end_jd
+
+    def positions(self, jds, name):
+        # (longitudes, speeds) for any julian days; those outside the store use swe.calc
+        jds = np.asarray(jds, dtype=np.float64)
+        series = self.series.get(name)
+        if series is None:
+            return calc_series(jds, PLANETS[name])
+
+        inside = (jds >= series.start) & (jds <= series.end)
+        if inside.all():
+            return series.evaluate(jds)
+
+        longitude = np.empty(jds.shape)
+        speed = np.empty(jds.shape)
+        longitude[inside], speed[inside] = series.evaluate(jds[inside])
+        longitude[~inside], speed[~inside] = calc_series(jds[~inside], PLANETS[name])
+        return longitude, speed
+
+def calc_series(jds, planet_id):
+    # The swe.calc fallback (the caller has set the sidereal mode)
+    calc = swe.calc
+    flags = FLAGS | swe.FLG_SPEED
+    positions = np.array([calc(jd, planet_id, flags)[0] for jd in jds.tolist()]).reshape(-1, 6)
+    return positions[:, 0], positions[:, 3]
+
+# The store named by POSITION_STORE (loaded on first use), or None
+_store = {}
+
+def current_store():
+    if 'store' not in _store:
+        path = os.environ.get('POSITION_STORE')
+        _store['store'] = PositionStore(path) if path else None
+    return _store['store']
+
+#################### Verification ###################
+
+def verify_store(store, samples=20_000, seed=0):
+    # Max longitude error (arcseconds) and speed error (degrees/day) against Swiss
+    # Ephemeris at random instants, plus the time each side took
+    configure_ephemeris()
+    rng = np.random.default_rng(seed)
+    jds = rng.uniform(store.start_jd, store.end_jd, samples)
+
+    report = {}
+    for name, series in store.series.items():
+        start = time.perf_counter()
+        longitude, speed = series.evaluate(jds)
+        store_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        true_longitude, true_speed = calc_series(jds, PLANETS[name])
+        calc_seconds = time.perf_counter() - start
+
+        report[name] = {
+            'max_error_arcsec': float(np.abs((longitude - true_longitude + 180) % 360 - 180).max() * 3600),
+            'max_speed_error': float(np.abs(speed - true_speed).max()),
+            'intervals': len(series.coefficients),
+            'store_seconds': store_seconds,
+            'calc_seconds': calc_seconds,
+            'speedup': calc_seconds / store_seconds
+        }
+    return report
+
+if __name__ == '__main__':
+    from ephemeris import parse_date
+
+    parser = argparse.ArgumentParser(description='Build or verify a Chebyshev position store')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build')
+    build.add_argument('--start', required=True, help='ISO date, e.g. 1940-01-01')
+    build.add_argument('--end', required=True, help='ISO date, e.g. 2031-01-01')
+    build.add_argument('--tolerance', type=float, default=TOLERANCE_ARCSEC, help='arcseconds')
+    build.add_argument('-o', '--output', default='positions.cheb')
+
+    verify = commands.add_parser('verify')
+    verify.add_argument('store')
+    verify.add_argument('--samples', type=int, default=20_000)
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        build_store(args.output, parse_date(args.start), parse_date(args.end), tolerance=args.tolerance,
+                    progress=lambda name, count: print(f'{name:8} {count:7,} intervals', file=sys.stderr))
+        print(f'{args.output}: {os.path.getsize(args.output):,} bytes in {time.perf_counter() - start:.1f}s',
+              file=sys.stderr)
+    else:
+        report = verify_store(PositionStore(args.store), args.samples)
+        print(json.dumps(report, indent=2))
+        worst = max(row['max_error_arcsec'] for row in report.values())
+        sys.exit(0 if worst < 1.0 else 1)
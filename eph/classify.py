@@ -0,0 +1,94 @@
+#################### Sign, Nakshatra And House Engine ###################
+# One set of formulas for both single longitudes (used by get_sign / get_nakshatra /
+# get_houses / get_planet_house in chart.py) and whole NumPy arrays of longitudes
+# (batch and time-series work).
+
+SIGN_SIZE = 30.0 # each sign is 30 degrees
+NAKSHATRA_SIZE = 360 / 27 # each nakshatra is 13.333... degrees (13°20')
+PADA_SIZE = NAKSHATRA_SIZE / 4 # each nakshatra has 4 padas
+
+########################## Shared Formulas ##########################
+# Written once for a single float and a NumPy float64 array alike, so the scalar
+# and vectorized paths below can't drift apart. `truncate(value, top)` is int()
+# of a non-negative quotient capped at top (the caller's int / NumPy version).
+
+def wrap(degree):
+    # 0 <= degree < 360. A tiny negative longitude (-1e-15) % 360 rounds to exactly
+    # 360.0, which is 0 Aries, not a 13th sign
+    degree = degree % 360
+    return degree - 360 * (degree >= 360)
+
+def sign_index(degree, truncate):
+    return truncate(degree / SIGN_SIZE, 11) # sign num (0-11)
+
+def nakshatra_index(degree, truncate):
+    return truncate(degree / NAKSHATRA_SIZE, 26) # nakshatra number (0-26)
+
+def pada_number(degree_in_nak, truncate):
+    return truncate(degree_in_nak / PADA_SIZE, 3) + 1 # pada (quarter, 1-4)
+
+def house_number(sign_num, asc_sign_num):
+    # Whole sign houses: the ascendant's sign is house 1
+    return (sign_num - asc_sign_num) % 12 + 1
+
+########################## Single Longitude ##########################
+
+def truncate_int(value, top):
+    return min(int(value), top)
+
+def normalize(degree):
+    return wrap(degree) # Normalize to 0-360
+
+def sign_position(degree):
+    degree = normalize(degree)
+    degree_in_sign = degree % SIGN_SIZE # Get degree within a sign (0-29.99)
+    return sign_index(degree, truncate_int), degree_in_sign
+
+def nakshatra_position(degree):
+    degree = normalize(degree)
+    degree_in_nak = degree % NAKSHATRA_SIZE # Get degree within nakshatra
+    return nakshatra_index(degree, truncate_int), pada_number(degree_in_nak, truncate_int), degree_in_nak
+
+def ascendant_sign(ascendant_degree):
+    return sign_index(normalize(ascendant_degree), truncate_int) # sign num(0-11)
+
+########################## NumPy Arrays ##########################
+
+def truncate_array(values, top):
+    import numpy as np
+    return np.minimum(values, top).astype(np.int8)
+
+def normalize_array(longitudes):
+    # normalize() for a NumPy array (float64)
+    import numpy as np
+    return wrap(np.asarray(longitudes, dtype=np.float64))
+
+def classify_longitudes(longitudes, ascendants=None):
+    # Classify an array of ecliptic longitudes in one vectorized pass.
+    # ascendants (optional) is broadcast against longitudes, so an (n,) array of
+    # ascendants pairs with an (n, planets) array of longitudes row by row.
+    # Returns a dictionary of arrays with the same shape as longitudes.
+    import numpy as np # only loaded when arrays are used, keeps the chart route's start-up light
+
+    degree = normalize_array(longitudes)
+
+    sign_num = sign_index(degree, truncate_array)
+    degree_in_sign = degree % SIGN_SIZE
+
+    degree_in_nak = degree % NAKSHATRA_SIZE
+
+    result = {
+        'sign_index': sign_num,
+        'degree_in_sign': degree_in_sign,
+        'nakshatra_index': nakshatra_index(degree, truncate_array),
+        'pada': pada_number(degree_in_nak, truncate_array),
+        'degree_in_nak': degree_in_nak
+    }
+
+    if ascendants is not None:
+        asc = normalize_array(ascendants)
+        # Line up trailing axes, e.g. (n,) ascendants against (n, 8) longitudes
+        asc = asc.reshape(asc.shape + (1,) * (degree.ndim - asc.ndim))
+        result['house'] = house_number(sign_num, sign_index(asc, truncate_array)).astype(np.int8)
+
+    return result
@@ -0,0 +1,132 @@
+import json
+import os
+import threading
+
+from flask import jsonify, request
+
+#################### Request Coalescing ###################
+# Identical requests that arrive while the first one is still being worked out
+# wait for its result instead of calculating it again (single flight). Only the
+# requests of one process are coalesced, i.e. within a threaded server or gunicorn
+# thread worker; the ASGI mode already runs one request per worker process.
+#
+#   COALESCE=off            every request calculates its own result
+#   COALESCE_MAX_WAITERS    requests allowed to wait on one calculation (default 256),
+#                           more than that get 503
+#   COALESCE_TIMEOUT        seconds a waiter waits before giving up with 503 (default 10)
+
+ENABLED = os.environ.get('COALESCE', 'on').lower() not in ('off', '0', 'false')
+MAX_WAITERS = int(os.environ.get('COALESCE_MAX_WAITERS', 256))
+TIMEOUT = float(os.environ.get('COALESCE_TIMEOUT', 10))
+
+class CoalesceBusy(Exception):
+    pass
+
+class CoalesceTimeout(CoalesceBusy):
+    pass
+
+class Call:
+    # One calculation in progress and the requests waiting on it
+    __slots__ = ('done', 'waiters', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+
+    def __init__(self, name, max_waiters=MAX_WAITERS, timeout=TIMEOUT, enabled=ENABLED):
+        self.name = name
+        self.max_waiters = max_waiters
+        self.timeout = timeout
+        self.enabled = enabled
+        self.calls = {}
+        self.lock = threading.Lock()
+
+        self.leaders = 0 # calculations actually run
+        self.coalesced = 0 # requests served from another request's calculation
+        self.rejected = 0 # waiter queue full
+        self.timeouts = 0
+        self.errors = 0 # calculations that raised (the waiters get the same error)
+
+    def do(self, key, func):
+        # func() once per key at a time; concurrent callers with the same key get its
+        # result (or its exception) too
+        if not self.enabled:
+            return func()
+
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+                self.leaders += 1
+            elif call.waiters >= self.max_waiters:
+                self.rejected += 1
+                raise CoalesceBusy('Too many identical requests waiting, try again shortly')
+            else:
+                call.waiters += 1
+
+        if leader:
+            try:
+                call.result = func()
+            except Exception as e:
+                call.error = e
+                raise
+            finally:
+                with self.lock:
+                    del self.calls[key]
+                    if call.error is not None:
+                        self.errors += 1
+                call.done.set()
+            return call.result
+
+        if not call.done.wait(self.timeout):
+            with self.lock:
+                # Gone, so it no longer takes one of the call's max_waiters places
+                call.waiters -= 1
+                self.timeouts += 1
+            raise CoalesceTimeout('Timed out waiting for an identical request, try again shortly')
+
+        with self.lock:
+            self.coalesced += 1
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'in_flight': len(self.calls),
+            'leaders': self.leaders,
+            'coalesced': self.coalesced,
+            'rejected': self.rejected,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'max_waiters': self.max_waiters,
+            'timeout': self.timeout
+        }
+
+# Every SingleFlight made with flight(), for /api/health
+flights = {}
+
+def flight(name, **options):
+    if name not in flights:
+        flights[name] = SingleFlight(name, **options)
+    return flights[name]
+
+def stats():
+    return {name: single_flight.stats() for name, single_flight in flights.items()}
+
+def request_key(data):
+    # The route plus the JSON body with its keys sorted, so key order and spacing
+    # don't make two identical requests look different
+    return request.path + '|' + json.dumps(data, sort_keys=True, separators=(',', ':'), default=str)
+
+def busy_response(e):
+    response = jsonify({'success': False, 'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
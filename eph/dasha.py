@@ -1,5 +1,45 @@
+import base64
+import bisect
+import json
 from datetime import datetime, timedelta
 from flask import Flask, jsonify, request
+import numpy as np
+
+from classify import NAKSHATRA_SIZE, nakshatra_position
+from serialize import respond
+from logs import get_logger
+from metrics import timed
+from coalesce import CoalesceBusy, flight, request_key, busy_response
+
+log = get_logger('dasha')
+
+# Julian day of datetime.toordinal() day 0 at midnight
+ORDINAL_JD_OFFSET = 1721424.5
+
+DASHA_LEVELS = ['mahadasha', 'antardasha', 'pratyantardasha', 'sookshma', 'prana']
+
+# 120 year cycles calculate_tree will build
+MAX_CYCLES = 10
+
+# Dates one /api/dashas/at request may look up
+MAX_LOOKUP_DATES = 10_000
+
+def datetime_to_jd(moment):
+    day_fraction = (moment.hour * 3600 + moment.minute * 60 + moment.second) / 86400
+    return moment.toordinal() + ORDINAL_JD_OFFSET + day_fraction
+
+def jd_to_date_str(jd):
+    return datetime.fromordinal(int(jd - ORDINAL_JD_OFFSET)).strftime('%Y-%m-%d')
+
+def int_field(data, name, default):
+    # An integer request field (a number or numeric string); anything else, null
+    # included, is a ValueError so the routes answer 400
+    value = data.get(name, default)
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f'{name} must be an integer')
+    return int(value)
 
 class DashaCalculator:
 
@@ -16,6 +56,20 @@ class DashaCalculator:
         self.moon_nak_degree = moon_nak_degree
         self.moon_nak = moon_nak
 
+        # Set by from_moon_longitude; the name-based routes keep their original numbers
+        self.birth_lord = None
+        self.nak_span = 13.33
+
+    @classmethod
+    def from_moon_longitude(cls, birth_date, moon_longitude, nakshatra_names=None):
+        # Straight from the sidereal Moon: the lord comes from the nakshatra's index
+        # (the nine lords repeat from Ashvini) and the span is exactly 360 / 27
+        nak_num, _, degree_in_nak = nakshatra_position(moon_longitude)
+        calculator = cls(birth_date, degree_in_nak, nakshatra_names[nak_num] if nakshatra_names else nak_num)
+        calculator.birth_lord = cls.PLANET_SEQUENCE[nak_num % 9]
+        calculator.nak_span = NAKSHATRA_SIZE
+        return calculator
+
     def get_nak_lord(self, nakshatra):
         nak_lords = {
             'Ashvini': 'Ketu', 'Bharani': 'Venus', 'Krittika': 'Sun',
@@ -26,7 +80,9 @@ class DashaCalculator:
             'Vishakha': 'Jupiter', 'Anuradha': 'Saturn', 'Jyeshtha': 'Mercury',
             'Mula': 'Ketu', 'Purva Ashadha': 'Venus', 'Uttara Ashadha': 'Sun',
             'Shravana': 'Moon', 'Dhanishtha': 'Mars', 'Shatabhisha': 'Rahu',
-            'Purva Bhadrapada': 'Jupiter', 'Uttara Bhadrapada': 'Saturn', 'Revati': 'Mercury'
+            'Purva Bhadrapada': 'Jupiter', 'Uttara Bhadrapada': 'Saturn', 'Revati': 'Mercury',
+            # The spellings /api/chart sends (chart.NAKSHATRAS)
+            'Ashwini': 'Ketu', 'Mrigashira': 'Mars', 'Dhanishta': 'Mars'
         }
 
         lord = nak_lords.get(nakshatra)
@@ -36,12 +92,13 @@ class DashaCalculator:
 
         return lord
     
+    @timed('dasha.calculate_dasha_start')
     def calculate_dasha_start(self):
         # return years remaining in start dasha
-        birth_lord = self.get_nak_lord(self.moon_nak)
+        birth_lord = self.birth_lord or self.get_nak_lord(self.moon_nak)
         total_years = self.DASHA_YEARS[birth_lord]
 
-        proportion_completed = self.moon_nak_degree / 13.33
+        proportion_completed = self.moon_nak_degree / self.nak_span
 
         # Years left
         years_elapsed = total_years * proportion_completed
@@ -54,6 +111,7 @@ class DashaCalculator:
         next_index = (current_index + 1) % 9
         return self.PLANET_SEQUENCE[next_index]
 
+    @timed('dasha.calculate_mahadashas')
     def calculate_mahadashas(self, num_cycles: int = 2):
         # calc for a specified num of 120 year cycles
         birth_lord, years_remaining = self.calculate_dasha_start()
@@ -95,6 +153,115 @@ class DashaCalculator:
 
         return mahadashas
 
+    @timed('dasha.calculate_tree')
+    def calculate_tree(self, depth=3, num_cycles=2):
+        # The whole Vimshottari hierarchy down to `depth` levels (1-5) in one pass, built
+        # level by level with NumPy from julian day boundaries rather than date strings.
+        # The birth mahadasha runs its full length from before birth and every period
+        # is clipped to the birth date, so periods that ended before birth are left out.
+        # Returns one dict of arrays per level; 'parent' indexes the level above.
+        if not 1 <= depth <= len(DASHA_LEVELS):
+            raise ValueError(f"depth must be between 1 and {len(DASHA_LEVELS)}")
+        # 9 * num_cycles * 9^(depth - 1) rows, so keep the number of 120 year cycles small
+        if not 1 <= num_cycles <= MAX_CYCLES:
+            raise ValueError(f"num_cycles must be between 1 and {MAX_CYCLES}")
+
+        birth_lord, years_remaining = self.calculate_dasha_start()
+        birth_jd = datetime_to_jd(self.birth_date)
+        first = self.PLANET_SEQUENCE.index(birth_lord)
+
+        # Mahadashas: full lengths, the first one starting before birth
+        planets = (first + np.arange(9 * num_cycles)) % 9
+        days = DASHA_DAYS[planets]
+        elapsed_days = (self.DASHA_YEARS[birth_lord] - years_remaining) * 365.25
+        starts = birth_jd - elapsed_days + np.concatenate(([0.0], np.cumsum(days)[:-1]))
+        parents = np.full(len(planets), -1)
+
+        levels = []
+        for level in range(depth):
+            if level > 0:
+                # Every period splits into 9, starting with its own planet
+                parent_planets, parent_starts, parent_days = planets, starts, days
+                parents = np.repeat(np.arange(len(parent_planets)), 9)
+                planets = ((parent_planets[:, None] + np.arange(9)) % 9).ravel()
+                starts = (parent_starts[:, None] + parent_days[:, None] * SUB_OFFSETS[parent_planets]).ravel()
+                days = (parent_days[:, None] * SUB_FRACTIONS[parent_planets]).ravel()
+
+            levels.append((planets, starts, starts + days, parents))
+
+        # Clip to birth, drop what ended before it and renumber the parent links
+        tree = []
+        index_map = None
+        for level, (planets, starts, ends, parents) in enumerate(levels):
+            keep = ends > birth_jd
+            if index_map is not None:
+                parents = index_map[parents]
+            index_map = np.cumsum(keep) - 1
+
+            starts = np.maximum(starts[keep], birth_jd)
+            ends = ends[keep]
+
+            tree.append({
+                'level': DASHA_LEVELS[level],
+                'planet': planets[keep],
+                'start': starts,
+                'end': ends,
+                'parent': parents[keep],
+                'years': (ends - starts) / 365.25
+            })
+
+        return tree
+
+    def iter_window(self, start_jd, end_jd, depth=3):
+        # Every period of the first `depth` levels that overlaps [start_jd, end_jd), lazily
+        # and in order: each period before its sub-periods, those in time order. Jumps
+        # straight to the mahadasha running at start_jd (whole 120 year cycles, then the
+        # offsets within one) and skips the sub-periods that end before it, so nothing
+        # outside the window is built. Same boundaries as calculate_tree, clipped to birth.
+        # Yields (level index, planet indices from the mahadasha down, start, end).
+        if not 1 <= depth <= len(DASHA_LEVELS):
+            raise ValueError(f"depth must be between 1 and {len(DASHA_LEVELS)}")
+
+        birth_lord, years_remaining = self.calculate_dasha_start()
+        birth_jd = datetime_to_jd(self.birth_date)
+        first = self.PLANET_SEQUENCE.index(birth_lord)
+
+        # Start of the birth mahadasha (before birth) and where each mahadasha begins in a cycle
+        anchor = birth_jd - (self.DASHA_YEARS[birth_lord] - years_remaining) * 365.25
+        maha_offsets = [offset * CYCLE_DAYS for offset in SUB_OFFSET_ROWS[first]]
+
+        t = max(start_jd, birth_jd)
+        if t >= end_jd: # the whole window is before birth
+            return
+
+        cycle, into_cycle = divmod(t - anchor, CYCLE_DAYS)
+        k = int(cycle) * 9 + bisect.bisect_right(maha_offsets, into_cycle) - 1
+
+        def walk(level, path, start, days):
+            yield level, path, max(start, birth_jd), start + days
+
+            if level + 1 < depth:
+                planet = path[-1]
+                offsets, ends = SUB_OFFSET_ROWS[planet], SUB_END_ROWS[planet]
+                # First sub-period still running at t
+                i = bisect.bisect_right(ends, (t - start) / days) if t > start else 0
+                for i in range(i, 9):
+                    sub_start = start + days * offsets[i]
+                    if sub_start >= end_jd:
+                        break
+                    yield from walk(level + 1, path + ((planet + i) % 9,), sub_start,
+                                    days * SUB_FRACTION_ROWS[planet][i])
+
+        while True:
+            cycle, position = divmod(k, 9)
+            maha_start = anchor + cycle * CYCLE_DAYS + maha_offsets[position]
+            if maha_start >= end_jd:
+                return
+            planet = (first + position) % 9
+            yield from walk(0, (planet,), maha_start, self.DASHA_YEARS[self.PLANET_SEQUENCE[planet]] * 365.25)
+            k += 1
+
+    @timed('dasha.calculate_antardashas')
     def calculate_antardashas(self, mahadasha_planet, start_date_str, mahadasha_years):
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
         start_index = self.PLANET_SEQUENCE.index(mahadasha_planet)
@@ -122,6 +289,7 @@ class DashaCalculator:
 
         return antardashas
 
+    @timed('dasha.calculate_pratyantardashas')
     def calculate_pratyantardashas(self, mahadasha_planet, antar_planet,
                                 start_date_str, antar_years):
         start_date = datetime.strptime(start_date_str, '%Y-%m-%d')
@@ -150,16 +318,160 @@ class DashaCalculator:
             current_date = end_date        
         return pratyantardashas
 
+# Fraction of a period taken by each sub-period, and where each one starts,
+# for sub-sequences beginning at every planet (row = starting planet index)
+_SEQUENCE_YEARS = np.array([DashaCalculator.DASHA_YEARS[p] for p in DashaCalculator.PLANET_SEQUENCE], dtype=float)
+DASHA_DAYS = _SEQUENCE_YEARS * 365.25
+SUB_FRACTIONS = np.array([np.roll(_SEQUENCE_YEARS, -i) / 120 for i in range(9)])
+SUB_OFFSETS = np.concatenate((np.zeros((9, 1)), np.cumsum(SUB_FRACTIONS, axis=1)[:, :-1]), axis=1)
+
+# The same as plain lists for the one-period-at-a-time walk in iter_window
+CYCLE_DAYS = 120 * 365.25
+SUB_FRACTION_ROWS = SUB_FRACTIONS.tolist()
+SUB_OFFSET_ROWS = SUB_OFFSETS.tolist()
+SUB_END_ROWS = (SUB_OFFSETS + SUB_FRACTIONS).tolist()
+
+#################### Windowed Queries ###################
+# A page of DashaCalculator.iter_window at a time. The cursor is the start and level
+# of the last period sent: periods come out ordered by (start, level), so the next
+# page restarts the walk at that instant and drops what it has already seen.
+
+MAX_WINDOW_LIMIT = 5000
+
+def encode_cursor(start, level):
+    return base64.urlsafe_b64encode(json.dumps([start, level]).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    try:
+        start, level = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return float(start), int(level)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+def period_to_json(level, path, start, end):
+    planet_names = DashaCalculator.PLANET_SEQUENCE
+    return {
+        'level': DASHA_LEVELS[level],
+        'planet': planet_names[path[-1]],
+        'path': '-'.join(planet_names[planet] for planet in path), # like 'parent' in the sub-level lists
+        'start': start,
+        'end': end,
+        'start_date': jd_to_date_str(start),
+        'end_date': jd_to_date_str(end),
+        'years': round((end - start) / 365.25, 4)
+    }
+
+@timed('dasha.window_page')
+def window_page(calculator, start_jd, end_jd, depth=3, limit=500, cursor=None):
+    # Up to `limit` periods overlapping [start_jd, end_jd) after `cursor`, and the cursor
+    # for the page after this one (None on the last page)
+    if not 1 <= limit <= MAX_WINDOW_LIMIT:
+        raise ValueError(f"limit must be between 1 and {MAX_WINDOW_LIMIT}")
+
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        start_jd = max(start_jd, after[0])
+
+    periods = []
+    for level, path, start, end in calculator.iter_window(start_jd, end_jd, depth):
+        if after is not None and (start, level) <= after:
+            continue
+        if len(periods) == limit:
+            last = periods[-1]
+            return periods, encode_cursor(last['start'], DASHA_LEVELS.index(last['level']))
+        periods.append(period_to_json(level, path, start, end))
+
+    return periods, None
+
+class DashaIndex:
+    # Sorted period start days per level for one native, built once, so "which
+    # dasha is running at T" is a binary search per level instead of a list scan
+
+    def __init__(self, calculator, depth=3, num_cycles=2, tree=None):
+        # tree: an already calculated calculate_tree result to index instead
+        if tree is None:
+            tree = calculator.calculate_tree(depth=depth, num_cycles=num_cycles)
+        self.levels = [level['level'] for level in tree]
+        self.planets = [level['planet'] for level in tree]
+        self.starts = [level['start'] for level in tree]
+        self.ends = [level['end'] for level in tree]
+
+    @timed('dasha.index_lookup')
+    def lookup(self, jds):
+        # Vectorized: period index per level for every julian day (-1 when outside the index)
+        jds = np.atleast_1d(np.asarray(jds, dtype=float))
+        found = []
+        for starts, ends in zip(self.starts, self.ends):
+            index = np.searchsorted(starts, jds, side='right') - 1
+            inside = (index >= 0) & (jds < ends[np.maximum(index, 0)])
+            found.append(np.where(inside, index, -1))
+        return found
+
+    def at(self, jd):
+        # Single instant: {level: {'planet', 'start', 'end'}} (None for levels outside the index)
+        current = {}
+        for level, planets, starts, ends, index in zip(
+                self.levels, self.planets, self.starts, self.ends, self.lookup(jd)):
+            i = int(index[0])
+            current[level] = None if i < 0 else {
+                'planet': DashaCalculator.PLANET_SEQUENCE[planets[i]],
+                'start': float(starts[i]),
+                'end': float(ends[i])
+            }
+        return current
+
+def tree_to_json(tree, nested=False, dates=False):
+    # Columnar: one list per field per level. Nested: children inside their parents.
+    planet_names = DashaCalculator.PLANET_SEQUENCE
+
+    if not nested:
+        levels = []
+        for level in tree:
+            columns = {
+                'level': level['level'],
+                'planet': [planet_names[p] for p in level['planet'].tolist()],
+                'start': level['start'].tolist(),
+                'end': level['end'].tolist(),
+                'years': np.round(level['years'], 4).tolist(),
+                'parent': level['parent'].tolist()
+            }
+            if dates:
+                columns['start_date'] = [jd_to_date_str(jd) for jd in columns['start']]
+                columns['end_date'] = [jd_to_date_str(jd) for jd in columns['end']]
+            levels.append(columns)
+        return levels
+
+    roots = []
+    nodes_above = None
+    for level in tree:
+        nodes = []
+        for planet, start, end, parent in zip(level['planet'].tolist(), level['start'].tolist(),
+                                              level['end'].tolist(), level['parent'].tolist()):
+            node = {'planet': planet_names[planet], 'level': level['level'], 'start': start, 'end': end}
+            if dates:
+                node['start_date'] = jd_to_date_str(start)
+                node['end_date'] = jd_to_date_str(end)
+            if nodes_above is None:
+                roots.append(node)
+            else:
+                nodes_above[parent].setdefault('children', []).append(node)
+            nodes.append(node)
+        nodes_above = nodes
+
+    return roots
+
 def register_dasha_routes(app):
 
+    # Identical dasha requests in flight at the same time share one calculation
+    dasha_flight = flight('dasha')
+
     @app.route('/api/dashas/mahadashas', methods=['POST'])
     def get_mahadasha():
 
         try:
             data = request.json
-            print("=== MAHADASHA REQUEST DATA ===")
-            print(data)
-            print("=" * 40)
+            log.debug('mahadasha request', extra={'data': data})
 
             if not data:
                 return jsonify({'error': 'No JSON data provided'}), 400
@@ -178,22 +490,23 @@ def register_dasha_routes(app):
             if moon_nakshatra_degree is None or moon_nakshatra is None:
                 return jsonify({'error': 'Missing moon nakshatra data'}), 400
            
-            calculator = DashaCalculator(birth_date, moon_nakshatra_degree, moon_nakshatra)
-            mahadashas = calculator.calculate_mahadashas(num_cycles=2)
+            def calculate():
+                calculator = DashaCalculator(birth_date, moon_nakshatra_degree, moon_nakshatra)
+                return {
+                    'mahadashas': calculator.calculate_mahadashas(num_cycles=2),
+                    'birth_dasha_start': calculator.calculate_dasha_start()
+                }
 
-            return jsonify({
-                'mahadashas': mahadashas,
-                'birth_dasha_start': calculator.calculate_dasha_start()
-            })
+            return respond(dasha_flight.do(request_key(data), calculate))
 
 
+        except CoalesceBusy as e:
+            return busy_response(e)
         except ValueError as e:
-            print(f"ValueError: {e}")
+            log.warning('invalid dasha request: %s', e)
             return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
         except Exception as e:
-            print(f"Exception: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception('dasha request failed')
             return jsonify({'error': f'Server error: {str(e)}'}), 500
         
     @app.route('/api/dashas/antardashas', methods=['POST'])
@@ -201,9 +514,7 @@ def register_dasha_routes(app):
 
         try:
             data = request.json
-            print("=== ANTARDASHA REQUEST DATA ===")
-            print(data)
-            print("=" * 40)
+            log.debug('antardasha request', extra={'data': data})
 
             if not data:
                 return jsonify({'error': 'No JSON data provided'}), 400
@@ -225,23 +536,25 @@ def register_dasha_routes(app):
             if not all([moon_nak_degree is not None, moon_nak, mahadasha_planet, start_date, mahadasha_years]):
                 return jsonify({'error': 'Missing required fields'}), 400
 
-            calculator = DashaCalculator(birth_date, moon_nak_degree, moon_nak)
+            def calculate():
+                calculator = DashaCalculator(birth_date, moon_nak_degree, moon_nak)
 
-            antardashas = calculator.calculate_antardashas(
-                mahadasha_planet=data['mahadasha_planet'],
-                start_date_str=data['start_date'],
-                mahadasha_years=data['mahadasha_years']
-            )
+                antardashas = calculator.calculate_antardashas(
+                    mahadasha_planet=data['mahadasha_planet'],
+                    start_date_str=data['start_date'],
+                    mahadasha_years=data['mahadasha_years']
+                )
+                return {'antardashas': antardashas}
 
-            return jsonify({'antardashas': antardashas})
+            return respond(dasha_flight.do(request_key(data), calculate))
             
+        except CoalesceBusy as e:
+            return busy_response(e)
         except ValueError as e:
-            print(f"ValueError: {e}")
+            log.warning('invalid dasha request: %s', e)
             return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
         except Exception as e:
-            print(f"Exception: {e}")
-            import traceback
-            traceback.print_exc()
+            log.exception('dasha request failed')
             return jsonify({'error': f'Server error: {str(e)}'}), 500
             
     @app.route('/api/dashas/pratyantardashas', methods=['POST'])
@@ -249,9 +562,7 @@ def register_dasha_routes(app):
 
         try:
             data = request.json
-            print("=== PRATYANTARDASHA REQUEST DATA ===")
-            print(data)
-            print("=" * 40)
+            log.debug('pratyantardasha request', extra={'data': data})
 
             if not data:
                 return jsonify({'error': 'No JSON data provided'}), 400
@@ -275,22 +586,182 @@ def register_dasha_routes(app):
                        antardasha_planet, start_date, antardasha_years]):
                 return jsonify({'error': 'Missing required fields'}), 400
             
+            def calculate():
+                calculator = DashaCalculator(birth_date, moon_nakshatra_degree, moon_nakshatra)
+                
+                pratyantardashas = calculator.calculate_pratyantardashas(
+                    mahadasha_planet=data['mahadasha_planet'],
+                    antar_planet=data['antardasha_planet'],
+                    start_date_str=data['start_date'],
+                    antar_years=data['antardasha_years']
+                )
+                return {'pratyantardashas': pratyantardashas}
+
+            return respond(dasha_flight.do(request_key(data), calculate))
+        
+        except CoalesceBusy as e:
+            return busy_response(e)
+        except ValueError as e:
+            log.warning('invalid dasha request: %s', e)
+            return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
+        except Exception as e:
+            log.exception('dasha request failed')
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+    @app.route('/api/dashas/window', methods=['POST'])
+    def get_dasha_window():
+        # Every period down to `depth` (1-5) overlapping start..end (ISO dates, end
+        # exclusive), a page of `limit` at a time; pass next_cursor back as cursor
+        try:
+            data = request.json
+
+            if not data:
+                return jsonify({'error': 'No JSON data provided'}), 400
+
+            birth_data = data.get('birth_data')
+            if not birth_data:
+                return jsonify({'error': 'Missing birth_data'}), 400
+
+            birth_date = datetime(
+                birth_data['year'], birth_data['month'], birth_data['day']
+            )
+
+            moon_nakshatra_degree = data.get('moon_nakshatra_degree')
+            moon_nakshatra = data.get('moon_nakshatra')
+
+            if moon_nakshatra_degree is None or moon_nakshatra is None:
+                return jsonify({'error': 'Missing moon nakshatra data'}), 400
+            if not data.get('start') or not data.get('end'):
+                return jsonify({'error': 'start and end are required'}), 400
+            if not isinstance(data['start'], str) or not isinstance(data['end'], str):
+                return jsonify({'error': 'start and end must be YYYY-MM-DD or ISO date-time strings'}), 400
+            if data.get('cursor') is not None and not isinstance(data['cursor'], str):
+                return jsonify({'error': 'cursor must be the next_cursor string of the previous page'}), 400
+
+            start_jd = datetime_to_jd(datetime.fromisoformat(data['start']))
+            end_jd = datetime_to_jd(datetime.fromisoformat(data['end']))
+            if end_jd <= start_jd:
+                return jsonify({'error': 'end must be after start'}), 400
+
             calculator = DashaCalculator(birth_date, moon_nakshatra_degree, moon_nakshatra)
-            
-            pratyantardashas = calculator.calculate_pratyantardashas(
-                mahadasha_planet=data['mahadasha_planet'],
-                antar_planet=data['antardasha_planet'],
-                start_date_str=data['start_date'],
-                antar_years=data['antardasha_years']
+            periods, next_cursor = window_page(
+                calculator, start_jd, end_jd, depth=int_field(data, 'depth', 3),
+                limit=int_field(data, 'limit', 500), cursor=data.get('cursor')
             )
 
-            return jsonify({'pratyantardashas': pratyantardashas})
-        
+            return respond({
+                'start': data['start'],
+                'end': data['end'],
+                'count': len(periods),
+                'periods': periods,
+                'next_cursor': next_cursor
+            })
+
+        except ValueError as e:
+            log.warning('invalid dasha request: %s', e)
+            return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
+        except Exception as e:
+            log.exception('dasha request failed')
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+    @app.route('/api/dashas/tree', methods=['POST'])
+    def get_dasha_tree():
+        # Whole hierarchy in one response: depth 1-5 (maha down to prana),
+        # format 'columnar' (default) or 'nested', dates adds YYYY-MM-DD strings
+        try:
+            data = request.json
+
+            if not data:
+                return jsonify({'error': 'No JSON data provided'}), 400
+
+            birth_data = data.get('birth_data')
+            if not birth_data:
+                return jsonify({'error': 'Missing birth_data'}), 400
+
+            birth_date = datetime(
+                birth_data['year'], birth_data['month'], birth_data['day']
+            )
+
+            moon_nakshatra_degree = data.get('moon_nakshatra_degree')
+            moon_nakshatra = data.get('moon_nakshatra')
+
+            if moon_nakshatra_degree is None or moon_nakshatra is None:
+                return jsonify({'error': 'Missing moon nakshatra data'}), 400
+
+            depth = int_field(data, 'depth', 3)
+            num_cycles = int_field(data, 'num_cycles', 2)
+            nested = data.get('format', 'columnar') == 'nested'
+
+            calculator = DashaCalculator(birth_date, moon_nakshatra_degree, moon_nakshatra)
+            tree = calculator.calculate_tree(depth=depth, num_cycles=num_cycles)
+
+            return respond({
+                'depth': depth,
+                'format': 'nested' if nested else 'columnar',
+                'tree': tree_to_json(tree, nested=nested, dates=bool(data.get('dates')))
+            })
+
         except ValueError as e:
-            print(f"ValueError: {e}")
+            log.warning('invalid dasha request: %s', e)
             return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
         except Exception as e:
-            print(f"Exception: {e}")
-            import traceback
-            traceback.print_exc()
-            return jsonify({'error': f'Server error: {str(e)}'}), 500
\ No newline at end of file
+            log.exception('dasha request failed')
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
+
+    @app.route('/api/dashas/at', methods=['POST'])
+    def get_dashas_at():
+        # Which dashas are running on each of `dates` (YYYY-MM-DD or ISO date-times), depth 1-5
+        try:
+            data = request.json
+
+            if not data:
+                return jsonify({'error': 'No JSON data provided'}), 400
+
+            birth_data = data.get('birth_data')
+            if not birth_data:
+                return jsonify({'error': 'Missing birth_data'}), 400
+
+            birth_date = datetime(
+                birth_data['year'], birth_data['month'], birth_data['day']
+            )
+
+            moon_nakshatra_degree = data.get('moon_nakshatra_degree')
+            moon_nakshatra = data.get('moon_nakshatra')
+            dates = data.get('dates')
+
+            if moon_nakshatra_degree is None or moon_nakshatra is None:
+                return jsonify({'error': 'Missing moon nakshatra data'}), 400
+            if not isinstance(dates, list):
+                return jsonify({'error': 'dates must be a list'}), 400
+            if len(dates) > MAX_LOOKUP_DATES:
+                return jsonify({'error': f'At most {MAX_LOOKUP_DATES} dates per request'}), 400
+            if not all(isinstance(date, str) for date in dates):
+                return jsonify({'error': 'dates must be YYYY-MM-DD or ISO date-time strings'}), 400
+
+            calculator = DashaCalculator(birth_date, moon_nakshatra_degree, moon_nakshatra)
+            index = DashaIndex(calculator, depth=int_field(data, 'depth', 3))
+
+            jds = [datetime_to_jd(datetime.fromisoformat(date)) for date in dates]
+            found = index.lookup(jds)
+
+            results = []
+            for i, date in enumerate(dates):
+                result = {'date': date}
+                for level, planets, starts, ends, indices in zip(
+                        index.levels, index.planets, index.starts, index.ends, found):
+                    j = indices[i]
+                    result[level] = None if j < 0 else {
+                        'planet': DashaCalculator.PLANET_SEQUENCE[planets[j]],
+                        'start_date': jd_to_date_str(starts[j]),
+                        'end_date': jd_to_date_str(ends[j])
+                    }
+                results.append(result)
+
+            return respond({'results': results})
+
+        except ValueError as e:
+            log.warning('invalid dasha request: %s', e)
+            return jsonify({'error': f'Invalid data format: {str(e)}'}), 400
+        except Exception as e:
+            log.exception('dasha request failed')
+            return jsonify({'error': f'Server error: {str(e)}'}), 500
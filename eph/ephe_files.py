@@ -0,0 +1,192 @@
+import mmap
+import os
+import re
+import struct
+
+import swisseph as swe
+
+#################### Ephemeris Data Files ###################
+# Validates the Swiss Ephemeris .se1 files at start-up, works out which dates they
+# cover, and maps them read-only. Swiss Ephemeris still does its own reads, but
+# those are then served from the page cache, which every worker process on the
+# host shares (one resident copy instead of one read path per worker).
+#
+# Outside the covered dates Swiss Ephemeris quietly switches to the less precise
+# Moshier ephemeris; check_coverage() turns that into an error before any work
+# is done.
+
+# sepl_18.se1: planets, 1800-2400 AD. 'm' before the century means BC (seplm06...)
+FILE_NAME = re.compile(r'^se(pl|mo|as)_(m?)(\d+)\.se1$')
+KINDS = {'pl': 'planets', 'mo': 'moon', 'as': 'asteroids'}
+
+# Files the chart calculations can't do without (the lunar nodes need none)
+REQUIRED_KINDS = ('planets', 'moon')
+
+ENDIAN_TEST = 0x616263
+
+class EphemerisFileError(ValueError):
+    pass
+
+class OutOfCoverageError(ValueError):
+    pass
+
+def jd_to_iso(jd):
+    year, month, day, _ = swe.revjul(jd)
+    return f'{year:04d}-{month:02d}-{day:02d}'
+
+def read_header(data, name):
+    # The three text lines, then: endian test, file length, DE number (int32 each),
+    # start and end julian day (doubles), number of bodies (int16) and their ids
+    if data[:8] != b'SWISSEPH':
+        raise EphemerisFileError(f'{name}: not a Swiss Ephemeris file')
+
+    offset = 0
+    for _ in range(3):
+        offset = data.find(b'\n', offset) + 1
+        if offset == 0:
+            raise EphemerisFileError(f'{name}: corrupt header')
+
+    test, length, de_number = struct.unpack_from('<iii', data, offset)
+    endian = '<'
+    if test != ENDIAN_TEST:
+        test, length, de_number = struct.unpack_from('>iii', data, offset)
+        endian = '>'
+        if test != ENDIAN_TEST:
+            raise EphemerisFileError(f'{name}: corrupt header')
+
+    if length != len(data):
+        raise EphemerisFileError(f'{name}: truncated ({len(data)} of {length} bytes)')
+
+    start_jd, end_jd = struct.unpack_from(endian + 'dd', data, offset + 12)
+    bodies, = struct.unpack_from(endian + 'h', data, offset + 28)
+
+    return {'de_number': de_number, 'start_jd': start_jd, 'end_jd': end_jd, 'bodies': bodies % 256}
+
+class EphemerisFile:
+
+    def __init__(self, path, kind, header, mapping):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.kind = kind
+        self.de_number = header['de_number']
+        self.start_jd = header['start_jd']
+        self.end_jd = header['end_jd']
+        self.bodies = header['bodies']
+        self.mapping = mapping
+
+    def info(self):
+        return {
+            'file': self.name,
+            'kind': self.kind,
+            'de': self.de_number,
+            'start': jd_to_iso(self.start_jd),
+            'end': jd_to_iso(self.end_jd),
+            'bytes': len(self.mapping) if self.mapping is not None else os.path.getsize(self.path)
+        }
+
+def merge_spans(spans):
+    # Overlapping / touching (start, end) spans joined together
+    merged = []
+    for start, end in sorted(spans):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def intersect_spans(first, second):
+    spans = []
+    for a_start, a_end in first:
+        for b_start, b_end in second:
+            start, end = max(a_start, b_start), min(a_end, b_end)
+            if start < end:
+                spans.append((start, end))
+    return spans
+
+class EphemerisFiles:
+
+    def __init__(self, path, preload=True):
+        self.path = path
+        self.files = []
+        self.spans = [] # julian day spans every REQUIRED_KINDS file covers
+
+        if not os.path.isdir(path):
+            raise EphemerisFileError(f'Ephemeris directory not found: {path}')
+
+        for name in sorted(os.listdir(path)):
+            match = FILE_NAME.match(name)
+            if match:
+                self.files.append(self.open(os.path.join(path, name), KINDS[match.group(1)], preload))
+
+        by_kind = {kind: merge_spans((f.start_jd, f.end_jd) for f in self.files if f.kind == kind)
+                   for kind in REQUIRED_KINDS}
+        if all(by_kind.values()):
+            spans = by_kind[REQUIRED_KINDS[0]]
+            for kind in REQUIRED_KINDS[1:]:
+                spans = intersect_spans(spans, by_kind[kind])
+            self.spans = spans
+
+    def open(self, path, kind, preload):
+        if not os.path.getsize(path):
+            raise EphemerisFileError(f'{os.path.basename(path)}: empty file')
+
+        with open(path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            header = read_header(mapping, os.path.basename(path))
+        except (EphemerisFileError, struct.error) as e:
+            mapping.close()
+            raise EphemerisFileError(str(e))
+
+        if preload and hasattr(mapping, 'madvise'):
+            # Ask the kernel to read the whole file into the page cache now
+            mapping.madvise(mmap.MADV_WILLNEED)
+
+        return EphemerisFile(path, kind, header, mapping)
+
+    def missing(self):
+        return [kind for kind in REQUIRED_KINDS if not any(f.kind == kind for f in self.files)]
+
+    def covers(self, start_jd, end_jd=None):
+        end_jd = start_jd if end_jd is None else end_jd
+        return any(start <= start_jd and end_jd <= end for start, end in self.spans)
+
+    def check(self, start_jd, end_jd=None):
+        if not self.covers(start_jd, end_jd):
+            requested = jd_to_iso(start_jd) + ('' if end_jd is None else ' to ' + jd_to_iso(end_jd))
+            available = ', '.join(f'{jd_to_iso(start)} to {jd_to_iso(end)}' for start, end in self.spans) or 'none'
+            raise OutOfCoverageError(f'Date {requested} is outside the ephemeris files (available: {available})')
+
+    def coverage(self):
+        return {
+            'path': self.path,
+            'files': [f.info() for f in self.files],
+            'spans': [{'start': jd_to_iso(start), 'end': jd_to_iso(end)} for start, end in self.spans],
+            'missing': self.missing()
+        }
+
+    def close(self):
+        for f in self.files:
+            if f.mapping is not None:
+                f.mapping.close()
+                f.mapping = None
+
+# The files of the configured ephemeris path (see chart.configure_ephemeris)
+current = None
+
+def load(path, preload=True):
+    global current
+    if current is not None:
+        current.close()
+    current = EphemerisFiles(path, preload)
+    return current
+
+def check_coverage(start_jd, end_jd=None):
+    # Raises OutOfCoverageError for dates the files can't serve. Does nothing until
+    # load() has run, or when there are no files at all (Moshier was asked for).
+    if current is not None and current.files:
+        current.check(start_jd, end_jd)
+
+def coverage():
+    return current.coverage() if current is not None else None
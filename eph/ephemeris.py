@@ -0,0 +1,204 @@
+import json
+from datetime import datetime
+
+import numpy as np
+import swisseph as swe
+from flask import Response, jsonify, request
+
+from chart import PLANETS, SIGNS, NAKSHATRAS, FLAGS, set_sidereal_mode, get_julian_day
+from classify import classify_longitudes
+from serialize import respond
+from ephe_files import check_coverage
+from chebyshev import current_store
+
+STREAM_THRESHOLD = 100_000 # samples (times x planets) above which the response is streamed
+MAX_SAMPLES = 5_000_000
+
+# Ephemeris calls one request may make (swe.calc per planet and sample, swe.houses_ex2
+# per sample for lat/lon houses), 10-20us each. 500,000 is a century of daily
+# positions for every planet, or a year of 10 minute ones.
+MAX_RANGE_CALLS = 500_000
+
+STEP_UNITS = {'m': 1 / 1440, 'h': 1 / 24, 'd': 1.0}
+
+#################### Time Series Helpers ###################
+
+def parse_step(step):
+    # Step as a number of days, or a string like '30m', '6h', '1d'
+    if isinstance(step, str):
+        unit = step[-1].lower()
+        if unit not in STEP_UNITS:
+            raise ValueError(f"Unknown step unit: {step}")
+        step_days = float(step[:-1]) * STEP_UNITS[unit]
+    else:
+        step_days = float(step)
+
+    if step_days < STEP_UNITS['m']:
+        raise ValueError('Step must be at least one minute')
+
+    return step_days
+
+def parse_date(value, tzoffset=0.0):
+    # ISO date/time string ('2026-01-01' or '2026-01-01T06:30') to julian day (ET)
+    moment = datetime.fromisoformat(value)
+    return get_julian_day(
+        moment.year, moment.month, moment.day,
+        moment.hour, moment.minute, moment.second, tzoffset
+    )
+
+def sample_count(start_jd, end_jd, step_days):
+    # How many julian_days() there are, without building them
+    return int(np.floor((end_jd - start_jd) / step_days + 1e-9)) + 1
+
+def julian_days(start_jd, end_jd, step_days):
+    # Evenly spaced julian days from start to end (inclusive), no per-point date conversion
+    return start_jd + np.arange(sample_count(start_jd, end_jd, step_days)) * step_days
+
+def planet_ids(planets=None):
+    # Resolve a subset of PLANETS names (all of them if None)
+    if planets is None:
+        return dict(PLANETS)
+
+    unknown = [name for name in planets if name not in PLANETS]
+    if unknown:
+        raise ValueError(f"Unknown planet(s): {', '.join(unknown)}")
+
+    return {name: PLANETS[name] for name in planets}
+
+def moving_ascendants(jds, lat, lon, hsys=b'W'):
+    # Ascendant for a fixed place at every julian day. The sidereal mode is per thread,
+    # so set it here too: a new request thread would otherwise use Fagan/Bradley
+    set_sidereal_mode()
+    houses_ex2 = swe.houses_ex2
+    return np.array([houses_ex2(jd, lat, lon, hsys, FLAGS)[1][0] for jd in jds.tolist()])
+
+def estimate_calls(start_jd, end_jd, times, planet_count, houses=False):
+    # Ephemeris calls for a range: none for planets the position store covers
+    store = current_store()
+    calls = 0 if store is not None and store.covers(start_jd, end_jd) else times * planet_count
+    return calls + (times if houses else 0)
+
+#################### Ephemeris Range ###################
+
+def iter_planet_series(jds, planets=None, ascendants=None):
+    # Yields (name, columns) one planet at a time so large ranges can be streamed.
+    # ascendants is a single natal ascendant or one per julian day; no houses if None.
+    set_sidereal_mode()
+    calc = swe.calc
+    flags = FLAGS | swe.FLG_SPEED
+    jd_list = jds.tolist()
+
+    store = current_store()
+
+    for name, planet_id in planet_ids(planets).items():
+        if store is not None:
+            # Precomputed series (swe.calc for any instants outside the store)
+            longitudes, speeds = store.positions(jds, name)
+        else:
+            # Tight loop over time for one planet (keeps the ephemeris file reads sequential)
+            positions = np.array([calc(jd, planet_id, flags)[0] for jd in jd_list])
+            longitudes, speeds = positions[:, 0], positions[:, 3]
+
+        classified = classify_longitudes(longitudes, ascendants)
+
+        columns = {
+            'longitude': longitudes,
+            'speed': speeds,
+            'sign': classified['sign_index'],
+            'nakshatra': classified['nakshatra_index']
+        }
+        if ascendants is not None:
+            columns['house'] = classified['house']
+
+        yield name, columns
+
+def ephemeris_range(start_jd, end_jd, step_days, planets=None, ascendants=None):
+    # Library API: columnar NumPy arrays for each planet over a date range
+    jds = julian_days(start_jd, end_jd, step_days)
+    return {
+        'jd': jds,
+        'planets': dict(iter_planet_series(jds, planets, ascendants))
+    }
+
+def columns_to_json(columns):
+    return {key: values.tolist() for key, values in columns.items()}
+
+def stream_range(jds, planets, ascendants):
+    # The same JSON document as the non-streamed response, written one planet at a time
+    yield '{"success": true, "signs": ' + json.dumps(SIGNS)
+    yield ', "nakshatras": ' + json.dumps(NAKSHATRAS)
+    yield ', "jd": ' + json.dumps(jds.tolist())
+    yield ', "planets": {'
+
+    for i, (name, columns) in enumerate(iter_planet_series(jds, planets, ascendants)):
+        yield (', ' if i else '') + json.dumps(name) + ': ' + json.dumps(columns_to_json(columns))
+
+    yield '}}'
+
+def register_ephemeris_routes(app):
+
+    @app.route('/api/ephemeris/range', methods=['POST'])
+    def get_ephemeris_range():
+        # Expects JSON with: start, end (ISO dates), step ('30m', '6h', '1d' or days),
+        # optional planets, tzoffset, and either ascendant (natal) or lat/lon for houses
+        try:
+            data = request.json
+
+            if not data:
+                return jsonify({'success': False, 'error': 'No JSON data provided'}), 400
+
+            tzoffset = data.get('tzoffset', 0.0)
+            start_jd = parse_date(data['start'], tzoffset)
+            end_jd = parse_date(data['end'], tzoffset)
+            step_days = parse_step(data.get('step', '1d'))
+            planets = data.get('planets')
+
+            if end_jd < start_jd:
+                return jsonify({'success': False, 'error': 'end must not be before start'}), 400
+
+            check_coverage(start_jd, end_jd)
+
+            # Sized before anything is allocated or calculated
+            times = sample_count(start_jd, end_jd, step_days)
+            samples = times * len(planet_ids(planets))
+
+            if samples > MAX_SAMPLES:
+                return jsonify({'success': False, 'error': f'Too many samples ({samples}), use a larger step'}), 400
+
+            moving = data.get('ascendant') is None and data.get('lat') is not None and data.get('lon') is not None
+            estimate = estimate_calls(start_jd, end_jd, times, len(planet_ids(planets)), moving)
+            if estimate > MAX_RANGE_CALLS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Range too large (about {estimate} ephemeris calls, at most {MAX_RANGE_CALLS}), '
+                             'use a larger step, a shorter range or fewer planets'
+                }), 400
+
+            jds = julian_days(start_jd, end_jd, step_days)
+
+            ascendants = None
+            if data.get('ascendant') is not None:
+                ascendants = float(data['ascendant'])
+            elif moving:
+                hsys = data.get('hsys', 'W')
+                if isinstance(hsys, str):
+                    hsys = hsys.encode('ascii')
+                ascendants = moving_ascendants(jds, data['lat'], data['lon'], hsys)
+
+            if samples > STREAM_THRESHOLD:
+                return Response(stream_range(jds, planets, ascendants), mimetype='application/json')
+
+            series = dict(iter_planet_series(jds, planets, ascendants))
+
+            return respond({
+                'success': True,
+                'signs': SIGNS,
+                'nakshatras': NAKSHATRAS,
+                'jd': jds.tolist(),
+                'planets': {name: columns_to_json(columns) for name, columns in series.items()}
+            })
+
+        except (KeyError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'Invalid data format: {str(e)}'}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e), 'error_type': type(e).__name__}), 500
@@ -0,0 +1,294 @@
+import math
+
+import swisseph as swe
+from flask import jsonify, request
+
+from chart import PLANETS, SIGNS, NAKSHATRAS, FLAGS, set_sidereal_mode
+from classify import SIGN_SIZE, NAKSHATRA_SIZE
+from ephemeris import parse_date, planet_ids
+from ephe_files import check_coverage
+from serialize import respond
+
+EVENT_TYPES = ('ingress', 'nakshatra', 'station')
+
+# Boundary spacing and names for each kind of crossing
+BOUNDARIES = {
+    'ingress': (SIGN_SIZE, SIGNS),
+    'nakshatra': (NAKSHATRA_SIZE, NAKSHATRAS)
+}
+
+# Coarse sampling step (days) per planet. Short enough that a retrograde loop
+# can't start and finish between two samples and no planet moves anywhere near
+# 180 degrees in one step, long enough to need far fewer calls than fixed-step scanning.
+GRID_STEPS = {
+    'Sun': 8.0, 'Moon': 4.0, 'Mercury': 2.0, 'Venus': 3.0, 'Mars': 4.0,
+    'Jupiter': 8.0, 'Saturn': 8.0, 'Rahu': 30.0
+}
+
+TOLERANCE = 1e-6 # days (~0.09 seconds)
+MAX_ITERATIONS = 50
+
+# Average degrees per day, counting the retrograde loops (Mercury and Venus cross
+# more boundaries than the Sun they stay close to). Only used to estimate the work.
+MEAN_MOTION = {
+    'Sun': 0.986, 'Moon': 13.18, 'Mercury': 1.22, 'Venus': 1.04, 'Mars': 0.56,
+    'Jupiter': 0.13, 'Saturn': 0.07, 'Rahu': 0.053
+}
+
+# Ephemeris calls one /api/events request may need: a search costs about one call per
+# grid sample plus one per event, 10-50us each. 150,000 covers a century of every
+# event type for every planet (about 140,000 calls, a few seconds); a century of
+# Moon nakshatra changes is about 45,000.
+MAX_SEARCH_CALLS = 150_000
+
+def wrap180(angle):
+    # Difference of two longitudes folded into -180..180
+    return (angle + 180.0) % 360.0 - 180.0
+
+def jd_to_iso(jd):
+    # Ephemeris time julian day to a UTC timestamp string
+    year, month, day, hour, mins, secs = swe.jdet_to_utc(jd, swe.GREG_CAL)
+    return f"{year:04d}-{month:02d}-{day:02d}T{hour:02d}:{mins:02d}:{int(secs):02d}Z"
+
+#################### Event Search ###################
+
+class EventSearch:
+
+    def __init__(self, planet, planet_id):
+        self.planet = planet
+        self.planet_id = planet_id
+        self.flags = FLAGS | swe.FLG_SPEED
+        self.calls = 0 # ephemeris calls made, for comparing against fixed-step sampling
+
+    def position(self, jd):
+        self.calls += 1
+        pos = swe.calc(jd, self.planet_id, self.flags)[0]
+        return pos[0], pos[3] # longitude, speed
+
+    def find_station(self, t0, v0, t1, v1):
+        # Speed changes sign between t0 and t1: regula falsi (Illinois variant) on the speed
+        side = 0
+        t = t0
+        for _ in range(MAX_ITERATIONS):
+            t = (t0 * v1 - t1 * v0) / (v1 - v0)
+            _, v = self.position(t)
+
+            if (v > 0) == (v1 > 0):
+                t1, v1 = t, v
+                if side == 1:
+                    v0 /= 2
+                side = 1
+            else:
+                t0, v0 = t, v
+                if side == -1:
+                    v1 /= 2
+                side = -1
+
+            if t1 - t0 < TOLERANCE:
+                break
+
+        return t
+
+    def find_crossing(self, boundary, direction, t0, lon0, v0, t1, arc, v1):
+        # Motion is monotonic between t0 and t1, covering `arc` degrees (signed).
+        # Guess the time from a cubic Hermite fit of the two samples, then polish
+        # it with Newton steps on the real ephemeris, falling back to bisection.
+        h = t1 - t0
+        target = (boundary - lon0) * direction % 360.0 * direction # signed distance from lon0
+
+        # Cubic Hermite through both samples: offset(s) = a3 s^3 + a2 s^2 + a1 s, s in 0..1
+        a1 = h * v0
+        a2 = 3 * arc - 2 * h * v0 - h * v1
+        a3 = -2 * arc + h * v0 + h * v1
+
+        s = target / arc if arc else 0.5
+        for _ in range(8):
+            slope = (3 * a3 * s + 2 * a2) * s + a1
+            if slope == 0:
+                break
+            ds = (((a3 * s + a2) * s + a1) * s - target) / slope
+            s -= ds
+            if abs(ds) < 1e-7:
+                break
+
+        s = min(max(s, 0.0), 1.0)
+        acceleration = (6 * a3 * s + 2 * a2) / (h * h)
+
+        lo, hi = t0, t1
+        t = t0 + s * h
+        for _ in range(MAX_ITERATIONS):
+            lon, v = self.position(t)
+            g = wrap180(lon - boundary) * direction # negative before the crossing, positive after
+
+            if g < 0:
+                lo = t
+            else:
+                hi = t
+
+            if v * direction > 0:
+                dt = -wrap180(lon - boundary) / v
+                # Newton converges quadratically, so once the next error is tiny we can stop
+                if 0.5 * abs(acceleration) * dt * dt / abs(v) < TOLERANCE / 10 and abs(dt) < 0.1:
+                    return min(max(t + dt, lo), hi)
+                t_next = t + dt
+            else:
+                t_next = None
+
+            if t_next is None or not (lo < t_next < hi):
+                t_next = (lo + hi) / 2 # Newton left the bracket, bisect instead
+
+            if hi - lo < TOLERANCE:
+                return (lo + hi) / 2
+            t = t_next
+
+        return t
+
+    def search(self, start_jd, end_jd, types):
+        step = GRID_STEPS.get(self.planet, 4.0)
+        count = max(1, math.ceil((end_jd - start_jd) / step))
+        step = (end_jd - start_jd) / count
+
+        boundaries = [(event_type, BOUNDARIES[event_type]) for event_type in types if event_type in BOUNDARIES]
+        events = []
+
+        t0 = start_jd
+        lon0, v0 = self.position(t0)
+
+        for i in range(1, count + 1):
+            t1 = start_jd + i * step
+            lon1, v1 = self.position(t1)
+
+            # Split the step at a station so every piece moves in one direction
+            pieces = []
+            if (v0 > 0) != (v1 > 0) and v0 != 0 and v1 != 0:
+                ts = self.find_station(t0, v0, t1, v1)
+                lons, _ = self.position(ts)
+                pieces.append((t0, lon0, v0, ts, lons, 0.0, v0))
+                pieces.append((ts, lons, 0.0, t1, lon1, v1, v1))
+
+                if 'station' in types:
+                    events.append({
+                        'type': 'station',
+                        'planet': self.planet,
+                        'jd': ts,
+                        'longitude': lons,
+                        'direction': 'retrograde' if v0 > 0 else 'direct'
+                    })
+            else:
+                pieces.append((t0, lon0, v0, t1, lon1, v1, v1 if v1 else v0))
+
+            for ta, lona, va, tb, lonb, vb, moving in pieces:
+                direction = 1 if moving > 0 else -1
+                arc = (lonb - lona) * direction % 360.0 * direction
+
+                for event_type, (size, names) in boundaries:
+                    key = 'sign' if event_type == 'ingress' else 'nakshatra'
+
+                    # Boundary indices passed in (ta, tb]
+                    if direction > 0:
+                        first = math.floor(lona / size) + 1
+                        last = math.floor((lona + arc) / size)
+                        indices = range(first, last + 1)
+                    else:
+                        first = math.ceil(lona / size) - 1
+                        last = math.ceil((lona + arc) / size)
+                        indices = range(first, last - 1, -1)
+
+                    for j in indices:
+                        boundary = (j * size) % 360.0
+                        t = self.find_crossing(boundary, direction, ta, lona, va, tb, arc, vb)
+                        entering = (j if direction > 0 else j - 1) % len(names)
+
+                        events.append({
+                            'type': event_type,
+                            'planet': self.planet,
+                            'jd': t,
+                            'longitude': boundary,
+                            key: names[entering],
+                            'retrograde': direction < 0
+                        })
+
+            t0, lon0, v0 = t1, lon1, v1
+
+        return events
+
+def estimate_calls(start_jd, end_jd, types=EVENT_TYPES, planets=None):
+    # Roughly how many ephemeris calls find_events will make
+    days = end_jd - start_jd
+    calls = 0.0
+    for name in planet_ids(planets):
+        calls += days / GRID_STEPS[name]
+        for event_type in types:
+            if event_type in BOUNDARIES:
+                calls += days * MEAN_MOTION[name] / BOUNDARIES[event_type][0]
+    return int(calls)
+
+def find_events(start_jd, end_jd, types=EVENT_TYPES, planets=None, with_dates=True):
+    # Library API: every ingress / nakshatra change / station between two julian days (ET),
+    # sorted by time. Returns (events, ephemeris_calls).
+    unknown = [event_type for event_type in types if event_type not in EVENT_TYPES]
+    if unknown:
+        raise ValueError(f"Unknown event type(s): {', '.join(unknown)}")
+
+    set_sidereal_mode()
+    events = []
+    calls = 0
+
+    for name, planet_id in planet_ids(planets).items():
+        searcher = EventSearch(name, planet_id)
+        events.extend(searcher.search(start_jd, end_jd, types))
+        calls += searcher.calls
+
+    events.sort(key=lambda event: event['jd'])
+
+    if with_dates:
+        for event in events:
+            event['date'] = jd_to_iso(event['jd'])
+
+    return events, calls
+
+def register_event_routes(app):
+
+    @app.route('/api/events', methods=['GET'])
+    def get_events():
+        # Query: from, to (ISO dates, UTC), types=ingress,nakshatra,station, planets=Sun,Moon,...
+        try:
+            start = request.args.get('from')
+            end = request.args.get('to')
+
+            if not start or not end:
+                return jsonify({'success': False, 'error': 'from and to are required'}), 400
+
+            start_jd = parse_date(start)
+            end_jd = parse_date(end)
+
+            if end_jd <= start_jd:
+                return jsonify({'success': False, 'error': 'to must be after from'}), 400
+
+            check_coverage(start_jd, end_jd)
+
+            types = request.args.get('types', ','.join(EVENT_TYPES)).split(',')
+            planets = request.args.get('planets')
+            planets = planets.split(',') if planets else list(PLANETS)
+
+            estimate = estimate_calls(start_jd, end_jd, types, planets)
+            if estimate > MAX_SEARCH_CALLS:
+                return jsonify({
+                    'success': False,
+                    'error': f'Search too large (about {estimate} ephemeris calls, at most {MAX_SEARCH_CALLS}), '
+                             'use a shorter range or fewer planets / types'
+                }), 400
+
+            events, calls = find_events(start_jd, end_jd, types, planets)
+
+            return respond({
+                'success': True,
+                'count': len(events),
+                'ephemeris_calls': calls,
+                'events': events
+            })
+
+        except ValueError as e:
+            return jsonify({'success': False, 'error': f'Invalid data format: {str(e)}'}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e), 'error_type': type(e).__name__}), 500
@@ -0,0 +1,168 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+#################### Logging ###################
+# Request handlers only put records on an in-memory queue; a background thread
+# formats them and writes to stderr, so no request waits on console I/O.
+#
+#   LOG_LEVEL        DEBUG / INFO (default) / WARNING / ERROR
+#   LOG_FORMAT       json (default) or text; `python main.py` defaults to text
+#   LOG_SAMPLE_RATE  fraction of per-request INFO/DEBUG records kept (default 1.0);
+#                    warnings and errors are always kept
+#
+# At DEBUG level the routes also log their verbose output (the chart table and
+# the dasha request bodies); the text format shows it as it used to be printed.
+
+ROOT = 'eph'
+
+LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+SAMPLE_RATE = float(os.environ.get('LOG_SAMPLE_RATE', 1.0))
+
+# Fields of a LogRecord that aren't worth repeating in every JSON line
+RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime'}
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line; keyword fields passed with extra={...} become keys
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in RECORD_FIELDS})
+
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+
+        return json.dumps(entry, default=str)
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+def make_formatter(log_format):
+    return logging.Formatter(TEXT_FORMAT) if log_format == 'text' else JsonFormatter()
+
+class SamplingFilter(logging.Filter):
+    # Keeps about `rate` of the records below WARNING
+
+    def __init__(self, rate=1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or self.rate >= 1.0 or random.random() < self.rate
+
+class QueueHandler(logging.handlers.QueueHandler):
+    # The stock handler folds the traceback into the message; keep it separate
+    # (as exc_text) so the JSON output gets its own 'exc' field
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class Logging:
+    # The queue handler on the 'eph' logger and the listener thread that drains it
+
+    def __init__(self):
+        self.queue = queue.SimpleQueue()
+        self.listener = None
+        self.format = FORMAT
+
+    def output(self):
+        handler = logging.StreamHandler(sys.stderr)
+        handler.setFormatter(make_formatter(self.format))
+        return handler
+
+    def set_format(self, log_format):
+        # Also switches the running listener's output
+        self.format = log_format.lower()
+        if self.listener is not None:
+            for handler in self.listener.handlers:
+                handler.setFormatter(make_formatter(self.format))
+
+    def start(self):
+        if self.listener is None:
+            self.listener = logging.handlers.QueueListener(self.queue, self.output())
+            self.listener.start()
+
+    def stop(self):
+        # Flushes whatever is still queued
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    def after_fork(self):
+        # A forked worker (e.g. gunicorn) inherits the queue but not the listener thread
+        self.queue = queue.SimpleQueue()
+        self.listener = None
+        for handler in logging.getLogger(ROOT).handlers:
+            if isinstance(handler, logging.handlers.QueueHandler):
+                handler.queue = self.queue
+        self.start()
+
+_logging = Logging()
+
+def setup_logging(level=None, sample_rate=None, log_format=None):
+    # Safe to call more than once; later calls only change the level / sample rate / format
+    logger = logging.getLogger(ROOT)
+    logger.setLevel((level or LEVEL).upper())
+
+    if not logger.handlers:
+        handler = QueueHandler(_logging.queue)
+        handler.addFilter(SamplingFilter(SAMPLE_RATE))
+        logger.addHandler(handler)
+        logger.propagate = False
+
+        _logging.start()
+        atexit.register(_logging.stop)
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=_logging.after_fork)
+
+    if log_format is not None:
+        _logging.set_format(log_format)
+
+    if sample_rate is not None:
+        for handler in logger.handlers:
+            for log_filter in handler.filters:
+                if isinstance(log_filter, SamplingFilter):
+                    log_filter.rate = sample_rate
+
+    return logger
+
+def get_logger(name):
+    return logging.getLogger(f'{ROOT}.{name}')
+
+def elapsed_ms(start):
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def chart_table(chart):
+    # The planet lines and house table /api/chart used to print on every request
+    lines = []
+    for name, info in chart['planets'].items():
+        # (":10" makes the output take up to characters. ":6.2f" is 6 characters 2 decimal places)
+        lines.append(f"{name:10} {info['degree']:6.2f}° - {info['sign']:12} {info['degree_in_sign']:5.2f}° - {info['nakshatra']:20} Pada {info['pada']} - Dignity: {info['dignity']:15} Strength: {info['strength_range']}")
+
+    lines.append("HOUSE SYSTEM:")
+    lines.append("=" * 60)
+    for house_num, house_info in chart['houses'].items():
+        lines.append(f"House {house_num:2}: {house_info['sign']:12}")
+    lines.append("=" * 60)
+
+    return '\n'.join(lines)
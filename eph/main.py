@@ -1,14 +1,81 @@
+import time
+IMPORT_START = time.perf_counter()
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import sys
+
 from flask import Flask, jsonify, request
 from flask_cors import CORS
 import swisseph as swe
 
+from logs import setup_logging, get_logger, elapsed_ms, chart_table
+setup_logging()
+log = get_logger('chart')
+
 app = Flask(__name__)
 CORS(app)
 
-from dasha import register_dasha_routes
-register_dasha_routes(app)
+from chart import (
+    PLANETS, SIGNS, NAKSHATRAS, FLAGS, AYANAMSA, get_sign, get_nakshatra, get_houses,
+    get_planet_house, PlanetaryStrength, set_sidereal_mode, parse_birth_data,
+    compute_chart, configure_ephemeris, warm_up, EPHE_PATH, parse_configurations,
+    compute_configurations
+)
+
+from vargas import parse_vargas, chart_vargas
+from cache import cache_from_env, make_chart_key
+from serialize import encode_json, respond_json_bytes
+chart_cache = cache_from_env()
+
+import coalesce
+from coalesce import CoalesceBusy, busy_response
+chart_flight = coalesce.flight('chart')
+
+from metrics import register_metrics_routes, stage
+register_metrics_routes(app)
+
+# The other route modules (and NumPy, which they need) are imported on their first
+# request; LAZY_ROUTES=off imports them all now. Add new rules here too
+# (python main.py --check-startup compares this table with the modules).
+ROUTE_MODULES = {
+    'dasha': ('register_dasha_routes', {
+        '/api/dashas/mahadashas': ['POST'],
+        '/api/dashas/antardashas': ['POST'],
+        '/api/dashas/pratyantardashas': ['POST'],
+        '/api/dashas/tree': ['POST'],
+        '/api/dashas/at': ['POST'],
+        '/api/dashas/window': ['POST']
+    }),
+    'batch': ('register_batch_routes', {'/api/charts/batch': ['POST']}),
+    'ephemeris': ('register_ephemeris_routes', {'/api/ephemeris/range': ['POST']}),
+    'events': ('register_event_routes', {'/api/events': ['GET']}),
+    'transits': ('register_transit_routes', {'/api/transits/overlay': ['POST']}),
+    'profiles': ('register_profile_routes', {'/api/profile': ['POST']})
+}
 
-swe.set_ephe_path('/Users/shelby/Coding Projects/Astro 2026/eph/ephe_data')
+import ephe_files
+from startup import register_lazy_routes, register_routes, check_routes
+if os.environ.get('LAZY_ROUTES', 'on').lower() in ('off', '0', 'false'):
+    register_routes(app, ROUTE_MODULES)
+else:
+    register_lazy_routes(app, ROUTE_MODULES)
+
+# Ephemeris files from EPHE_PATH (default: the bundled eph/ephe_data), opened and
+# exercised once before the app takes any traffic (EPHE_WARMUP=off skips that)
+configure_ephemeris()
+IMPORT_SECONDS = time.perf_counter() - IMPORT_START
+
+WARMUP_SECONDS = 0.0
+if os.environ.get('EPHE_WARMUP', 'on').lower() not in ('off', '0', 'false'):
+    warmup_start = time.perf_counter()
+    missing = warm_up()
+    WARMUP_SECONDS = time.perf_counter() - warmup_start
+    if missing:
+        log.warning('no ephemeris files for %s in %s, using the Moshier fallback', ', '.join(missing), EPHE_PATH)
 
 ############################ Test Data #############################
 """ 
@@ -23,281 +90,52 @@ lat = 33.03622
 lon = -85.03133
 hsys = b"W" # whole sign house system
 """
-######################## Arrays and Dictionaries ###################
-# A dictionary mapping string names to integar constants 
-PLANETS = {
-    'Sun': swe.SUN,
-    'Moon': swe.MOON,
-    'Mars': swe.MARS,
-    'Mercury': swe.MERCURY,
-    'Jupiter': swe.JUPITER,
-    'Venus': swe.VENUS,
-    'Saturn': swe.SATURN,
-    'Rahu': swe.MEAN_NODE  # or TRUE_NODE
-}
-
-SIGNS = [
-    'Aries', 'Taurus', 'Gemini', 'Cancer', 'Leo', 'Virgo', 'Libra', 
-    'Scorpio', 'Sagittarius', 'Capricorn', 'Aquarius', 'Pisces'
-]
-
-NAKSHATRAS = [
-    'Ashwini', 'Bharani', 'Krittika', 'Rohini', 'Mrigashira', 'Ardra',
-    'Punarvasu', 'Pushya', 'Ashlesha', 'Magha', 'Purva Phalguni', 'Uttara Phalguni',
-    'Hasta', 'Chitra', 'Swati', 'Vishakha', 'Anuradha', 'Jyeshtha',
-    'Mula', 'Purva Ashadha', 'Uttara Ashadha', 'Shravana', 'Dhanishta', 'Shatabhisha',
-    'Purva Bhadrapada', 'Uttara Bhadrapada', 'Revati'
-]
-
-#################### Sign, Nakshatra And House Functions ###################
-def get_sign(degree):
-    degree = degree % 360 # Normalize to 0-360
-    sign_num = int(degree / 30) # Get a sign num (0-11)
-    degree_in_sign = degree % 30 # Get degree within a sign (0-29.99)
-    return SIGNS[sign_num], degree_in_sign
-
-def get_nakshatra(degree):
-    degree = degree % 360 # Normalize to 0-360
-    nakshatra_size = 360 / 27 # Each nakshatra is 13.333... degrees (13°20')
-    nak_num = int(degree / nakshatra_size) # Get nakshatra number (0-26)
-    degree_in_nak = degree % nakshatra_size # Get degree within nakshatra
-    pada = int(degree_in_nak / (nakshatra_size / 4)) + 1 # Get pada (quarter) - each nakshatra has 4 padas
-    return NAKSHATRAS[nak_num], pada, degree_in_nak
-
-# Calculate houses
-def get_houses(ascendant_degree):
-    asc_sign_num = int(ascendant_degree / 30) % 12 # sign num(0-11)
-
-    houses = {}
-
-    for house_num in range(1, 13):
-        sign_num = (asc_sign_num + house_num - 1) % 12
-
-        houses[house_num] = {
-            'sign': SIGNS[sign_num],
-            'sign_number': sign_num,
-            'start_degree': sign_num * 30,
-            'end_degree': (sign_num * 30 + 30) % 360
-        }
-
-    return houses
-
-def get_planet_house(planet_degree, houses):
-    planet_degree = planet_degree % 360
-    planet_sign_num = int(planet_degree / 30)
-
-    # find which house for which sign
-    for house_num, house_info in houses.items():
-        if house_info['sign_number'] == planet_sign_num:
-            return house_num
-        
-    return 1 # default effect
-
-#################### Planet Strengths ###################
-
-class PlanetaryStrength:
-    def __init__(self):
-
-        self.exaltations = {
-            'Sun': 'Aries',
-            'Moon': 'Taurus',
-            'Mars': 'Capricorn',
-            'Mercury': 'Virgo',
-            'Jupiter': 'Cancer',
-            'Venus': 'Pisces',
-            'Saturn': 'Libra',
-            'Rahu': 'Scorpio',
-            'Ketu': 'Scorpio'
-        }
-
-        self.debilitations = {
-            'Sun': 'Libra',
-            'Moon': 'Scorpio',
-            'Mars': 'Cancer',
-            'Mercury': 'Pisces',
-            'Jupiter': 'Capricorn',
-            'Venus': 'Virgo',
-            'Saturn': 'Aries',
-            'Rahu': 'Taurus',
-            'Ketu': 'Taurus'
-        }
-
-        self.exalt_debil_degree = {
-            'Sun': 10,
-            'Moon': 3,
-            'Mars': 28,
-            'Mercury': 15,
-            'Jupiter': 5,
-            'Venus': 27,
-            'Saturn': 20,
-            'Rahu': None, 
-            'Ketu': None
-        }
-
-        self.positive_constellation = {
-            'Sun': 'Leo',
-            'Moon': 'Cancer',
-            'Mars': 'Aries',
-            'Mercury': 'Gemini',
-            'Jupiter': 'Sagittarius',
-            'Venus': 'Libra',
-            'Saturn': 'Aquarius',
-            'Rahu': None, 
-            'Ketu': None
-        }
+########################  FLASK ROUTE  ###############################
+def chart_body(jdet, lat, lon, hsys, configurations=None, varga_names=None):
+    # The encoded /api/chart response for parsed birth data
 
-        self.negative_constellation = {
-            'Sun': None,
-            'Moon': None,
-            'Mars': 'Scorpio',
-            'Mercury': 'Virgo',
-            'Jupiter': 'Pisces',
-            'Venus': 'Taurus',
-            'Saturn': 'Capricorn',
-            'Rahu': None, 
-            'Ketu': None
-        }
+#                           Set Mode                                 #
 
-        self.mulatrikona = {
-            'Sun': 'Leo',
-            'Moon': 'Taurus',
-            'Mars': 'Aries',
-            'Mercury': 'Virgo',
-            'Jupiter': 'Sagittarius',
-            'Venus': 'Libra',
-            'Saturn': 'Aquarius',
-            'Rahu': None, 
-            'Ketu': None
-        }
+    set_sidereal_mode()
 
-        self.mulatrikona_degree = {
-            'Sun': (0, 21),
-            'Moon': (4, 31),
-            'Mars': (0, 13),
-            'Mercury': (16, 21),
-            'Jupiter': (0, 11),
-            'Venus': (0, 16),
-            'Saturn': (0, 21),
-            'Rahu': None, 
-            'Ketu': None
-        }
+    if configurations is not None:
+        charts = compute_configurations(jdet, lat, lon, configurations)
+        if varga_names:
+            for configured in charts:
+                configured['vargas'] = chart_vargas(configured, varga_names)
+        with stage('chart.serialize'):
+            return encode_json({'success': True, 'configurations': charts})
 
-        self.friends = {
-            'Sun': ['Moon', 'Mars', 'Jupiter'],
-            'Moon': ['Sun', 'Mercury'],
-            'Mars': ['Sun', 'Moon', 'Jupiter'],
-            'Mercury': ['Sun', 'Venus'],
-            'Jupiter': ['Sun', 'Moon', 'Mars'],
-            'Venus': ['Mercury', 'Saturn'],
-            'Saturn': ['Mercury', 'Venus'],
-            'Rahu': [], 
-            'Ketu': []
-        }
+####################### Find Planet Data ###########################
+    chart = compute_chart(jdet, lat, lon, hsys)
+    houses = chart['houses']
 
-        self.neutrals = {
-            'Sun': ['Mercury'],
-            'Moon': ['Venus', 'Mars', 'Jupiter', 'Saturn'],
-            'Mars': ['Venus', 'Saturn'],
-            'Mercury': ['Mars', 'Saturn', 'Jupiter'],
-            'Jupiter': ['Saturn'],
-            'Venus': ['Mars', 'Jupiter'],
-            'Saturn': ['Jupiter'],
-            'Rahu': [], 
-            'Ketu': []
-        }
+    # Divisional charts straight from the longitudes above, no more ephemeris calls
+    vargas = chart_vargas(chart, varga_names) if varga_names else None
 
-        self.enemies = {
-            'Sun': ['Venus', 'Saturn'],
-            'Moon': ['None'],
-            'Mars': ['Mercury'],
-            'Mercury': ['Moon'],
-            'Jupiter': ['Mercury', 'Venus'],
-            'Venus': ['Sun', 'Moon'],
-            'Saturn': ['Sun', 'Moon', 'Mars'],
-            'Rahu': [], 
-            'Ketu': []
-        }
+    # The planet / house table, only built when debug logging is on
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('chart table\n' + chart_table(chart))
 
-        self.rulerships = {
-            'Sun': ['Leo'],
-            'Moon': ['Cancer'],
-            'Mars': ['Aries', 'Scorpio'],
-            'Mercury': ['Gemini', 'Virgo'],
-            'Jupiter': ['Sagittarius', 'Pisces'],
-            'Venus': ['Taurus', 'Libra'],
-            'Saturn': ['Capricorn', 'Aquarius'],
-            'Rahu': [], 
-            'Ketu': []
+    payload = {
+        'success': True,
+        'ascendant': chart['ascendant'],
+        'planets': chart['planets'],
+        'houses': houses
         }
+    if vargas is not None:
+        payload['vargas'] = vargas
 
-        pass
-
-    def get_sign_ruler(self, sign):
-        for planet, signs in self.rulerships.items(): # For the planet and sign
-            if sign in signs:
-                return planet
-        return None
-
-    # Calculate dignity / state
-    def get_dignity(self, planet, sign, degree=None):
-
-        if self.exaltations.get(planet) == sign: # if exalted planet equals current sign
-            return 'Exalted'
-                
-        elif self.mulatrikona.get(planet) == sign:
-            return 'Mulatrikona'
-        
-        elif self.positive_constellation.get(planet) == sign:
-            return 'Own Sign (positive)'
-        
-        elif self.negative_constellation.get(planet) == sign:
-            return 'Own Sign (negative)'
-        
-        sign_ruler = self.get_sign_ruler(sign)
-
-        if sign_ruler in self.friends.get(planet, []): # gets friends list 
-            return 'Friend Sign'
-        
-        elif sign_ruler in self.neutrals.get(planet, []):
-            return 'Neutral Sign'
-        
-        elif sign_ruler in self.enemies.get(planet, []):
-            return 'Enemy Sign'
-        
-        elif self.debilitations.get(planet) == sign:
-            return 'Debilitated'
-
-        return 'none'
-
-    def calculate_strength(self, planet, sign, degree=None):
-        dignity = self.get_dignity(planet, sign, degree)
-
-        match dignity:
-            case 'Exalted':
-                base_strength = "87.5 - 100"
-            case 'Mulatrikona':
-                base_strength = "75 - 87.5"
-            case 'Own Sign (positive)':
-                base_strength = "62.5 - 75"
-            case 'Own Sign (negative)':
-                base_strength = "50 - 62.5"
-            case 'Friend Sign':
-                base_strength = "37.5 - 50"
-            case 'Neutral Sign':
-                base_strength = "25 - 37.5"
-            case 'Enemy Sign':
-                base_strength = "12.5 - 25"
-            case 'Debilitated':
-                base_strength = "0 - 12.5"
-            case _:
-                base_strength = "N/A"
-
-        return base_strength
+    with stage('chart.serialize'):
+        return encode_json(payload)
 
-########################  FLASK ROUTE  ###############################
 @app.route('/api/chart', methods=['POST'])
 def calculate_chart():
-    # Expects JSON with: year, month, day, hour, minute, latitude, longitude
+    # Expects JSON with: year, month, day, hour, minute, latitude, longitude.
+    # Optional configurations, e.g. [{"ayanamsa": "raman", "hsys": "P"}, ...], returns
+    # one chart per entry instead (see chart.compute_configurations).
+    # ?vargas=D9,D10 adds those divisional charts to each chart (see vargas.py)
+    start = time.perf_counter()
     try:
         data = request.json
 
@@ -307,98 +145,37 @@ def calculate_chart():
                 'error': 'No JSON data provided'
             }), 400
 
-        year = data['year']
-        month = data['month']
-        day = data['day']
-        hour = data['hour']
-        mins = data['mins']
-        secs = data['secs']
-        lat = data['lat']
-        lon = data['lon']
-        tzoffset = data['tzoffset']
-        hsys = data['hsys']
-
-        # 'W' becomes b'W'
-        if isinstance(hsys, str):
-            hsys = hsys.encode('ascii')
-        else:
-            hsys = hsys
+        jdet, lat, lon, hsys = parse_birth_data(data)
 
-#                           Set Mode                                 #
+        configurations = None
+        ayanamsa_key = AYANAMSA
+        if data.get('configurations') is not None:
+            configurations = parse_configurations(data['configurations'], hsys)
+            ayanamsa_key = ','.join(f'{ayanamsa}:{system}' for ayanamsa, system in configurations)
 
-        gregflag = 1
-        # Set Lahiri ayanamsa (most common for Vedic astrology)
-        swe.set_sid_mode(swe.SIDM_LAHIRI)
-        flags = swe.FLG_SWIEPH | swe.FLG_SIDEREAL
+        varga_names = parse_vargas(request.args['vargas']) if request.args.get('vargas') else None
 
-#                            Date Time / Conversion                  #
+        # Same birth data as an earlier request: send back the stored response as is
+        cache_key = make_chart_key(jdet, lat, lon, hsys, ayanamsa_key, FLAGS, varga_names)
+        with stage('chart.cache'):
+            cached = chart_cache.get(cache_key)
+        if cached is not None:
+            log.info('chart computed', extra={'jd': jdet, 'cached': True, 'ms': elapsed_ms(start)})
+            return respond_json_bytes(cached)
 
-        # Get UTC "Coordinated Universal Time"
-        utc = swe.utc_time_zone(year, month, day, hour, mins, secs, tzoffset)
+        def calculate():
+            body = chart_body(jdet, lat, lon, hsys, configurations, varga_names)
+            chart_cache.set(cache_key, body)
+            return body
 
-        # Get julian day number in Universal and Ephemeris Time
-        jd_tuple = swe.utc_to_jd(*utc)
-        jdet = jd_tuple[1]
+        # Identical requests already being calculated wait for that result
+        body = chart_flight.do(cache_key, calculate)
 
-####################### Find Planet Data ###########################
-        planet_data = {}
-
-        # Create an instance for PlanetaryStrength
-        strength_calculator = PlanetaryStrength()
-
-        # First calculate houses so we can reference them
-        house_data = swe.houses_ex2(jdet, lat, lon, hsys, flags)
-        ascendant_degree = house_data[1][0]
-        houses = get_houses(ascendant_degree)
-
-        for name, planet_id in PLANETS.items(): # assigns the identifiers to items in the dictionary 
-            # Get the position fron the API
-            pos = swe.calc(jdet, planet_id, flags)
-            degree = pos[0][0] # First in the tuple
-
-            # Calculate the sign and nakshatra
-            sign, degree_in_sign = get_sign(degree)
-            nakshatra, pada, degree_in_nak = get_nakshatra(degree)
-
-            # Calculate which house the planet is in
-            house_num = get_planet_house(degree, houses)
-
-            # Calculate planet strengths
-            dignity = strength_calculator.get_dignity(name, sign, degree_in_sign)
-            strength = strength_calculator.calculate_strength(name, sign, degree_in_sign)
-
-            # Store in a dictionary
-            planet_data[name] = {
-                'degree': float(degree),
-                'sign': sign,
-                'degree_in_sign': float(degree_in_sign),
-                'nakshatra': nakshatra,
-                'pada': int(pada),
-                'degree_in_nak': degree_in_nak,
-                'dignity': dignity,
-                'strength_range': strength,
-                'house': house_num
-            }
-
-            # Print formated output
-            # (":10" makes the output take up to characters. ":6.2f" is 6 characters 2 decimal places)
-            print(f"{name:10} {degree:6.2f}° - {sign:12} {degree_in_sign:5.2f}° - {nakshatra:20} Pada {pada} - Dignity: {dignity:15} Strength: {strength}") 
-
-####################### Find House Data ###########################
-
-        print("HOUSE SYSTEM:")
-        print("=" * 60)
-        for house_num, house_info in houses.items():
-            print(f"House {house_num:2}: {house_info['sign']:12}")
-
-        print("\n" + "=" * 60)
-
-        return jsonify({
-            'success': True,
-            'ascendant': ascendant_degree,
-            'planets': planet_data,
-            'houses': houses
-            })
+        log.info('chart computed', extra={'jd': jdet, 'cached': False, 'ms': elapsed_ms(start)})
+        return respond_json_bytes(body)
+
+    except CoalesceBusy as e:
+        return busy_response(e)
 
     except Exception as e:
         # Handle errors
@@ -412,12 +189,9 @@ def calculate_chart():
         tb_lines = traceback.format_exception(exc_type, exc_value, exc_traceback)
         tb_text = ''.join(tb_lines)
 
-        # Print to console (for your debugging)
-        print("=" * 60)
-        print("ERROR OCCURRED:")
-        print(tb_text)
-        print("=" * 60)
-        
+        # Log it (for your debugging)
+        log.error('chart request failed', exc_info=(exc_type, exc_value, exc_traceback))
+
         # Get just the last traceback entry (the actual error location)
         tb = traceback.extract_tb(exc_traceback)
         last_call = tb[-1] if tb else None
@@ -445,7 +219,10 @@ def health_check():
     """Simple endpoint to check if API is running"""
     return jsonify({
         'status': 'ok',
-        'message': 'Vedic Astrology API is running'
+        'message': 'Vedic Astrology API is running',
+        'chart_cache': chart_cache.stats(),
+        'coalescing': coalesce.stats(),
+        'ephemeris': ephe_files.coverage()
     })
 
 @app.route('/', methods=['GET'])
@@ -454,11 +231,19 @@ def home():
         'message': 'Vedic Astrology API',
         'endpoints': {
             '/api/health': 'GET - Check API status',
-            '/api/chart': 'POST - Calculate birth chart'
+            '/api/profile': 'POST - Chart plus Vimshottari dashas from its Moon, in one request',
+            '/api/chart': 'POST - Calculate birth chart (configurations: several ayanamsas / house systems, ?vargas=D9,D10 for divisional charts)',
+            '/api/charts/batch': 'POST - Calculate many birth charts (JSON array or NDJSON)',
+            '/api/ephemeris/range': 'POST - Planet positions over a date range',
+            '/api/events': 'GET - Sign ingresses, nakshatra changes and stations between two dates',
+            '/api/transits/overlay': 'POST - Transit houses and aspects for many natives at once',
+            '/api/metrics': 'GET - Latency metrics (Prometheus text, ?format=json)'
         }
     })
 
-swe.close 
+# Release the ephemeris files when the process exits (the ASGI mode closes them
+# itself on shutdown, see asgi.py)
+atexit.register(swe.close)
 
 # Unpack properly
 # cusps      = house_data[0]  # 12 house cusps
@@ -466,5 +251,49 @@ swe.close
 # cusps_spd  = house_data[2]  # optional: house cusp speeds
 # ascmc_spd  = house_data[3]  # optional: ASC/MC speeds
 
+STARTUP_TARGET_SECONDS = 0.3
+
+def check_startup():
+    # Import + warm-up + first chart request, as JSON; exit status 1 when over the
+    # target, when the ephemeris files are missing or when ROUTE_MODULES is stale
+    test_birth = {'year': 2000, 'month': 6, 'day': 16, 'hour': 1, 'mins': 11, 'secs': 11,
+                  'tzoffset': -4.0, 'lat': 33.03622, 'lon': -85.03133, 'hsys': 'W'}
+
+    start = time.perf_counter()
+    response = app.test_client().post('/api/chart', json=test_birth)
+    first_chart = time.perf_counter() - start
+
+    total = IMPORT_SECONDS + WARMUP_SECONDS + first_chart
+    report = {
+        'ephe_path': EPHE_PATH,
+        'import_ms': round(IMPORT_SECONDS * 1000, 1),
+        'warmup_ms': round(WARMUP_SECONDS * 1000, 1),
+        'first_chart_ms': round(first_chart * 1000, 1),
+        'total_ms': round(total * 1000, 1),
+        'target_ms': STARTUP_TARGET_SECONDS * 1000,
+        'first_chart_status': response.status_code,
+        'missing_ephemeris': warm_up(),
+        'ephemeris': ephe_files.coverage(),
+        'lazy_modules_loaded': [name for name in ROUTE_MODULES if name in sys.modules],
+        'route_problems': check_routes(ROUTE_MODULES)
+    }
+    print(json.dumps(report, indent=2))
+
+    ok = (total <= STARTUP_TARGET_SECONDS and response.status_code == 200
+          and not report['missing_ephemeris'] and not report['route_problems'])
+    return 0 if ok else 1
+
 if __name__ == '__main__':
-    app.run(debug=True, port=5001)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Vedic Astrology API')
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--check-startup', action='store_true',
+                        help='report import, warm-up and first chart time, then exit')
+    args = parser.parse_args()
+
+    if args.check_startup:
+        sys.exit(check_startup())
+
+    # The dev server keeps the old verbose console output (plain text, chart tables
+    # included) unless LOG_LEVEL / LOG_FORMAT say otherwise
+    setup_logging(level=os.environ.get('LOG_LEVEL', 'DEBUG'), log_format=os.environ.get('LOG_FORMAT', 'text'))
+    app.run(debug=True, port=args.port)
\ No newline at end of file
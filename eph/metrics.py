@@ -0,0 +1,209 @@
+import bisect
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, request
+
+from serialize import respond
+
+#################### Metrics ###################
+# Latency histograms for the stages of the hot paths (chart calculation, dasha
+# methods) and for every request, served at /api/metrics in the Prometheus text
+# format. Each process keeps its own numbers (one set per gunicorn worker).
+#
+#   METRICS=off           stage() and @timed become no-ops (decided at import)
+#   PROFILE_REQUESTS=on   allow "X-Profile: 1" on a request to get its cProfile
+#                         stats back instead of the normal response
+
+ENABLED = os.environ.get('METRICS', 'on').lower() not in ('off', '0', 'false')
+PROFILING = os.environ.get('PROFILE_REQUESTS', 'off').lower() in ('on', '1', 'true')
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Bucket upper bounds in seconds: 1 µs to ~100 s, four per doubling (quantiles within ~10%)
+BUCKETS = [1e-6 * 2 ** (i / 4) for i in range(108)]
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'total', 'errors', 'lock')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+        self.lock = threading.Lock()
+
+    def observe(self, seconds, error=False):
+        bucket = bisect.bisect_left(BUCKETS, seconds)
+        with self.lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += seconds
+            if error:
+                self.errors += 1
+
+    def quantile(self, q):
+        # Interpolated within the bucket holding the q-th observation (NaN when empty)
+        if not self.count:
+            return float('nan')
+        rank = q * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                upper = BUCKETS[min(bucket, len(BUCKETS) - 1)]
+                lower = BUCKETS[bucket - 1] if bucket else 0.0
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+        return BUCKETS[-1]
+
+class Registry:
+    # Histograms by (family, label value), created on first use
+
+    def __init__(self):
+        self.histograms = {}
+        self.lock = threading.Lock()
+
+    def get(self, family, label):
+        key = (family, label)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram())
+        return histogram
+
+    def clear(self):
+        with self.lock:
+            self.histograms.clear()
+
+    def snapshot(self):
+        # {family: {label: {'count', 'errors', 'sum', 'p50', 'p95', 'p99'}}}; the quantiles
+        # are None (null in JSON, which has no NaN) until there is an observation
+        families = {}
+        for (family, label), histogram in sorted(self.histograms.items()):
+            entry = {'count': histogram.count, 'errors': histogram.errors, 'sum': histogram.total}
+            entry.update({f'p{int(q * 100)}': histogram.quantile(q) if histogram.count else None
+                          for q in QUANTILES})
+            families.setdefault(family, {})[label] = entry
+        return families
+
+registry = Registry()
+
+# family -> (metric name, label name, help text)
+FAMILIES = {
+    'stage': ('eph_stage_seconds', 'stage', 'Time spent in each calculation stage'),
+    'request': ('eph_request_seconds', 'endpoint', 'Time spent handling each endpoint')
+}
+
+class Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, exc_type is not None)
+        return False
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+NULL_TIMER = NullTimer()
+
+def stage(name):
+    # with stage('chart.houses'): ...
+    if not ENABLED:
+        return NULL_TIMER
+    return Timer(registry.get('stage', name))
+
+def timed(name):
+    # Decorator version of stage(); leaves the function untouched when metrics are off
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        histogram = registry.get('stage', name)
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with Timer(histogram):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def prometheus_text(snapshot):
+    lines = []
+    for family, labels in snapshot.items():
+        metric, label_name, help_text = FAMILIES[family]
+
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} summary')
+        for label, entry in labels.items():
+            for q in QUANTILES:
+                value = entry[f'p{int(q * 100)}']
+                value = 'NaN' if value is None else f'{value:.9g}' # Prometheus's empty summary
+                lines.append(f'{metric}{{{label_name}="{label}",quantile="{q}"}} {value}')
+            lines.append(f'{metric}_sum{{{label_name}="{label}"}} {entry["sum"]:.9g}')
+            lines.append(f'{metric}_count{{{label_name}="{label}"}} {entry["count"]}')
+
+        lines.append(f'# HELP {metric[:-len("_seconds")]}_errors_total Calls that raised')
+        lines.append(f'# TYPE {metric[:-len("_seconds")]}_errors_total counter')
+        for label, entry in labels.items():
+            lines.append(f'{metric[:-len("_seconds")]}_errors_total{{{label_name}="{label}"}} {entry["errors"]}')
+
+    return '\n'.join(lines) + '\n'
+
+#################### Profiling ###################
+
+def profile_stats(profiler, limit=40):
+    stream = io.StringIO()
+    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(limit)
+    return stream.getvalue()
+
+def register_metrics_routes(app):
+
+    @app.before_request
+    def start_request_timer():
+        g.request_start = time.perf_counter()
+
+        if PROFILING and request.headers.get('X-Profile'):
+            g.profiler = cProfile.Profile()
+            g.profiler.enable()
+
+    @app.after_request
+    def finish_request_timer(response):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            profiler.disable()
+            # The profile replaces the body; the real status goes in a header
+            response = Response(profile_stats(profiler), mimetype='text/plain',
+                                headers={'X-Profiled-Status': str(response.status_code)})
+
+        start = g.pop('request_start', None)
+        if ENABLED and start is not None and request.endpoint != 'get_metrics':
+            registry.get('request', request.url_rule.rule if request.url_rule else 'unmatched').observe(
+                time.perf_counter() - start, response.status_code >= 500)
+
+        return response
+
+    @app.route('/api/metrics', methods=['GET'])
+    def get_metrics():
+        # Prometheus scrape endpoint (?format=json for the same numbers as JSON)
+        snapshot = registry.snapshot()
+        if request.args.get('format') == 'json':
+            return respond({'enabled': ENABLED, 'metrics': snapshot})
+        return Response(prometheus_text(snapshot), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,109 @@
+import numpy as np
+
+from chart import PLANETS, SIGNS, NAKSHATRAS, DIGNITY_LABELS, build_chart
+from batch import compute_charts_compact
+from vargas import classify_vargas
+
+#################### Compact Chart Model ###################
+# A chart is fully determined by its ascendant and the planet longitudes; the
+# sign/nakshatra/house/dignity names are only expanded when the existing JSON
+# shape is needed (build_chart does that, so /api/chart stays byte-for-byte the same).
+
+PLANET_COUNT = len(PLANETS)
+
+# One row per chart: 8 + 8 + 8*8 + 5*8 = 120 bytes
+CHART_DTYPE = np.dtype([
+    ('jd', 'f8'),
+    ('ascendant', 'f8'),
+    ('longitude', 'f8', (PLANET_COUNT,)),
+    ('sign', 'i1', (PLANET_COUNT,)),
+    ('nakshatra', 'i1', (PLANET_COUNT,)),
+    ('pada', 'i1', (PLANET_COUNT,)),
+    ('house', 'i1', (PLANET_COUNT,)),
+    ('dignity', 'i1', (PLANET_COUNT,))
+])
+
+class ChartRecord:
+    # A single chart: just the julian day, ascendant and longitudes (PLANETS order)
+    __slots__ = ('jd', 'ascendant', 'longitudes')
+
+    def __init__(self, jd, ascendant, longitudes):
+        self.jd = jd
+        self.ascendant = ascendant
+        self.longitudes = tuple(longitudes)
+
+    def to_dict(self, strength_calculator=None):
+        # The {'ascendant', 'planets', 'houses'} dictionary compute_chart returns
+        return build_chart(self.ascendant, self.longitudes, strength_calculator)
+
+class ChartArray:
+    # Many charts in one structured NumPy array, plus the errors of the records that
+    # failed ({index: {'error', 'error_type'}}, as batch.compute_charts_compact gives them)
+
+    def __init__(self, rows, success=None, errors=None):
+        self.rows = rows
+        self.success = success if success is not None else np.ones(len(rows), dtype=bool)
+        self.errors = errors or {}
+
+    @classmethod
+    def from_compact(cls, compact):
+        # Wrap the arrays from batch.compute_charts_compact
+        rows = np.zeros(len(compact['jd']), dtype=CHART_DTYPE)
+        for field in CHART_DTYPE.names:
+            rows[field] = compact[field]
+        return cls(rows, compact['success'], dict(compact['errors']))
+
+    @classmethod
+    def concatenate(cls, arrays):
+        # Join chunked results (e.g. from workers.ChartPool.map_compact) into one array
+        arrays = list(arrays)
+        errors = {}
+        offset = 0
+        for array in arrays:
+            errors.update({offset + index: error for index, error in array.errors.items()})
+            offset += len(array)
+
+        if not arrays:
+            return cls(np.zeros(0, dtype=CHART_DTYPE), np.zeros(0, dtype=bool))
+
+        return cls(
+            np.concatenate([array.rows for array in arrays]),
+            np.concatenate([array.success for array in arrays]),
+            errors
+        )
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes + self.success.nbytes
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        # A ChartRecord, or None for a record that failed
+        if not self.success[index]:
+            return None
+        row = self.rows[index]
+        return ChartRecord(float(row['jd']), float(row['ascendant']), row['longitude'].tolist())
+
+    def to_dicts(self, strength_calculator=None):
+        # Lazily expand every chart to the batch result shape (same as batch.compute_charts)
+        for index in range(len(self)):
+            record = self[index]
+            if record is None:
+                yield {'success': False, 'index': index, **self.errors[index]}
+            else:
+                yield {'success': True, **record.to_dict(strength_calculator)}
+
+    def vargas(self, names):
+        # Divisional chart codes for every row, see vargas.classify_vargas
+        return classify_vargas(self.rows['longitude'], self.rows['ascendant'], names)
+
+    def names(self, field):
+        # Code columns back to their names, e.g. names('sign') -> array of 'Aries', ...
+        labels = {'sign': SIGNS, 'nakshatra': NAKSHATRAS, 'dignity': DIGNITY_LABELS}[field]
+        return np.array(labels, dtype=object)[self.rows[field]]
+
+def compute_chart_array(records):
+    # Batch API returning the compact model instead of a list of dictionaries
+    return ChartArray.from_compact(compute_charts_compact(records))
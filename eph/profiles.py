@@ -0,0 +1,95 @@
+from datetime import datetime
+
+from flask import jsonify, request
+
+from chart import NAKSHATRAS, set_sidereal_mode, parse_birth_data, compute_chart
+from dasha import DashaCalculator, DashaIndex, DASHA_LEVELS, datetime_to_jd, jd_to_date_str, tree_to_json
+from coalesce import CoalesceBusy, flight, request_key, busy_response
+from logs import get_logger
+from metrics import timed
+from serialize import respond
+
+log = get_logger('profile')
+
+#################### Profile (Chart + Dashas) ###################
+# Everything a profile page shows first, in one request: the chart, and the
+# Vimshottari dashas worked out from the chart's own Moon longitude. No nakshatra
+# names go back and forth, so the spelling differences between chart.NAKSHATRAS
+# and the dasha lords table can't break it.
+
+DEFAULT_DASHA_DEPTH = 2
+
+def birth_moment(data):
+    # The local birth date and time the dasha dates count from
+    return datetime(data['year'], data['month'], data['day'], data['hour'], data['mins'], int(data['secs']))
+
+@timed('profile.compute')
+def compute_profile(data, depth=DEFAULT_DASHA_DEPTH, as_of=None, strength_calculator=None):
+    # Library API: the /api/profile payload for a birth record (the /api/chart fields).
+    # as_of is the datetime for 'current' (default: now)
+    jdet, lat, lon, hsys = parse_birth_data(data)
+
+    set_sidereal_mode()
+    chart = compute_chart(jdet, lat, lon, hsys, strength_calculator)
+
+    moon = chart['planets']['Moon']
+    calculator = DashaCalculator.from_moon_longitude(birth_moment(data), moon['degree'], NAKSHATRAS)
+    birth_lord, years_remaining = calculator.calculate_dasha_start()
+
+    tree = calculator.calculate_tree(depth=depth)
+    index = DashaIndex(calculator, tree=tree)
+    current = index.at(datetime_to_jd(as_of or datetime.now()))
+    for period in current.values():
+        if period is not None:
+            period['start_date'] = jd_to_date_str(period['start'])
+            period['end_date'] = jd_to_date_str(period['end'])
+
+    return {
+        'success': True,
+        'ascendant': chart['ascendant'],
+        'planets': chart['planets'],
+        'houses': chart['houses'],
+        'dashas': {
+            'moon_nakshatra': moon['nakshatra'],
+            'moon_nakshatra_degree': moon['degree_in_nak'],
+            'birth_dasha_start': [birth_lord, years_remaining],
+            # The same list /api/dashas/mahadashas returns
+            'mahadashas': calculator.calculate_mahadashas(num_cycles=2),
+            'current': current,
+            'depth': depth,
+            'tree': tree_to_json(tree, dates=True)
+        }
+    }
+
+def register_profile_routes(app):
+
+    # Identical profile requests in flight at the same time share one calculation
+    profile_flight = flight('profile')
+
+    @app.route('/api/profile', methods=['POST'])
+    def get_profile():
+        # Expects the /api/chart JSON (year, month, day, hour, mins, secs, tzoffset, lat,
+        # lon, hsys), optional dasha_depth (1-5, default 2) and as_of (ISO date for 'current')
+        try:
+            data = request.json
+
+            if not data:
+                return jsonify({'success': False, 'error': 'No JSON data provided'}), 400
+
+            depth = int(data.get('dasha_depth', DEFAULT_DASHA_DEPTH))
+            if not 1 <= depth <= len(DASHA_LEVELS):
+                return jsonify({'success': False, 'error': f'dasha_depth must be between 1 and {len(DASHA_LEVELS)}'}), 400
+
+            as_of = datetime.fromisoformat(data['as_of']) if data.get('as_of') else None
+
+            payload = profile_flight.do(request_key(data), lambda: compute_profile(data, depth, as_of))
+            return respond(payload)
+
+        except CoalesceBusy as e:
+            return busy_response(e)
+        except (KeyError, ValueError, TypeError) as e:
+            log.warning('invalid profile request: %s', e)
+            return jsonify({'success': False, 'error': f'Invalid data format: {str(e)}'}), 400
+        except Exception as e:
+            log.exception('profile request failed')
+            return jsonify({'success': False, 'error': str(e), 'error_type': type(e).__name__}), 500
@@ -0,0 +1,65 @@
+import importlib
+
+#################### Lazy Route Registration ###################
+# Flask needs every URL rule before the first request, but not the view functions
+# behind them. Each route module's rules are registered up front with a stand-in
+# view; the module itself (and what it imports, e.g. NumPy) is only loaded the
+# first time one of its routes is hit, and then its real views take over.
+
+class RouteCollector:
+    # Stands in for the app when a module's register_*_routes function runs:
+    # collects {rule: (methods, view)} instead of adding them to Flask
+
+    def __init__(self):
+        self.views = {}
+
+    def route(self, rule, methods=None, **options):
+        def decorate(view):
+            self.views[rule] = (sorted(methods or ['GET']), view)
+            return view
+        return decorate
+
+def route_endpoint(module_name, rule):
+    # The same endpoint name in lazy and eager mode (the /api/metrics request labels)
+    return f'{module_name}.{rule}'
+
+def collect_routes(module_name, register_name):
+    collector = RouteCollector()
+    getattr(importlib.import_module(module_name), register_name)(collector)
+    return collector.views
+
+def register_lazy_routes(app, modules):
+    # modules: {module name: (register function name, {rule: methods})}
+    for module_name, (register_name, rules) in modules.items():
+        loaded = {}
+
+        def load(module_name=module_name, register_name=register_name, loaded=loaded):
+            if not loaded:
+                loaded.update(collect_routes(module_name, register_name))
+            return loaded
+
+        for rule, methods in rules.items():
+            endpoint = route_endpoint(module_name, rule)
+
+            def lazy_view(*args, rule=rule, endpoint=endpoint, load=load, **kwargs):
+                view = load()[rule][1]
+                app.view_functions[endpoint] = view # later requests skip this stand-in
+                return view(*args, **kwargs)
+
+            app.add_url_rule(rule, endpoint, lazy_view, methods=methods)
+
+def register_routes(app, modules):
+    # The eager version (LAZY_ROUTES=off): import every module now
+    for module_name, (register_name, _) in modules.items():
+        for rule, (methods, view) in collect_routes(module_name, register_name).items():
+            app.add_url_rule(rule, route_endpoint(module_name, rule), view, methods=methods)
+
+def check_routes(modules):
+    # Rules a module defines that the lazy table doesn't list (or lists wrongly)
+    problems = []
+    for module_name, (register_name, rules) in modules.items():
+        defined = {rule: methods for rule, (methods, _) in collect_routes(module_name, register_name).items()}
+        declared = {rule: sorted(methods) for rule, methods in rules.items()}
+        if defined != declared:
+            problems.append({'module': module_name, 'defined': defined, 'declared': declared})
+    return problems
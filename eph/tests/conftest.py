@@ -0,0 +1,32 @@
+import os
+import sys
+
+# The eph modules import each other by plain name (from chart import ...)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('EPHE_WARMUP', 'off')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+import pytest
+
+@pytest.fixture(scope='session')
+def app():
+    from main import app
+    app.config['TESTING'] = True
+    return app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+def birth_records(count, seed=0):
+    # Random births over 1900-2099, like bench.py's
+    import random
+    rng = random.Random(seed)
+    return [{
+        'year': rng.randint(1900, 2099), 'month': rng.randint(1, 12), 'day': rng.randint(1, 28),
+        'hour': rng.randint(0, 23), 'mins': rng.randint(0, 59), 'secs': rng.randint(0, 59),
+        'tzoffset': rng.choice([-8.0, -5.0, 0.0, 1.0, 5.5, 9.0]),
+        'lat': round(rng.uniform(-60, 60), 5), 'lon': round(rng.uniform(-180, 180), 5),
+        'hsys': 'W'
+    } for _ in range(count)]
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+import asgi
+from asgi import EphemerisASGI
+
+BIRTH = {'year': 2000, 'month': 6, 'day': 16, 'hour': 1, 'mins': 11, 'secs': 11,
+         'tzoffset': -4.0, 'lat': 33.03622, 'lon': -85.03133, 'hsys': 'W'}
+
+def http_scope(method, path, query_string=b'', headers=()):
+    return {'type': 'http', 'method': method, 'path': path, 'query_string': query_string,
+            'headers': [(b'host', b'testserver'), *headers], 'scheme': 'http',
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 5000)}
+
+def receiver(*messages, wait=None):
+    # receive() handing out messages in turn, after `wait` (an asyncio.Event) is set
+    messages = list(messages)
+    async def receive():
+        if wait is not None:
+            await wait.wait()
+        return messages.pop(0)
+    return receive
+
+def sender():
+    sent = []
+    async def send(message):
+        sent.append(message)
+    return sent, send
+
+async def request(app, method, path, body=b'', **scope):
+    sent, send = sender()
+    await app(http_scope(method, path, **scope), receiver({'type': 'http.request', 'body': body}), send)
+    start, content = sent
+    return start['status'], dict(start['headers']), content['body']
+
+@pytest.fixture
+def server():
+    app = EphemerisASGI(workers=1, max_queue=0)
+    yield app
+    if app.executor is not None:
+        app.executor.shutdown()
+
+def test_requests_reach_the_flask_routes(server, client):
+    async def run():
+        health = await request(server, 'GET', '/api/health')
+        chart = await request(server, 'POST', '/api/chart', json.dumps(BIRTH).encode('utf-8'),
+                              headers=[(b'content-type', b'application/json')])
+        missing = await request(server, 'GET', '/no/such/route')
+        return health, chart, missing
+
+    health, chart, missing = asyncio.run(run())
+    assert health[0] == 200 and json.loads(health[2])['status'] == 'ok'
+    assert chart[0] == 200
+    assert chart[2] == client.post('/api/chart', json=BIRTH).data
+    assert missing[0] == 404
+
+def test_saturated_server_answers_503(server):
+    async def run():
+        # The first request holds the only place while its body is still arriving
+        arrived = asyncio.Event()
+        sent, send = sender()
+        first = asyncio.create_task(server(
+            http_scope('GET', '/api/health'), receiver({'type': 'http.request'}, wait=arrived), send
+        ))
+        await asyncio.sleep(0)
+        assert server.in_flight == 1
+
+        busy = await request(server, 'GET', '/api/health')
+
+        arrived.set()
+        await first
+        return busy, sent[0]['status'], server.in_flight
+
+    (status, headers, body), first_status, in_flight = asyncio.run(run())
+    assert status == 503
+    assert headers[b'retry-after'] == b'1'
+    assert json.loads(body)['success'] is False
+    assert first_status == 200
+    assert in_flight == 0
+
+def test_lifespan_waits_for_requests_then_closes(server, monkeypatch):
+    closed = []
+    monkeypatch.setattr(asgi.swe, 'close', lambda: closed.append(True))
+
+    async def run():
+        lifespan = asyncio.Queue()
+        sent, send = sender()
+        lifespan_task = asyncio.create_task(server({'type': 'lifespan'}, lifespan.get, send))
+
+        await lifespan.put({'type': 'lifespan.startup'})
+        while not sent:
+            await asyncio.sleep(0)
+        started = server.executor is not None
+
+        arrived = asyncio.Event()
+        request_sent, request_send = sender()
+        in_flight = asyncio.create_task(server(
+            http_scope('GET', '/api/health'), receiver({'type': 'http.request'}, wait=arrived), request_send
+        ))
+        await asyncio.sleep(0)
+
+        await lifespan.put({'type': 'lifespan.shutdown'})
+        await asyncio.sleep(0.05)
+        # Still waiting for the request in flight, and no longer taking new ones
+        waiting = not lifespan_task.done() and not closed
+        refused = await request(server, 'GET', '/api/health')
+
+        arrived.set()
+        await in_flight
+        await lifespan_task
+        return sent, started, waiting, refused, request_sent[0]['status']
+
+    sent, started, waiting, refused, in_flight_status = asyncio.run(run())
+    assert [message['type'] for message in sent] == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert started and waiting
+    assert refused[0] == 503
+    assert in_flight_status == 200
+    assert closed == [True]
+    assert server.executor is None
@@ -0,0 +1,32 @@
+import batch
+from chart import set_sidereal_mode, parse_birth_data, compute_chart
+from conftest import birth_records
+
+def test_compute_charts_matches_single_charts():
+    records = birth_records(300, seed=5)
+    records[7] = {'year': 2000} # missing fields
+    results = batch.compute_charts(records)
+
+    set_sidereal_mode()
+    for index, (record, result) in enumerate(zip(records, results)):
+        if index == 7:
+            assert result['success'] is False and result['index'] == 7
+        else:
+            assert result == {'success': True, **compute_chart(*parse_birth_data(record))}
+
+def test_iter_charts_keeps_input_indices():
+    records = birth_records(batch.STREAM_CHUNK + 10, seed=6) + [{'year': 2000}]
+    results = list(batch.iter_charts(records))
+    assert len(results) == len(records)
+    assert results[-1]['success'] is False and results[-1]['index'] == len(records) - 1
+    assert all(result['success'] for result in results[:-1])
+
+def test_batch_route(client):
+    response = client.post('/api/charts/batch', json=birth_records(5))
+    assert response.status_code == 200
+    assert response.get_json()['count'] == 5
+
+def test_batch_route_limits_records(client, monkeypatch):
+    monkeypatch.setattr(batch, 'MAX_RECORDS', 3)
+    response = client.post('/api/charts/batch', json=birth_records(4))
+    assert response.status_code == 400
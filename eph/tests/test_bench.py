@@ -0,0 +1,31 @@
+import bench
+
+def row(name, seconds, best, samples, size=1):
+    return {'name': name, 'size': size, 'seconds_per_op': seconds / size, 'best_seconds': best, 'samples': samples}
+
+def test_regressions_need_enough_samples_on_both_sides():
+    baseline = {'results': [row('few', 1.0, 1.0, 2), row('many', 1.0, 0.9, 5), row('old', 1.0, 1.0, 5)]}
+    del baseline['results'][2]['samples'] # results written before samples were recorded
+    results = [row('few', 2.0, 2.0, 5), row('many', 2.0, 1.9, 5), row('old', 2.0, 2.0, 5)]
+
+    checked = {name: (regressed, gated) for name, _, _, _, _, regressed, gated in bench.compare(results, baseline, 0.1)}
+    assert checked == {'few': (False, False), 'many': (True, True), 'old': (False, False)}
+
+def test_one_slow_sample_is_not_a_regression():
+    baseline = {'results': [row('chart', 1.0, 0.95, 5)]}
+    # The median moved, but the fastest sample is as fast as before
+    results = [row('chart', 1.3, 1.0, 5)]
+    assert not bench.compare(results, baseline, 0.1)[0][5]
+
+def test_measure_takes_the_median_of_the_samples():
+    result = bench.measure('noop', 10, lambda: None, 5)
+    assert result['samples'] == 5
+    assert result['calls_per_sample'] > 1 # tiny functions are repeated within a sample
+    assert result['best_seconds'] <= result['seconds']
+
+def test_dasha_corpus_uses_every_chart_nakshatra():
+    from chart import NAKSHATRAS
+    calculators = bench.dasha_corpus(500)
+    assert {calculator.moon_nak for calculator in calculators} == set(NAKSHATRAS)
+    for calculator in calculators[:50]:
+        calculator.calculate_dasha_start()
@@ -0,0 +1,59 @@
+import pytest
+
+from cache import ChartCache, MemoryBackend, SqliteBackend, make_chart_key
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'sqlite':
+        return SqliteBackend(str(tmp_path / 'cache.sqlite3'), max_entries=2)
+    return MemoryBackend(max_entries=2)
+
+def test_least_recently_used_is_evicted(backend):
+    cache = ChartCache(backend)
+    cache.set('a', b'1')
+    cache.set('b', b'2')
+    assert cache.get('a') == b'1' # 'b' is now the oldest
+    cache.set('c', b'3')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1'
+    assert cache.get('c') == b'3'
+    assert cache.stats()['evictions'] == 1
+    assert cache.stats()['entries'] == 2
+
+def test_entries_expire(backend, monkeypatch):
+    import cache as cache_module
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, 'time', lambda: now[0])
+
+    cache = ChartCache(backend, ttl=60)
+    cache.set('a', b'1')
+    now[0] += 30
+    assert cache.get('a') == b'1'
+    now[0] += 31
+    assert cache.get('a') is None
+    assert cache.stats()['expired'] == 1
+
+def test_disabled_cache_stores_nothing():
+    cache = ChartCache(enabled=False)
+    cache.set('a', b'1')
+    assert cache.get('a') is None
+    assert len(cache.backend) == 0
+
+def test_chart_key_ignores_float_noise():
+    key = make_chart_key(2451545.0, 40.7, -74.0, b'W', 'lahiri', 64)
+    assert make_chart_key(2451545.0 + 1e-10, 40.7 + 1e-9, -74.0, 'W', 'lahiri', 64) == key
+    assert make_chart_key(2451545.01, 40.7, -74.0, 'W', 'lahiri', 64) != key
+    assert make_chart_key(2451545.0, 40.7, -74.0, 'W', 'lahiri', 64, ['D9']) != key
+
+def test_repeat_chart_request_is_served_from_the_cache(client, monkeypatch):
+    # Its own cache: importing bench.py turns CHART_CACHE off for the whole session
+    import main
+    chart_cache = ChartCache()
+    monkeypatch.setattr(main, 'chart_cache', chart_cache)
+    birth = {'year': 1971, 'month': 2, 'day': 3, 'hour': 4, 'mins': 5, 'secs': 6,
+             'tzoffset': 1.0, 'lat': 48.85, 'lon': 2.35, 'hsys': 'W'}
+    first = client.post('/api/chart', json=birth)
+    second = client.post('/api/chart', json=birth)
+    assert second.data == first.data
+    assert (chart_cache.hits, chart_cache.misses) == (1, 1)
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+import swisseph as swe
+
+from chart import (
+    AYANAMSAS, FLAGS, TROPICAL_FLAGS, set_sidereal_mode, configure_ephemeris, get_julian_day,
+    compute_chart, ayanamsa_offset, compute_configurations
+)
+
+@pytest.fixture(autouse=True)
+def ephemeris():
+    configure_ephemeris()
+
+def test_ayanamsa_offsets_match_swiss_ephemeris():
+    for year in range(1801, 2400, 7):
+        jd = swe.julday(year, 3, 1)
+        for name, mode in AYANAMSAS.items():
+            set_sidereal_mode()
+            offset = ayanamsa_offset(jd, name)
+            swe.set_sid_mode(mode)
+            assert offset == pytest.approx(swe.get_ayanamsa_ex(jd, TROPICAL_FLAGS)[1], abs=1e-9)
+    set_sidereal_mode()
+
+def test_ayanamsa_offset_leaves_the_sidereal_mode_alone():
+    set_sidereal_mode()
+    jd = swe.julday(2000, 1, 1)
+    lahiri = swe.get_ayanamsa_ex(jd, TROPICAL_FLAGS)[1]
+    for name in AYANAMSAS:
+        ayanamsa_offset(jd, name)
+        assert swe.get_ayanamsa_ex(jd, TROPICAL_FLAGS)[1] == lahiri
+
+def test_configurations_match_sidereal_calc():
+    jdet = get_julian_day(1987, 7, 4, 6, 30, 0, -4.0)
+    configurations = [(name, 'P') for name in AYANAMSAS]
+    set_sidereal_mode()
+    for (name, _), chart in zip(configurations, compute_configurations(jdet, 40.7, -74.0, configurations)):
+        swe.set_sid_mode(AYANAMSAS[name])
+        for planet_id, planet in zip((swe.SUN, swe.MOON, swe.SATURN), ('Sun', 'Moon', 'Saturn')):
+            assert chart['planets'][planet]['degree'] == pytest.approx(swe.calc(jdet, planet_id, FLAGS)[0][0], abs=5e-8)
+    set_sidereal_mode()
+
+def test_new_threads_use_the_configured_ephemeris():
+    # Swiss Ephemeris settings are per thread; a request thread must not fall back to Moshier
+    jdet = get_julian_day(2000, 1, 1, 12, 0, 0, 0.0)
+    set_sidereal_mode()
+    expected = compute_chart(jdet, 10.0, 10.0, b'W')
+
+    found = []
+    def run():
+        set_sidereal_mode()
+        found.append(compute_chart(jdet, 10.0, 10.0, b'W'))
+        found.append(swe.calc(jdet, swe.MOON, FLAGS)[1] & swe.FLG_SWIEPH)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    thread.join()
+    assert found[0] == expected
+    assert found[1]
+
+BIRTH = {'year': 2000, 'month': 6, 'day': 16, 'hour': 1, 'mins': 11, 'secs': 11,
+         'tzoffset': -4.0, 'lat': 33.03622, 'lon': -85.03133, 'hsys': 'W'}
+
+@pytest.mark.parametrize('body', [
+    {key: value for key, value in BIRTH.items() if key != 'year'},
+    {**BIRTH, 'lat': 'north'},
+    {**BIRTH, 'configurations': [{'ayanamsa': 'no such ayanamsa'}]},
+    {**BIRTH, 'configurations': [{'hsys': 'QQ'}]},
+    {**BIRTH, 'configurations': 'lahiri'}
+])
+def test_chart_rejects_bad_input(client, body):
+    response = client.post('/api/chart', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+def test_chart_without_body(client):
+    assert client.post('/api/chart', json={}).status_code == 400
@@ -0,0 +1,35 @@
+import numpy as np
+import pytest
+import swisseph as swe
+
+from chebyshev import PositionStore, build_store, calc_series, verify_store
+from chart import PLANETS, set_sidereal_mode
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    path = tmp_path_factory.mktemp('store') / 'positions.cheb'
+    start_jd = swe.julday(1999, 11, 1)
+    build_store(str(path), start_jd, start_jd + 120)
+    return PositionStore(str(path))
+
+def test_store_is_within_an_arcsecond(store):
+    report = verify_store(store, samples=2000)
+    assert set(report) == set(PLANETS)
+    for name, planet in report.items():
+        assert planet['max_error_arcsec'] < 1.0, name
+
+def test_positions_outside_the_store_use_swiss_ephemeris(store):
+    set_sidereal_mode()
+    jds = np.array([store.start_jd - 10, store.start_jd + 5, store.end_jd + 10])
+    longitude, speed = store.positions(jds, 'Moon')
+    expected, _ = calc_series(jds, PLANETS['Moon'])
+    assert longitude[[0, 2]] == pytest.approx(expected[[0, 2]], abs=1e-12)
+    assert abs((longitude[1] - expected[1] + 180) % 360 - 180) * 3600 < 1.0
+    assert store.covers(store.start_jd + 1, store.end_jd - 1)
+    assert not store.covers(store.start_jd - 1)
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b'not a position store')
+    with pytest.raises(ValueError):
+        PositionStore(str(path))
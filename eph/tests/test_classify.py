@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from chart import get_sign, get_nakshatra, get_houses, get_planet_house, SIGNS, NAKSHATRAS
+from classify import sign_position, nakshatra_position, classify_longitudes
+from transits import natal_signs
+from vargas import VARGAS, varga_sign, classify_vargas
+
+# Longitudes around every wrap: tiny negatives round to exactly 360.0 under % 360
+EDGES = [-1e-15, -1e-300, -0.0, 0.0, 360.0, 359.99999999999994, 720.0 - 1e-13, -360.0,
+         29.999999999999996, 30.0, 13.333333333333332, 40.0, 346.66666666666663, 1e9 + 0.5]
+
+def scalar_rows(longitudes):
+    rows = []
+    for degree in longitudes:
+        sign_num, degree_in_sign = sign_position(degree)
+        nak_num, pada, degree_in_nak = nakshatra_position(degree)
+        rows.append((sign_num, degree_in_sign, nak_num, pada, degree_in_nak))
+    return rows
+
+def test_scalar_and_vector_agree():
+    rng = np.random.default_rng(0)
+    longitudes = np.concatenate((EDGES, rng.uniform(-720, 720, 20_000)))
+    classified = classify_longitudes(longitudes)
+    vector = list(zip(
+        classified['sign_index'].tolist(), classified['degree_in_sign'].tolist(),
+        classified['nakshatra_index'].tolist(), classified['pada'].tolist(),
+        classified['degree_in_nak'].tolist()
+    ))
+    assert vector == scalar_rows(longitudes.tolist())
+
+@pytest.mark.parametrize('degree', EDGES)
+def test_wrap_stays_in_range(degree):
+    sign, degree_in_sign = get_sign(degree)
+    nakshatra, pada, degree_in_nak = get_nakshatra(degree)
+    assert sign in SIGNS and 0 <= degree_in_sign < 30
+    assert nakshatra in NAKSHATRAS and 1 <= pada <= 4
+    assert 1 <= get_planet_house(degree, get_houses(100.0)) <= 12
+
+def test_tiny_negative_is_aries():
+    assert get_sign(-1e-15) == ('Aries', 0.0)
+    assert get_nakshatra(-1e-15)[0] == 'Ashwini'
+    assert natal_signs([-1e-15]).tolist() == [0]
+
+def test_vargas_agree_at_the_wrap():
+    longitudes = np.array([EDGES[:8]])
+    ascendants = np.array([-1e-15])
+    bulk = classify_vargas(longitudes, ascendants, list(VARGAS))
+    for name in VARGAS:
+        assert bulk[name]['sign'][0].tolist() == [varga_sign(degree, name) for degree in EDGES[:8]]
+        assert bulk[name]['ascendant_sign'][0] == varga_sign(-1e-15, name)
+
+def test_houses_agree():
+    rng = np.random.default_rng(1)
+    ascendants = np.concatenate((EDGES, rng.uniform(0, 360, 2000)))
+    longitudes = np.concatenate((EDGES[::-1], rng.uniform(-360, 720, 2000)))
+    houses = classify_longitudes(longitudes, ascendants)['house'].tolist()
+    assert houses == [get_planet_house(degree, get_houses(ascendant))
+                      for degree, ascendant in zip(longitudes.tolist(), ascendants.tolist())]
@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from coalesce import SingleFlight, CoalesceBusy, CoalesceTimeout
+
+def start(func, *args):
+    thread = threading.Thread(target=func, args=args)
+    thread.start()
+    return thread
+
+def test_identical_calls_share_one_calculation():
+    flight = SingleFlight('test', max_waiters=10, timeout=5, enabled=True)
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return 'chart'
+
+    threads = [start(lambda: results.append(flight.do('key', slow))) for _ in range(5)]
+    while flight.calls.get('key') is None or flight.calls['key'].waiters < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == [1]
+    assert results == ['chart'] * 5
+    assert flight.stats()['coalesced'] == 4
+
+def test_errors_reach_every_waiter():
+    flight = SingleFlight('test', enabled=True)
+    with pytest.raises(ZeroDivisionError):
+        flight.do('key', lambda: 1 / 0)
+    assert flight.stats()['errors'] == 1
+    assert not flight.calls
+
+def test_timed_out_waiters_free_their_place():
+    flight = SingleFlight('test', max_waiters=2, timeout=0.05, enabled=True)
+    release = threading.Event()
+    leader = start(flight.do, 'key', lambda: release.wait(5))
+    while 'key' not in flight.calls:
+        time.sleep(0.001)
+
+    # More timed-out waiters than max_waiters, one after another: none of them is
+    # turned away as busy because of the ones that already left
+    for _ in range(5):
+        with pytest.raises(CoalesceTimeout):
+            flight.do('key', lambda: None)
+    assert flight.calls['key'].waiters == 0
+    assert flight.stats()['rejected'] == 0
+
+    release.set()
+    leader.join()
+
+def test_full_queue_is_busy():
+    flight = SingleFlight('test', max_waiters=0, timeout=1, enabled=True)
+    release = threading.Event()
+    leader = start(flight.do, 'key', lambda: release.wait(5))
+    while 'key' not in flight.calls:
+        time.sleep(0.001)
+
+    with pytest.raises(CoalesceBusy):
+        flight.do('key', lambda: None)
+
+    release.set()
+    leader.join()
@@ -0,0 +1,120 @@
+import pytest
+
+DASHA_REQUEST = {
+    'birth_data': {'year': 1990, 'month': 5, 'day': 17},
+    'moon_nakshatra_degree': 7.25,
+    'moon_nakshatra': 'Rohini'
+}
+
+@pytest.mark.parametrize('num_cycles', ['x', '', -1, 0, 11, 10 ** 6, None, [2], 2.5, True])
+def test_tree_rejects_bad_num_cycles(client, num_cycles):
+    response = client.post('/api/dashas/tree', json={**DASHA_REQUEST, 'num_cycles': num_cycles})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('route, options', [
+    ('tree', {'depth': None}), ('tree', {'depth': 'x'}), ('tree', {'depth': {}}), ('tree', {'depth': 6}),
+    ('at', {'depth': None, 'dates': ['1995-01-01']}), ('at', {'depth': [3], 'dates': ['1995-01-01']}),
+    ('window', {'depth': None, 'start': '2000-01-01', 'end': '2001-01-01'}),
+    ('window', {'limit': None, 'start': '2000-01-01', 'end': '2001-01-01'})
+])
+def test_rejects_bad_integer_fields(client, route, options):
+    response = client.post(f'/api/dashas/{route}', json={**DASHA_REQUEST, **options})
+    assert response.status_code == 400
+
+@pytest.mark.parametrize('num_cycles', [1, 2, 10, '3'])
+def test_tree_num_cycles(client, num_cycles):
+    response = client.post('/api/dashas/tree', json={**DASHA_REQUEST, 'depth': 1, 'num_cycles': num_cycles})
+    assert response.status_code == 200
+    planets = response.get_json()['tree'][0]['planet']
+    # Every cycle has 9 mahadashas, none of the birth one ended before birth
+    assert len(planets) == 9 * int(num_cycles)
+
+def test_dashas_at(client):
+    response = client.post('/api/dashas/at', json={**DASHA_REQUEST, 'dates': ['1995-01-01', '2030-06-15T12:00:00']})
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert [result['date'] for result in results] == ['1995-01-01', '2030-06-15T12:00:00']
+    assert all(result['mahadasha'] for result in results)
+
+@pytest.mark.parametrize('dates', ['1995-01-01', [1995], [None], ['1995-01-01', {'year': 1995}], ['not a date']])
+def test_dashas_at_rejects_bad_dates(client, dates):
+    response = client.post('/api/dashas/at', json={**DASHA_REQUEST, 'dates': dates})
+    assert response.status_code == 400
+
+def test_dashas_at_limits_dates(client, monkeypatch):
+    import dasha
+    monkeypatch.setattr(dasha, 'MAX_LOOKUP_DATES', 2)
+    response = client.post('/api/dashas/at', json={**DASHA_REQUEST, 'dates': ['1995-01-01'] * 3})
+    assert response.status_code == 400
+
+def test_profile(client):
+    birth = {'year': 1990, 'month': 5, 'day': 17, 'hour': 8, 'mins': 30, 'secs': 0,
+             'tzoffset': 5.5, 'lat': 28.6, 'lon': 77.2, 'hsys': 'W'}
+    response = client.post('/api/profile', json=birth)
+    assert response.status_code == 200
+    profile = response.get_json()
+    assert profile['dashas']['moon_nakshatra'] == profile['planets']['Moon']['nakshatra']
+    assert profile['dashas']['mahadashas'][0]['planet'] == profile['dashas']['birth_dasha_start'][0]
+
+def window_calculator():
+    from datetime import datetime
+    from dasha import DashaCalculator
+    return DashaCalculator(datetime(1990, 5, 17), 7.25, 'Rohini')
+
+def tree_periods(calculator, start_jd, end_jd, depth):
+    # calculate_tree's periods overlapping [start_jd, end_jd), in window order
+    periods = []
+    for level, rows in enumerate(calculator.calculate_tree(depth, num_cycles=2)):
+        for planet, start, end in zip(rows['planet'], rows['start'], rows['end']):
+            if start < end_jd and end > start_jd:
+                periods.append((round(float(start), 6), level, int(planet), float(end)))
+    return sorted(periods)
+
+@pytest.mark.parametrize('start, end', [('1985-01-01', '2060-01-01'), ('2003-02-11', '2004-07-30')])
+def test_window_pages_match_the_tree(start, end):
+    from datetime import datetime
+    from dasha import DASHA_LEVELS, DashaCalculator, datetime_to_jd, window_page
+    calculator = window_calculator()
+    start_jd = datetime_to_jd(datetime.fromisoformat(start))
+    end_jd = datetime_to_jd(datetime.fromisoformat(end))
+
+    periods, cursor, pages = [], None, 0
+    while True:
+        page, cursor = window_page(calculator, start_jd, end_jd, depth=3, limit=7, cursor=cursor)
+        periods.extend(page)
+        pages += 1
+        if cursor is None:
+            break
+    assert pages > 1
+
+    expected = tree_periods(calculator, start_jd, end_jd, 3)
+    assert len(periods) == len(expected)
+    for period, (tree_start, level, planet, tree_end) in zip(periods, expected):
+        assert period['level'] == DASHA_LEVELS[level]
+        assert period['planet'] == DashaCalculator.PLANET_SEQUENCE[planet]
+        assert period['start'] == pytest.approx(tree_start, abs=1e-6)
+        assert period['end'] == pytest.approx(tree_end, abs=1e-6)
+
+def test_window_route_pages(client):
+    body = {**DASHA_REQUEST, 'start': '2000-01-01', 'end': '2010-01-01', 'depth': 2}
+    whole = client.post('/api/dashas/window', json=body).get_json()
+    assert whole['next_cursor'] is None
+
+    periods, cursor = [], None
+    while True:
+        page = client.post('/api/dashas/window', json={**body, 'limit': 5, 'cursor': cursor}).get_json()
+        periods.extend(page['periods'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert periods == whole['periods']
+
+@pytest.mark.parametrize('options', [
+    {'limit': 0}, {'limit': 10 ** 6}, {'limit': 'x'}, {'depth': 0}, {'depth': 6},
+    {'cursor': 'not a cursor'}, {'end': '1999-01-01'}, {'start': 'not a date'}, {'start': None},
+    {'start': 2000}, {'end': ['2010-01-01']}, {'start': {'year': 2000}}, {'cursor': 5}
+])
+def test_window_rejects_bad_input(client, options):
+    body = {**DASHA_REQUEST, 'start': '2000-01-01', 'end': '2010-01-01', **options}
+    response = client.post('/api/dashas/window', json=body)
+    assert response.status_code == 400
@@ -0,0 +1,77 @@
+import shutil
+
+import pytest
+import swisseph as swe
+
+from chart import DEFAULT_EPHE_PATH
+from ephe_files import EphemerisFileError, EphemerisFiles, OutOfCoverageError
+
+@pytest.fixture
+def ephe_copy(tmp_path):
+    shutil.copytree(DEFAULT_EPHE_PATH, tmp_path, dirs_exist_ok=True)
+    return tmp_path
+
+def test_bundled_files_span():
+    files = EphemerisFiles(DEFAULT_EPHE_PATH)
+    coverage = files.coverage()
+    assert coverage['spans'] == [{'start': '1800-01-01', 'end': '2400-01-10'}]
+    assert coverage['missing'] == []
+    assert {f['kind'] for f in coverage['files']} == {'planets', 'moon', 'asteroids'}
+    files.close()
+
+def test_out_of_coverage():
+    files = EphemerisFiles(DEFAULT_EPHE_PATH)
+    files.check(swe.julday(1800, 1, 2), swe.julday(2400, 1, 9))
+    for start, end in [(swe.julday(1750, 1, 1), None), (swe.julday(2000, 1, 1), swe.julday(2400, 6, 1))]:
+        with pytest.raises(OutOfCoverageError):
+            files.check(start, end)
+    files.close()
+
+def test_corrupt_endian_test(ephe_copy):
+    path = ephe_copy / 'semo_18.se1'
+    path.write_bytes(zero_endian_test(path.read_bytes()))
+    with pytest.raises(EphemerisFileError, match='corrupt header'):
+        EphemerisFiles(str(ephe_copy))
+
+def test_truncated_file(ephe_copy):
+    path = ephe_copy / 'sepl_18.se1'
+    path.write_bytes(path.read_bytes()[:-100])
+    with pytest.raises(EphemerisFileError, match='truncated'):
+        EphemerisFiles(str(ephe_copy))
+
+def zero_endian_test(data):
+    # The int32 endian test right after the three text lines, same file length
+    offset = 0
+    for _ in range(3):
+        offset = data.find(b'\n', offset) + 1
+    return data[:offset] + b'\0' * 4 + data[offset + 4:]
+
+@pytest.mark.parametrize('corrupt', [
+    lambda data: b'NOTSWISS' + data[8:],
+    lambda data: data.replace(b'\n', b' '), # no header lines
+    lambda data: data[:40], # header cut short
+    lambda data: b''
+])
+def test_corrupt_header(ephe_copy, corrupt):
+    path = ephe_copy / 'semo_18.se1'
+    path.write_bytes(corrupt(path.read_bytes()))
+    with pytest.raises(EphemerisFileError):
+        EphemerisFiles(str(ephe_copy))
+
+def test_missing_kind(ephe_copy):
+    (ephe_copy / 'semo_18.se1').unlink()
+    files = EphemerisFiles(str(ephe_copy))
+    assert files.missing() == ['moon']
+    assert files.spans == []
+    files.close()
+
+@pytest.mark.parametrize('method, path, body', [
+    ('post', '/api/chart', {'year': 1750, 'month': 1, 'day': 1, 'hour': 12, 'mins': 0, 'secs': 0,
+                            'tzoffset': 0.0, 'lat': 51.5, 'lon': 0.0, 'hsys': 'W'}),
+    ('post', '/api/ephemeris/range', {'start': '2399-12-01', 'end': '2400-06-01', 'step': '10d'}),
+    ('get', '/api/events?from=1790-01-01&to=1801-01-01&types=ingress&planets=Sun', None)
+])
+def test_routes_reject_dates_outside_the_files(client, method, path, body):
+    response = getattr(client, method)(path, json=body)
+    assert response.status_code == 400
+    assert 'outside the ephemeris files' in response.get_json()['error']
@@ -0,0 +1,38 @@
+import threading
+
+import pytest
+
+RANGE = {'start': '2024-03-01', 'end': '2024-03-02', 'step': '10m', 'lat': 28.6, 'lon': 77.2}
+
+def test_houses_on_a_new_thread_match_the_main_thread(client):
+    # Swiss Ephemeris keeps its sidereal mode per thread, like a server's request threads
+    expected = client.post('/api/ephemeris/range', json=RANGE).get_json()
+
+    found = []
+    thread = threading.Thread(target=lambda: found.append(client.post('/api/ephemeris/range', json=RANGE).get_json()))
+    thread.start()
+    thread.join()
+
+    assert found[0]['planets'] == expected['planets']
+
+@pytest.mark.parametrize('body', [
+    {'end': '2000-02-01'},
+    {'start': '2000-02-01', 'end': '2000-01-01'},
+    {'start': '1900-01-01', 'end': '2100-01-01', 'step': '1m'},
+    {'start': '2000-01-01', 'end': '2000-02-01', 'step': 'often'}
+])
+def test_ephemeris_range_rejects_bad_input(client, body):
+    assert client.post('/api/ephemeris/range', json=body).status_code == 400
+
+def test_work_is_capped_before_calculating(client, monkeypatch):
+    import ephemeris
+    monkeypatch.setattr(ephemeris, 'MAX_RANGE_CALLS', 600)
+    body = {'start': '2024-01-01', 'end': '2024-01-11', 'step': '1h', 'planets': ['Sun', 'Moon']}
+    # 241 times x 2 planets, then one houses call per time on top
+    assert client.post('/api/ephemeris/range', json=body).status_code == 200
+    assert client.post('/api/ephemeris/range', json={**body, 'lat': 28.6, 'lon': 77.2}).status_code == 400
+    assert client.post('/api/ephemeris/range', json={**body, 'planets': None}).status_code == 400
+
+def test_centuries_of_minutes_are_rejected_without_building_them(client):
+    body = {'start': '1800-01-01', 'end': '2399-01-01', 'step': '1m'}
+    assert client.post('/api/ephemeris/range', json=body).status_code == 400
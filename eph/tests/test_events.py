@@ -0,0 +1,33 @@
+import pytest
+
+from events import find_events, estimate_calls, EVENT_TYPES
+
+def test_estimate_follows_actual_calls():
+    start = 2451545.0
+    for types, planets in [(['nakshatra'], ['Moon']), (list(EVENT_TYPES), None), (['ingress'], ['Sun', 'Mars'])]:
+        events, calls = find_events(start, start + 1000, types, planets, with_dates=False)
+        assert 0.7 * calls <= estimate_calls(start, start + 1000, types, planets) <= 1.3 * calls
+
+def test_sun_ingresses_in_a_year():
+    events, _ = find_events(2451545.0, 2451545.0 + 365.25, ['ingress'], ['Sun'])
+    assert len(events) == 12
+    assert [event['jd'] for event in events] == sorted(event['jd'] for event in events)
+
+@pytest.mark.parametrize('query', [
+    'from=1800-01-01&to=2300-01-01&types=nakshatra&planets=Moon',
+    'from=1850-01-01&to=2050-01-01'
+])
+def test_large_searches_are_rejected(client, query):
+    assert client.get(f'/api/events?{query}').status_code == 400
+
+def test_events_route(client):
+    response = client.get('/api/events?from=2024-01-01&to=2024-03-01&types=nakshatra&planets=Moon')
+    assert response.status_code == 200
+    assert response.get_json()['count'] > 0
+
+def test_a_century_of_moon_nakshatras(client):
+    response = client.get('/api/events?from=1950-01-01&to=2050-01-01&types=nakshatra&planets=Moon')
+    assert response.status_code == 200
+    result = response.get_json()
+    # 27 changes per sidereal month
+    assert result['count'] == pytest.approx(100 * 365.25 / 27.3217 * 27, rel=0.01)
@@ -0,0 +1,52 @@
+import io
+import json
+import logging
+import sys
+
+import pytest
+
+from logs import JsonFormatter, Logging, QueueHandler, chart_table, make_formatter
+
+TABLE = 'Sun        12.34° - Aries\nHOUSE SYSTEM:\n' + '=' * 60
+
+def record(msg, **extra):
+    entry = logging.makeLogRecord({'name': 'eph.chart', 'levelname': 'DEBUG', 'levelno': logging.DEBUG, 'msg': msg})
+    entry.__dict__.update(extra)
+    return entry
+
+def test_json_lines():
+    line = JsonFormatter().format(record('chart table\n' + TABLE, jd=2451545.0, cached=False))
+    assert '\n' not in line
+    entry = json.loads(line)
+    assert entry['msg'] == 'chart table\n' + TABLE
+    assert (entry['level'], entry['logger'], entry['jd'], entry['cached']) == ('DEBUG', 'eph.chart', 2451545.0, False)
+
+def test_text_keeps_the_table_as_printed():
+    text = make_formatter('text').format(record('chart table\n' + TABLE))
+    assert text.endswith('DEBUG eph.chart: chart table\n' + TABLE)
+
+@pytest.mark.parametrize('log_format, switch_to', [('json', 'text'), ('text', 'json')])
+def test_format_switches_the_running_output(monkeypatch, log_format, switch_to):
+    stderr = io.StringIO()
+    monkeypatch.setattr(sys, 'stderr', stderr)
+    output = Logging()
+    output.format = log_format
+    output.start()
+    handler = QueueHandler(output.queue)
+
+    output.set_format(switch_to)
+    handler.handle(record('chart table\n' + TABLE))
+    output.stop()
+
+    written = stderr.getvalue()
+    if switch_to == 'text':
+        assert TABLE in written
+    else:
+        assert json.loads(written)['msg'].endswith(TABLE)
+
+def test_chart_table_lines():
+    from chart import PLANETS, compute_chart, configure_ephemeris, get_julian_day
+    configure_ephemeris()
+    table = chart_table(compute_chart(get_julian_day(2000, 1, 1, 12, 0, 0, 0.0), 10.0, 10.0, b'W'))
+    # A line per planet, the heading, two rules and a line per house
+    assert len(table.splitlines()) == len(PLANETS) + 3 + 12
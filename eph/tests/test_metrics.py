@@ -0,0 +1,43 @@
+import json
+import math
+
+import pytest
+
+import metrics
+from metrics import Histogram, Registry, prometheus_text
+
+def test_quantiles_within_a_bucket():
+    histogram = Histogram()
+    for i in range(1, 1001):
+        histogram.observe(i * 1e-4) # 0.1 ms to 100 ms, evenly
+    for q in metrics.QUANTILES:
+        assert histogram.quantile(q) == pytest.approx(q * 0.1, rel=0.1)
+    assert histogram.count == 1000
+    assert histogram.total == pytest.approx(50.05)
+
+def test_empty_histogram():
+    registry = Registry()
+    registry.get('stage', 'never.called')
+    registry.get('stage', 'called').observe(0.002, error=True)
+    snapshot = registry.snapshot()
+
+    empty = snapshot['stage']['never.called']
+    assert empty == {'count': 0, 'errors': 0, 'sum': 0.0, 'p50': None, 'p95': None, 'p99': None}
+    assert snapshot['stage']['called']['errors'] == 1
+
+    # Strict JSON (no NaN), and Prometheus's NaN for an empty summary
+    json.dumps(snapshot, allow_nan=False)
+    text = prometheus_text(snapshot)
+    assert 'eph_stage_seconds{stage="never.called",quantile="0.5"} NaN' in text
+    assert 'eph_stage_errors_total{stage="called"} 1' in text
+    assert math.isnan(Histogram().quantile(0.5))
+
+def test_metrics_route_json(client, monkeypatch):
+    registry = Registry()
+    registry.get('stage', 'never.called')
+    monkeypatch.setattr(metrics, 'registry', registry)
+
+    response = client.get('/api/metrics?format=json')
+    assert response.status_code == 200
+    body = json.loads(response.data, parse_constant=lambda constant: pytest.fail(f'{constant} in JSON'))
+    assert body['metrics']['stage']['never.called']['p99'] is None
@@ -0,0 +1,52 @@
+import numpy as np
+
+import batch
+from chart import PLANETS, configure_ephemeris
+from conftest import birth_records
+from model import CHART_DTYPE, ChartArray, compute_chart_array
+
+def chart_array(records):
+    configure_ephemeris()
+    return compute_chart_array(records)
+
+def test_to_dicts_matches_compute_charts():
+    records = birth_records(40, seed=11)
+    records[3] = {'year': 2000} # missing fields
+    records[20] = {**records[20], 'lat': 'north'}
+    charts = chart_array(records)
+
+    assert charts.rows.dtype == CHART_DTYPE
+    assert list(charts.to_dicts()) == batch.compute_charts(records)
+    assert charts[3] is None
+    assert set(charts.errors) == {3, 20}
+
+def test_codes_round_trip_through_the_dicts():
+    records = birth_records(30, seed=12)
+    charts = chart_array(records)
+    signs, nakshatras, dignities = charts.names('sign'), charts.names('nakshatra'), charts.names('dignity')
+
+    for index, chart in enumerate(charts.to_dicts()):
+        row = charts.rows[index]
+        assert chart['ascendant'] == row['ascendant']
+        for i, planet in enumerate(PLANETS):
+            data = chart['planets'][planet]
+            assert data['degree'] == row['longitude'][i]
+            assert data['sign'] == signs[index, i]
+            assert data['nakshatra'] == nakshatras[index, i]
+            assert data['pada'] == row['pada'][i]
+            assert data['house'] == row['house'][i]
+            assert data['dignity'] == dignities[index, i]
+
+        # And back: the dict rebuilds the same record
+        assert charts[index].to_dict() == {key: chart[key] for key in ('ascendant', 'planets', 'houses')}
+
+def test_concatenate_keeps_error_indices():
+    first = chart_array(birth_records(5, seed=13) + [{'year': 2000}])
+    second = chart_array([{'year': 2000}] + birth_records(3, seed=14))
+    joined = ChartArray.concatenate([first, second])
+
+    assert len(joined) == 10
+    assert sorted(joined.errors) == [5, 6]
+    errors = [chart for chart in joined.to_dicts() if not chart['success']]
+    assert [(chart['index'], chart['error_type']) for chart in errors] == [(5, 'KeyError'), (6, 'KeyError')]
+    assert np.array_equal(joined.rows[7:], second.rows[1:])
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+import swisseph as swe
+from flask import jsonify
+
+import serialize
+from chart import PLANETS, PlanetaryStrength, get_houses, get_sign, get_nakshatra, get_planet_house
+from conftest import birth_records
+
+def stdlib_json(payload):
+    return (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+
+def baseline_chart(data):
+    # The /api/chart payload the way the original route built it
+    hsys = data['hsys'].encode('ascii')
+    swe.set_sid_mode(swe.SIDM_LAHIRI)
+    flags = swe.FLG_SWIEPH | swe.FLG_SIDEREAL
+    utc = swe.utc_time_zone(data['year'], data['month'], data['day'], data['hour'],
+                            data['mins'], data['secs'], data['tzoffset'])
+    jdet = swe.utc_to_jd(*utc)[1]
+
+    strength_calculator = PlanetaryStrength()
+    ascendant_degree = swe.houses_ex2(jdet, data['lat'], data['lon'], hsys, flags)[1][0]
+    houses = get_houses(ascendant_degree)
+
+    planet_data = {}
+    for name, planet_id in PLANETS.items():
+        degree = swe.calc(jdet, planet_id, flags)[0][0]
+        sign, degree_in_sign = get_sign(degree)
+        nakshatra, pada, degree_in_nak = get_nakshatra(degree)
+        planet_data[name] = {
+            'degree': float(degree),
+            'sign': sign,
+            'degree_in_sign': float(degree_in_sign),
+            'nakshatra': nakshatra,
+            'pada': int(pada),
+            'degree_in_nak': degree_in_nak,
+            'dignity': strength_calculator.get_dignity(name, sign, degree_in_sign),
+            'strength_range': strength_calculator.calculate_strength(name, sign, degree_in_sign),
+            'house': get_planet_house(degree, houses)
+        }
+
+    return {'success': True, 'ascendant': ascendant_degree, 'planets': planet_data, 'houses': houses}
+
+@pytest.mark.parametrize('fast_json', [True, False])
+def test_chart_bytes_match_baseline(app, client, monkeypatch, fast_json):
+    monkeypatch.setattr(serialize, 'FAST_JSON', fast_json and serialize.orjson is not None)
+    for data in birth_records(40, seed=int(fast_json)):
+        response = client.post('/api/chart', json=data)
+        assert response.status_code == 200
+        with app.app_context():
+            assert response.get_data() == jsonify(baseline_chart(data)).get_data()
+
+@pytest.mark.skipif(serialize.orjson is None, reason='orjson not installed')
+@pytest.mark.parametrize('payload', [
+    {'houses': {n: {'sign': 'Aries'} for n in range(1, 13)}},
+    {2: 'b', 10: 'a', 1: 'c'},
+    {True: 1, 0: 2, 1.5: 3},
+    {None: 1},
+    {'small': 1e-05, 'tiny': 1.234e-07, 'edge': 0.0001, 'big': 1e16, 'below': 9999999999999998.0},
+    {'zero': 0.0, 'negative_zero': -0.0, 'negative': -1e-05},
+    {'nan': float('nan'), 'inf': float('inf')},
+    {'text': 'Purva Ashadha', 'accent': 'Zürich', 'del': '\x7f', 'control': '\x1f\n'},
+    {'Zürich': 1},
+    {'nested': [[1, 2.5, None, True], ({'b': 1, 'a': 2},)], 'huge': 2 ** 70},
+])
+def test_fast_json_matches_stdlib(monkeypatch, payload):
+    monkeypatch.setattr(serialize, 'FAST_JSON', True)
+    assert serialize.encode_json(payload) == stdlib_json(payload)
+
+@pytest.mark.skipif(serialize.orjson is None, reason='orjson not installed')
+def test_fast_json_numpy(monkeypatch):
+    import numpy as np
+    monkeypatch.setattr(serialize, 'FAST_JSON', True)
+    values = np.array([0.5, 123.25, 359.999])
+    assert serialize.encode_json({'x': values, 'n': np.int64(3)}) == stdlib_json({'x': values.tolist(), 'n': 3})
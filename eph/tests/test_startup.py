@@ -0,0 +1,55 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+EPH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in a fresh interpreter: the test session has imported the route modules already
+SCRIPT = '''
+import json, sys
+import main
+loaded_at_import = [name for name in main.ROUTE_MODULES if name in sys.modules]
+
+adapter = main.app.url_map.bind('localhost')
+routes = {}
+for module_name, (_, rules) in main.ROUTE_MODULES.items():
+    for rule, methods in rules.items():
+        for method in methods:
+            endpoint, _ = adapter.match(rule, method)
+            client = main.app.test_client()
+            status = client.open(rule, method=method, json={}).status_code
+            view = main.app.view_functions[endpoint]
+            routes[rule + ' ' + method] = {
+                'endpoint': endpoint, 'status': status,
+                'view': view.__module__ + '.' + view.__name__
+            }
+print(json.dumps({'loaded_at_import': loaded_at_import, 'routes': routes}))
+'''
+
+def run_app(lazy):
+    env = dict(os.environ, LAZY_ROUTES='on' if lazy else 'off', EPHE_WARMUP='off', LOG_LEVEL='WARNING')
+    output = subprocess.run([sys.executable, '-c', SCRIPT], cwd=EPH, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+@pytest.fixture(scope='module')
+def modes():
+    return run_app(lazy=True), run_app(lazy=False)
+
+def test_importing_main_leaves_the_route_modules_alone(modes):
+    lazy, eager = modes
+    assert lazy['loaded_at_import'] == []
+    assert sorted(eager['loaded_at_import']) == sorted(__import__('main').ROUTE_MODULES)
+
+def test_routes_resolve_to_the_same_endpoints_and_views(modes):
+    lazy, eager = modes
+    from main import ROUTE_MODULES
+    assert len(lazy['routes']) == sum(len(methods) for _, rules in ROUTE_MODULES.values() for methods in rules.values())
+    assert lazy['routes'] == eager['routes']
+    for route in lazy['routes'].values():
+        # The real view (not the stand-in) answered, an empty body is a client error
+        assert route['status'] not in (404, 405)
+        assert route['view'].split('.')[0] in ROUTE_MODULES
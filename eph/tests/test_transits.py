@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from chart import PLANETS, get_houses, get_planet_house, set_sidereal_mode, get_julian_day
+from transits import ASPECTS, OVERLAY_FIELDS, overlay, transit_positions
+
+def test_overlay_matches_single_charts():
+    set_sidereal_mode()
+    transits = transit_positions(get_julian_day(2026, 3, 1, 12, 0, 0, 0.0))
+    rng = np.random.default_rng(0)
+    ascendants = rng.uniform(0, 360, 200)
+    moons = rng.uniform(0, 360, 200)
+    result = overlay(transits, ascendants, moons)
+
+    for row in range(len(ascendants)):
+        asc_houses = get_houses(ascendants[row])
+        moon_houses = get_houses(moons[row])
+        for i, planet in enumerate(PLANETS):
+            house = get_planet_house(transits[i], asc_houses)
+            assert result['house'][row, i] == house
+            assert result['house_from_moon'][row, i] == get_planet_house(transits[i], moon_houses)
+            # Counted from the planet's own sign (1) forward to the ascendant's
+            assert result['aspects_ascendant'][row, i] == ((1 - house) % 12 + 1 in ASPECTS[planet])
+
+def test_overlay_rejects_mismatched_natives():
+    with pytest.raises(ValueError):
+        overlay(np.zeros(len(PLANETS)), np.zeros(3), np.zeros(2))
+
+def test_binary_matches_json(client):
+    natives = np.array([[10.0, 200.0], [359.999, 0.0], [123.4, 56.7]])
+    body = {'date': '2026-03-01', 'ascendants': natives[:, 0].tolist(), 'moons': natives[:, 1].tolist()}
+    as_json = client.post('/api/transits/overlay', json=body).get_json()
+
+    response = client.post('/api/transits/overlay?date=2026-03-01', data=natives.astype('<f8').tobytes(),
+                           content_type='application/octet-stream',
+                           headers={'Accept': 'application/octet-stream'})
+    fields = np.frombuffer(response.data, dtype=np.int8).reshape(len(OVERLAY_FIELDS), len(natives), len(PLANETS))
+    for field, values in zip(OVERLAY_FIELDS, fields):
+        for i, planet in enumerate(PLANETS):
+            assert values[:, i].tolist() == [int(v) for v in as_json[field][planet]]
+
+@pytest.mark.parametrize('body', [
+    {'ascendants': [1.0], 'moons': [2.0]},
+    {'date': 'not a date', 'ascendants': [1.0], 'moons': [2.0]},
+    {'date': '2026-03-01', 'ascendants': [1.0]},
+    {'date': '2026-03-01', 'ascendants': [1.0, 2.0], 'moons': [2.0]},
+    {'date': '2026-03-01', 'ascendants': ['x'], 'moons': [2.0]}
+])
+def test_overlay_rejects_bad_input(client, body):
+    assert client.post('/api/transits/overlay', json=body).status_code == 400
+
+def test_binary_body_must_be_pairs(client):
+    response = client.post('/api/transits/overlay?date=2026-03-01', data=b'\0' * 24,
+                           content_type='application/octet-stream')
+    assert response.status_code == 400
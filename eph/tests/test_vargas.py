@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from chart import DIGNITY_LABELS, PLANETS, SIGNS
+from vargas import VARGAS, classify_vargas, compute_vargas, parse_vargas, varga_sign
+
+@pytest.mark.parametrize('degree, name, sign', [
+    (1.0, 'D9', 0), (5.0, 'D9', 1), (31.0, 'D9', 9), (61.0, 'D9', 6), (91.0, 'D9', 3), (359.0, 'D9', 11),
+    (10.0, 'D2', 4), (20.0, 'D2', 3), (40.0, 'D2', 3), (50.0, 'D2', 4),
+    (15.0, 'D3', 4), (25.0, 'D3', 8),
+    (32.0, 'D10', 9), (33.0, 'D10', 10), (4.0, 'D30', 0), (34.0, 'D30', 1), (29.5, 'D30', 6),
+    (123.4, 'D1', 4)
+])
+def test_known_varga_signs(degree, name, sign):
+    assert varga_sign(degree, name) == sign
+
+def test_bulk_matches_single_charts():
+    rng = np.random.default_rng(0)
+    longitudes = rng.uniform(0, 360, (50, len(PLANETS)))
+    ascendants = rng.uniform(0, 360, 50)
+    names = list(VARGAS)
+    bulk = classify_vargas(longitudes, ascendants, names)
+
+    for row in range(len(ascendants)):
+        single = compute_vargas(ascendants[row], longitudes[row].tolist(), names)
+        for name in names:
+            assert SIGNS[bulk[name]['ascendant_sign'][row]] == single[name]['ascendant_sign']
+            for i, planet in enumerate(PLANETS):
+                chart = single[name]['planets'][planet]
+                assert SIGNS[bulk[name]['sign'][row, i]] == chart['sign']
+                assert bulk[name]['house'][row, i] == chart['house']
+                assert DIGNITY_LABELS[bulk[name]['dignity'][row, i]] == chart['dignity']
+
+def test_parse_vargas():
+    assert parse_vargas('d9, D10,D9') == ['D9', 'D10']
+    assert parse_vargas(['D1']) == ['D1']
+    with pytest.raises(ValueError):
+        parse_vargas('D9,D99')
+
+def test_chart_route_vargas(client):
+    birth = {'year': 1990, 'month': 5, 'day': 17, 'hour': 8, 'mins': 30, 'secs': 0,
+             'tzoffset': 5.5, 'lat': 28.6, 'lon': 77.2, 'hsys': 'W'}
+    chart = client.post('/api/chart?vargas=D9', json=birth).get_json()
+    assert chart['vargas']['D9']['planets']['Sun']['sign'] == \
+        SIGNS[varga_sign(chart['planets']['Sun']['degree'], 'D9')]
+
+    assert client.post('/api/chart?vargas=D99', json=birth).status_code == 400
@@ -0,0 +1,48 @@
+import pytest
+
+import batch
+from chart import configure_ephemeris
+from conftest import birth_records
+from workers import ChartPool
+
+@pytest.fixture(autouse=True)
+def ephemeris():
+    # The workers configure themselves; this is for the in-process comparison
+    configure_ephemeris()
+
+@pytest.fixture(scope='module')
+def pool():
+    with ChartPool(workers=2, chunk_size=7) as pool:
+        yield pool
+
+def test_chunks_come_back_in_input_order(pool):
+    # Big and small chunks, so later ones finish first
+    chunks = [birth_records(size, seed=size) for size in (40, 1, 25, 2, 3, 30, 1)]
+    results = list(pool.map_chunks(chunks))
+    assert [chunk for chunk, _ in results] == chunks
+    assert [len(charts) for _, charts in results] == [len(chunk) for chunk in chunks]
+
+def test_matches_compute_charts(pool):
+    records = birth_records(50, seed=3)
+    records[9] = {'year': 2000} # missing fields, in the second chunk
+    expected = batch.compute_charts(records)
+    assert list(pool.map_charts(records)) == expected
+    assert expected[9]['success'] is False and expected[9]['index'] == 9
+
+def test_compact_matches_compute_charts_compact(pool):
+    import numpy as np
+    records = birth_records(20, seed=4)
+    chunks = list(pool.map_compact(records))
+    assert len(chunks) == 3
+    expected = batch.compute_charts_compact(records[7:14])
+    for key, values in expected.items():
+        if isinstance(values, np.ndarray):
+            assert np.array_equal(chunks[1][key], values)
+        else:
+            assert chunks[1][key] == values
+
+def test_worker_errors_propagate(pool):
+    with pytest.raises(TypeError):
+        list(pool.map_chunks([birth_records(2), 5]))
+    # The pool still works afterwards
+    assert len(list(pool.map_charts(birth_records(3)))) == 3
@@ -0,0 +1,162 @@
+import numpy as np
+import swisseph as swe
+from flask import Response, jsonify, request
+
+from chart import PLANETS, SIGNS, NAKSHATRAS, FLAGS, set_sidereal_mode
+from classify import SIGN_SIZE, classify_longitudes, normalize_array
+from ephemeris import parse_date
+from ephe_files import check_coverage
+from serialize import respond
+
+#################### Transit Overlay ###################
+# Where today's planets fall for many natives at once. The transit positions are
+# calculated once; every native is just their natal ascendant and Moon longitude,
+# so the per-native work is a row lookup in small int8 tables:
+#
+#   house             transit planet's whole sign house from the natal ascendant
+#   house_from_moon   the same counted from the natal Moon sign (Chandra lagna)
+#   aspects_*         whether the transit planet aspects the natal ascendant / Moon sign
+#
+# All of them are (natives, planets) arrays with planets in PLANETS order.
+
+# Graha drishti as sign distances counted from the planet (7 = the opposite sign).
+# Everyone aspects the 7th; Mars, Jupiter and Saturn have their special aspects and
+# Rahu is given Jupiter's, as most texts do.
+ASPECTS = {
+    'Sun': (7,), 'Moon': (7,), 'Mars': (4, 7, 8), 'Mercury': (7,),
+    'Jupiter': (5, 7, 9), 'Venus': (7,), 'Saturn': (3, 7, 10), 'Rahu': (5, 7, 9)
+}
+
+# ASPECT_TABLE[planet, distance - 1]: True when the planet aspects that many signs on
+ASPECT_TABLE = np.zeros((len(PLANETS), 12), dtype=bool)
+for row, name in enumerate(PLANETS):
+    ASPECT_TABLE[row, np.array(ASPECTS[name]) - 1] = True
+
+OVERLAY_FIELDS = ('house', 'house_from_moon', 'aspects_ascendant', 'aspects_moon')
+
+MAX_NATIVES = 10_000_000
+MAX_JSON_NATIVES = 200_000 # more than this only as packed binary
+
+BINARY_TYPE = 'application/octet-stream'
+
+def transit_positions(jdet):
+    # Sidereal longitudes of every planet (PLANETS order) at one julian day (ET)
+    set_sidereal_mode()
+    return np.array([swe.calc(jdet, planet_id, FLAGS)[0][0] for planet_id in PLANETS.values()])
+
+def natal_signs(longitudes):
+    # Sign numbers (0-11) as int8 for an array of natal longitudes
+    return np.minimum(normalize_array(longitudes) // SIGN_SIZE, 11).astype(np.int8)
+
+def overlay(transit_longitudes, ascendants, moons):
+    # Library API: transit longitudes (PLANETS order, see transit_positions) against
+    # (n,) arrays of natal ascendants and Moon longitudes
+    asc_signs = natal_signs(ascendants)
+    moon_signs = natal_signs(moons)
+
+    if asc_signs.shape != moon_signs.shape:
+        raise ValueError('ascendants and moons must have the same length')
+
+    # With the transits fixed every answer depends only on the natal sign, so work
+    # out all 12 (rows) once and pick a row per native
+    transit_signs = classify_longitudes(transit_longitudes)['sign_index'] # (planets,)
+    signs = np.arange(12, dtype=np.int8)[:, np.newaxis]
+    houses = (transit_signs - signs) % 12 + 1
+    # Distance from the transit planet forward to the natal sign
+    aspects = ASPECT_TABLE[np.arange(len(transit_signs)), (signs - transit_signs) % 12]
+
+    return {
+        'house': houses[asc_signs],
+        'house_from_moon': houses[moon_signs],
+        'aspects_ascendant': aspects[asc_signs],
+        'aspects_moon': aspects[moon_signs]
+    }
+
+def transit_summary(transit_longitudes):
+    classified = classify_longitudes(transit_longitudes)
+    return {
+        name: {
+            'longitude': float(transit_longitudes[i]),
+            'sign': SIGNS[classified['sign_index'][i]],
+            'nakshatra': NAKSHATRAS[classified['nakshatra_index'][i]],
+            'pada': int(classified['pada'][i])
+        }
+        for i, name in enumerate(PLANETS)
+    }
+
+#################### Request Parsing ###################
+
+def read_natives():
+    # (ascendants, moons) from either a JSON body with 'ascendants' and 'moons' lists,
+    # or a binary body of little-endian float64 (ascendant, moon) pairs
+    if request.mimetype == BINARY_TYPE:
+        body = request.get_data()
+        if len(body) % 16:
+            raise ValueError('Binary body must be float64 (ascendant, moon) pairs')
+        pairs = np.frombuffer(body, dtype='<f8').reshape(-1, 2)
+        return pairs[:, 0], pairs[:, 1]
+
+    data = request.get_json(silent=True) or {}
+    return np.asarray(data['ascendants'], dtype=np.float64), np.asarray(data['moons'], dtype=np.float64)
+
+def request_option(name, default=None):
+    # Options come from the query string, or the JSON body for JSON requests
+    if name in request.args:
+        return request.args[name]
+    if request.mimetype != BINARY_TYPE:
+        data = request.get_json(silent=True) or {}
+        return data.get(name, default)
+    return default
+
+def register_transit_routes(app):
+
+    @app.route('/api/transits/overlay', methods=['POST'])
+    def get_transit_overlay():
+        # date (ISO, plus optional tzoffset) and the natives: JSON {"ascendants": [...],
+        # "moons": [...]} or application/octet-stream float64 (ascendant, moon) pairs.
+        # Accept: application/octet-stream returns the four int8 (natives, planets)
+        # arrays back to back, in OVERLAY_FIELDS order.
+        try:
+            date = request_option('date')
+            if not date:
+                return jsonify({'success': False, 'error': 'date is required'}), 400
+
+            jdet = parse_date(date, float(request_option('tzoffset', 0.0)))
+            check_coverage(jdet)
+
+            ascendants, moons = read_natives()
+            count = len(ascendants)
+            if count > MAX_NATIVES:
+                return jsonify({'success': False, 'error': f'At most {MAX_NATIVES} natives per request'}), 400
+
+            transit_longitudes = transit_positions(jdet)
+            result = overlay(transit_longitudes, ascendants, moons)
+
+            if request.accept_mimetypes.best == BINARY_TYPE:
+                body = b''.join(np.ascontiguousarray(result[field], dtype=np.int8).tobytes()
+                                for field in OVERLAY_FIELDS)
+                response = Response(body, mimetype=BINARY_TYPE)
+                response.headers['X-Overlay-Fields'] = ','.join(OVERLAY_FIELDS)
+                response.headers['X-Overlay-Planets'] = ','.join(PLANETS)
+                response.headers['X-Overlay-Natives'] = str(count)
+                return response
+
+            if count > MAX_JSON_NATIVES:
+                return jsonify({
+                    'success': False,
+                    'error': f'More than {MAX_JSON_NATIVES} natives, ask for {BINARY_TYPE}'
+                }), 400
+
+            return respond({
+                'success': True,
+                'jd': jdet,
+                'count': count,
+                'transits': transit_summary(transit_longitudes),
+                **{field: {name: result[field][:, i].tolist() for i, name in enumerate(PLANETS)}
+                   for field in OVERLAY_FIELDS}
+            })
+
+        except (KeyError, ValueError) as e:
+            return jsonify({'success': False, 'error': f'Invalid data format: {str(e)}'}), 400
+        except Exception as e:
+            return jsonify({'success': False, 'error': str(e), 'error_type': type(e).__name__}), 500
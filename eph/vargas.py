@@ -0,0 +1,149 @@
+from chart import PLANETS, SIGNS, PLANET_INDEX, PlanetaryStrength, get_houses, classify_dignities
+from classify import SIGN_SIZE, sign_position, house_number, normalize_array
+from metrics import timed
+
+#################### Divisional Charts (Vargas) ###################
+# A varga splits every sign into equal parts and sends each part to a sign of its
+# own, so a divisional position is a pure function of the D1 longitude: which sign
+# and which part of it. Every varga's (sign, part) -> sign map is worked out once
+# at import; a chart's vargas are then lookups on the longitudes it already has.
+
+def _odd(sign):
+    return sign % 2 == 0 # Aries (0) is the first, odd, sign
+
+def _by_quality(sign, movable, fixed, dual):
+    return (movable, fixed, dual)[sign % 3]
+
+# D30 (Trimsamsa) parts are unequal: (end degree, sign) for odd and even signs
+_TRIMSAMSA = {
+    True: ((5, 0), (10, 10), (18, 8), (25, 2), (30, 6)), # Aries, Aquarius, Sagittarius, Gemini, Libra
+    False: ((5, 1), (12, 5), (20, 11), (25, 9), (30, 7)) # Taurus, Virgo, Pisces, Capricorn, Scorpio
+}
+
+def _trimsamsa(sign, degree):
+    for end, varga_sign in _TRIMSAMSA[_odd(sign)]:
+        if degree < end:
+            return varga_sign
+
+# name: (parts per sign, rule(sign, part) -> varga sign). D30 uses 1 degree parts
+# so its unequal spans line up with part boundaries.
+VARGAS = {
+    'D1': (1, lambda sign, part: sign),
+    'D2': (2, lambda sign, part: (4, 3)[part] if _odd(sign) else (3, 4)[part]), # Hora: Leo / Cancer
+    'D3': (3, lambda sign, part: sign + 4 * part), # Drekkana
+    'D4': (4, lambda sign, part: sign + 3 * part), # Chaturthamsa
+    'D7': (7, lambda sign, part: sign + (0 if _odd(sign) else 6) + part), # Saptamsa
+    'D9': (9, lambda sign, part: sign * 9 + part), # Navamsa
+    'D10': (10, lambda sign, part: sign + (0 if _odd(sign) else 8) + part), # Dasamsa
+    'D12': (12, lambda sign, part: sign + part), # Dwadasamsa
+    'D16': (16, lambda sign, part: _by_quality(sign, 0, 4, 8) + part), # Shodasamsa
+    'D20': (20, lambda sign, part: _by_quality(sign, 0, 8, 4) + part), # Vimsamsa
+    'D24': (24, lambda sign, part: (4 if _odd(sign) else 3) + part), # Chaturvimsamsa
+    'D27': (27, lambda sign, part: sign * 27 + part), # Bhamsa
+    'D30': (30, lambda sign, part: _trimsamsa(sign, part)), # Trimsamsa
+    'D40': (40, lambda sign, part: (0 if _odd(sign) else 6) + part), # Khavedamsa
+    'D45': (45, lambda sign, part: _by_quality(sign, 0, 4, 8) + part), # Akshavedamsa
+    'D60': (60, lambda sign, part: sign + part) # Shashtiamsa
+}
+
+# VARGA_TABLES[name][sign][part]: plain tuples, like the dignity rows in chart.py
+VARGA_TABLES = {
+    name: tuple(tuple(rule(sign, part) % 12 for part in range(parts)) for sign in range(12))
+    for name, (parts, rule) in VARGAS.items()
+}
+
+def parse_vargas(value):
+    # 'D9,D10' or ['D9', 'D10'] into a list of VARGAS names (duplicates dropped)
+    names = value.split(',') if isinstance(value, str) else list(value)
+    names = [name.strip().upper() for name in names if name.strip()]
+
+    unknown = [name for name in names if name not in VARGAS]
+    if unknown:
+        raise ValueError(f"Unknown varga(s): {', '.join(unknown)} (one of {', '.join(VARGAS)})")
+
+    return list(dict.fromkeys(names))
+
+########################## Single Chart ##########################
+
+def varga_sign(degree, name):
+    parts = VARGAS[name][0]
+    sign_num, degree_in_sign = sign_position(degree)
+    return VARGA_TABLES[name][sign_num][min(int(degree_in_sign * parts / SIGN_SIZE), parts - 1)]
+
+def compute_vargas(ascendant_degree, degrees, names, strength_calculator=None):
+    # {name: chart} for the ascendant and planet longitudes (PLANETS order) of one chart
+    if strength_calculator is None:
+        strength_calculator = PlanetaryStrength()
+
+    charts = {}
+    for name in names:
+        asc_sign_num = varga_sign(ascendant_degree, name)
+
+        planet_data = {}
+        for planet, degree in zip(PLANETS, degrees):
+            sign_num = varga_sign(degree, name)
+            sign = SIGNS[sign_num]
+            planet_data[planet] = {
+                'sign': sign,
+                'house': house_number(sign_num, asc_sign_num),
+                'dignity': strength_calculator.get_dignity(planet, sign),
+                'strength_range': strength_calculator.calculate_strength(planet, sign)
+            }
+
+        charts[name] = {
+            'ascendant_sign': SIGNS[asc_sign_num],
+            'planets': planet_data,
+            'houses': get_houses(asc_sign_num * SIGN_SIZE)
+        }
+
+    return charts
+
+@timed('chart.vargas')
+def chart_vargas(chart, names, strength_calculator=None):
+    # The same from a chart dictionary (compute_chart / build_chart)
+    degrees = [chart['planets'][planet]['degree'] for planet in PLANETS]
+    return compute_vargas(chart['ascendant'], degrees, names, strength_calculator)
+
+########################## NumPy Arrays ##########################
+
+_arrays = {}
+
+def _varga_arrays():
+    # VARGA_TABLES as int8 NumPy arrays, built on first use
+    if not _arrays:
+        import numpy as np
+        _arrays['np'] = np
+        _arrays['tables'] = {name: np.array(table, dtype=np.int8) for name, table in VARGA_TABLES.items()}
+        _arrays['planet_rows'] = np.array([PLANET_INDEX[planet] for planet in PLANETS])
+    return _arrays
+
+def classify_vargas(longitudes, ascendants, names):
+    # Bulk version: (n, planets) longitudes and (n,) ascendants in, per varga a dict of
+    # 'ascendant_sign' (n,), 'sign', 'house' and 'dignity' (n, planets) int8 codes
+    arrays = _varga_arrays()
+    np = arrays['np']
+
+    longitudes = normalize_array(longitudes)
+    ascendants = normalize_array(ascendants)
+
+    result = {}
+    for name in names:
+        parts = VARGAS[name][0]
+        table = arrays['tables'][name]
+
+        def lookup(degree):
+            sign_num = np.minimum(degree // SIGN_SIZE, 11).astype(np.intp)
+            part = np.minimum(np.mod(degree, SIGN_SIZE) * parts // SIGN_SIZE, parts - 1).astype(np.intp)
+            return table[sign_num, part]
+
+        signs = lookup(longitudes)
+        asc_signs = lookup(ascendants)
+
+        result[name] = {
+            'ascendant_sign': asc_signs,
+            'sign': signs,
+            'house': (signs - asc_signs[..., np.newaxis]) % 12 + 1,
+            'dignity': classify_dignities(arrays['planet_rows'], signs)
+        }
+
+    return result
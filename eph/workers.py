@@ -0,0 +1,70 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from chart import EPHE_PATH, configure_ephemeris
+from batch import compute_charts, compute_charts_compact, chunked
+
+#################### Worker Processes ###################
+# Swiss Ephemeris keeps its settings (ephemeris path, sidereal mode) in global
+# state, so every worker process sets them once at start-up and then only
+# ever works on its own chunks. Nothing is shared between requests or threads.
+
+def init_worker(ephe_path):
+    configure_ephemeris(ephe_path)
+
+def run_chunk(records, compact):
+    if compact:
+        return compute_charts_compact(records)
+    return compute_charts(records)
+
+class ChartPool:
+
+    def __init__(self, workers=None, chunk_size=2000, ephe_path=EPHE_PATH):
+        self.workers = workers or os.cpu_count()
+        self.chunk_size = chunk_size
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_worker,
+            initargs=(ephe_path,)
+        )
+
+    def map_chunks(self, chunks, compact=False):
+        # Yields (chunk, results) in input order. At most two chunks per worker are
+        # in flight, so a long stream of chunks never piles up in memory.
+        pending = deque()
+        limit = self.workers * 2
+
+        for chunk in chunks:
+            pending.append((chunk, self.executor.submit(run_chunk, chunk, compact)))
+            if len(pending) >= limit:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+    def map_charts(self, records):
+        # Chart results for any iterable of records, in the same order (like compute_charts)
+        offset = 0
+        for chunk, results in self.map_chunks(chunked(records, self.chunk_size)):
+            for result in results:
+                if not result['success']:
+                    result['index'] += offset
+                yield result
+            offset += len(chunk)
+
+    def map_compact(self, records):
+        # Compact array results (see compute_charts_compact), one dict of arrays per chunk
+        for _, arrays in self.map_chunks(chunked(records, self.chunk_size), compact=True):
+            yield arrays
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()